@@ -1,9 +1,28 @@
-"""Core runtime package for the VoCoType Linux IBus application."""
+"""Core runtime package for the VoCoType Linux IBus application.
+
+Submodules that pull in heavy dependencies (sounddevice/PortAudio, numpy, funasr_onnx)
+are imported on first attribute access, so ``import app.audio_utils`` from the IBus
+and Fcitx5 processes does not load them before the input method registers.
+"""
+
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING
 
 from vocotype_version import __version__
 from .config import DEFAULT_CONFIG, ensure_logging_dir, load_config
-from .audio_capture import AudioCapture
-from .transcribe import TranscriptionWorker, TranscriptionResult
+
+if TYPE_CHECKING:
+    from .audio_capture import AudioCapture
+    from .transcribe import TranscriptionResult, TranscriptionWorker
+
+# 公开名称 -> 所在子模块（首次访问时导入）
+_LAZY_ATTRS = {
+    "AudioCapture": ".audio_capture",
+    "TranscriptionWorker": ".transcribe",
+    "TranscriptionResult": ".transcribe",
+}
 
 __all__ = [
     "DEFAULT_CONFIG",
@@ -14,3 +33,16 @@ __all__ = [
     "TranscriptionResult",
     "__version__",
 ]
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
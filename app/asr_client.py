@@ -0,0 +1,236 @@
+"""常驻 ASR 守护进程（app.asr_daemon）的客户端
+
+connect_asr() 是前端获取识别服务的统一入口：守护进程可连接时返回 ASRClient，
+否则回退到进程内的共享模型（app.model_registry.SharedASR）。两者提供相同的接口：
+
+    transcribe_samples(samples, sample_rate, options=None, trace=None)
+    transcribe_audio(audio_path, options=None, trace=None)
+    transcribe_batch(waveforms, options=None, traces=None)
+    create_stream_session(...) / streaming_available
+    wait_for_models() / stats() / release()
+
+守护进程不提供流式识别：配置了 FUNASR_STREAMING_MODE 时，auto 模式保留进程内模型以维持
+流式/分段识别，require 模式则明确告警流式识别被关闭。
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import logging
+import socket
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+from app.funasr_config import ASR_DAEMON_MODE, ASR_DAEMON_SOCKET, STREAMING_MODE
+from app.ipc import MAGIC, FrameError, read_frame, write_frame
+
+if TYPE_CHECKING:
+    from app.trace import UtteranceTrace
+
+logger = logging.getLogger(__name__)
+
+# 连接与 ping 的超时（socket 激活时包含守护进程启动的时间）
+CONNECT_TIMEOUT_S = 10.0
+# 单次识别的超时（守护进程刚启动时包含模型加载）
+REQUEST_TIMEOUT_S = 300.0
+MAX_RESPONSE_BYTES = 16 * 1024 * 1024
+
+
+class ASRClient:
+    """守护进程客户端（线程安全：同一时刻只有一个请求在途）"""
+
+    streaming_available = False
+
+    def __init__(self, socket_path: str = ASR_DAEMON_SOCKET) -> None:
+        self.socket_path = socket_path
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(CONNECT_TIMEOUT_S)
+        try:
+            sock.connect(self.socket_path)
+            sock.sendall(MAGIC)
+            if sock.recv(len(MAGIC), socket.MSG_WAITALL) != MAGIC:
+                raise ConnectionError("ASR 守护进程握手失败")
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    def _close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def request(self, request: dict, data: bytes = b"", timeout: float = REQUEST_TIMEOUT_S) -> dict:
+        """发送一个请求并等待响应；连接已断开（守护进程空闲退出）时重连重试一次"""
+        if data:
+            request = dict(request, bytes=len(data))
+        payload = json.dumps(request, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            for attempt in range(2):
+                reused = self._sock is not None
+                try:
+                    if self._sock is None:
+                        self._sock = self._connect()
+                    self._sock.settimeout(timeout)
+                    request_id = next(self._ids)
+                    write_frame(self._sock, request_id, payload)
+                    if data:
+                        write_frame(self._sock, request_id, data)
+                    frame = read_frame(self._sock, MAX_RESPONSE_BYTES)
+                    if frame is None:
+                        raise ConnectionError("ASR 守护进程关闭了连接")
+                    return json.loads(frame[1].decode("utf-8"))
+                except (OSError, FrameError) as exc:
+                    self._close()
+                    if attempt or not reused or isinstance(exc, socket.timeout):
+                        raise ConnectionError(f"ASR 守护进程请求失败: {exc}") from exc
+                    logger.info("ASR 守护进程连接已断开，重新连接")
+
+    def ping(self) -> dict:
+        return self.request({"type": "ping"}, timeout=CONNECT_TIMEOUT_S)
+
+    def _call(self, request: dict, data: bytes = b"", trace: Optional["UtteranceTrace"] = None) -> dict:
+        start = time.monotonic()
+        try:
+            result = self.request(request, data)
+        except ConnectionError as exc:
+            logger.error("%s", exc)
+            return {"success": False, "error": str(exc), "type": "connection_error"}
+        if trace is not None:
+            _merge_trace(trace, result, time.monotonic() - start)
+        return result
+
+    def transcribe_samples(self, samples, sample_rate=16000, options=None, trace=None) -> dict:
+        import numpy as np
+
+        audio = np.asarray(samples)
+        if audio.ndim > 1:
+            audio = audio[:, 0]
+        if np.issubdtype(audio.dtype, np.integer):
+            audio = audio.astype(np.int16, copy=False)
+        else:
+            audio = audio.astype(np.float32, copy=False)
+        request = {
+            "type": "transcribe_samples",
+            "sample_rate": int(sample_rate),
+            "dtype": audio.dtype.name,
+            "options": options,
+        }
+        return self._call(request, np.ascontiguousarray(audio).tobytes(), trace)
+
+    def transcribe_audio(self, audio_path, options=None, trace=None) -> dict:
+        import os
+
+        request = {"type": "transcribe_audio", "audio_path": os.path.abspath(audio_path), "options": options}
+        return self._call(request, trace=trace)
+
+    def transcribe_batch(self, waveforms, options=None, traces=None) -> list:
+        import numpy as np
+
+        waveforms = [np.asarray(w, dtype=np.float32) for w in waveforms]
+        request = {"type": "transcribe_batch", "lengths": [w.size for w in waveforms], "options": options}
+        data = np.concatenate(waveforms).tobytes() if waveforms else b""
+        start = time.monotonic()
+        result = self._call(request, data)
+        if not result.get("success"):
+            return [dict(result) for _ in waveforms]
+        results = result["results"]
+        elapsed = time.monotonic() - start
+        for trace, item in zip(traces or (), results):
+            if trace is not None:
+                _merge_trace(trace, item, elapsed)
+        return results
+
+    def create_stream_session(self, *args, **kwargs):
+        """守护进程不支持流式识别"""
+        return None
+
+    def wait_for_models(self, timeout: float = 300) -> bool:
+        """等待守护进程加载完模型"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if self.ping().get("ready"):
+                    return True
+            except ConnectionError:
+                return False
+            time.sleep(0.5)
+        return False
+
+    def stats(self) -> dict:
+        """守护进程的运行统计
+
+        成功时返回 {"daemon": {...}}，内容为守护进程的 FunASRServer.stats() 加上
+        clients 与 pid；守护进程不可达时返回 {"daemon_error": "..."}。
+        """
+        try:
+            result = self.request({"type": "stats"}, timeout=CONNECT_TIMEOUT_S)
+        except ConnectionError as exc:
+            return {"daemon_error": str(exc)}
+        result.pop("success", None)
+        return {"daemon": result}
+
+    def release(self) -> None:
+        with self._lock:
+            self._close()
+
+
+def _merge_trace(trace: "UtteranceTrace", result: dict, elapsed: float) -> None:
+    """守护进程内的分阶段耗时并入调用方的 trace，"ipc" 为传输与排队的额外开销"""
+    remote_spans = (result.get("trace") or {}).get("spans", {})
+    for stage, value_ms in remote_spans.items():
+        trace.spans[stage] = trace.spans.get(stage, 0.0) + value_ms / 1000
+    trace.spans["ipc"] = max(0.0, elapsed - sum(remote_spans.values()) / 1000)
+    trace.annotate(daemon=True)
+    result["trace"] = trace.as_dict()
+
+
+def connect_asr(mode: str = ASR_DAEMON_MODE, socket_path: str = ASR_DAEMON_SOCKET, streaming: bool = True):
+    """获取识别服务：优先连接常驻守护进程，不可用时回退到进程内共享模型
+
+    Args:
+        mode: auto / require / off，默认取 VOCOTYPE_ASR_DAEMON
+        streaming: 调用方是否使用流式会话（Fcitx5 Backend、setup-audio 只做整段识别）
+
+    Raises:
+        RuntimeError: require 模式下守护进程不可用，或进程内模型加载失败
+    """
+    streaming = streaming and STREAMING_MODE != "off"
+    if mode == "auto" and streaming:
+        # 守护进程只做整段识别，使用它会让松开按键后的等待重新随语音长度线性增长
+        logger.info(
+            "已启用流式识别（FUNASR_STREAMING_MODE=%s），不使用 ASR 守护进程，在本进程内加载模型",
+            STREAMING_MODE,
+        )
+        mode = "off"
+    if mode != "off":
+        client = ASRClient(socket_path)
+        try:
+            client.ping()
+            logger.info("已连接常驻 ASR 守护进程: %s", socket_path)
+            if streaming:
+                logger.warning(
+                    "VOCOTYPE_ASR_DAEMON=require：守护进程不支持流式识别，FUNASR_STREAMING_MODE=%s 不生效，"
+                    "松开按键后整段识别",
+                    STREAMING_MODE,
+                )
+            return client
+        except ConnectionError as exc:
+            client.release()
+            if mode == "require":
+                raise RuntimeError(f"ASR 守护进程不可用: {exc}") from exc
+            logger.info("ASR 守护进程不可用，在本进程内加载模型（%s）", exc)
+
+    from app import model_registry
+
+    return model_registry.acquire()
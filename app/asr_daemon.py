@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""常驻 ASR 守护进程
+
+IBus 引擎、Fcitx5 Backend、setup-audio 与 TranscriptionWorker 以前各自在进程内加载
+FunASRServer，同时使用两个输入法框架时模型内存与启动耗时都要翻倍。守护进程在一个进程中
+加载模型，前端通过 app.asr_client 经 Unix Socket 请求识别；守护进程不可用时客户端回退到
+进程内加载。
+
+支持 systemd socket 激活（LISTEN_FDS）：首次连接时由 systemd 启动；默认常驻，
+设置 --idle-exit 后空闲超时退出、下次连接再被拉起（退出后首次识别需重新加载模型）。协议沿用 app.ipc 的持久连接分帧：
+
+    握手 MAGIC 后，每个请求为一帧 JSON；带音频的请求（"bytes" > 0）紧接一帧原始数据，
+    响应为一帧 JSON（与请求 ID 相同）。
+
+请求类型：
+    {"type": "ping"}                                          -> {"pong": true, "ready": bool}
+    {"type": "transcribe_samples", "sample_rate": 48000, "dtype": "int16", "bytes": N, "options": {}}
+    {"type": "transcribe_batch", "lengths": [n1, n2], "bytes": N, "options": {}}  （16kHz float32）
+    {"type": "transcribe_audio", "audio_path": "/tmp/x.wav", "options": {}}
+    {"type": "stats"}
+
+用法：
+    python -m app.asr_daemon [--socket PATH] [--idle-exit 0]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import stat
+import sys
+import threading
+import time
+
+from app.funasr_config import ASR_DAEMON_SOCKET
+from app.ipc import MAGIC, FrameError, read_frame, write_frame
+from app.logging_config import setup_logging
+from app.trace import UtteranceTrace
+
+logger = logging.getLogger(__name__)
+
+# 请求 JSON 与音频数据帧的大小上限
+MAX_REQUEST_BYTES = 1024 * 1024
+MAX_AUDIO_BYTES = 64 * 1024 * 1024
+# systemd 传入的第一个监听 fd
+SD_LISTEN_FDS_START = 3
+
+_DTYPES = ("int16", "float32")
+
+
+def _json_default(value):
+    """识别结果中可能出现 numpy 标量（如置信度）"""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def _activation_socket():
+    """返回 systemd socket 激活传入的监听 socket，未经激活启动时返回 None"""
+    if os.environ.get("LISTEN_PID") != str(os.getpid()):
+        return None
+    try:
+        count = int(os.environ.get("LISTEN_FDS", "0"))
+    except ValueError:
+        return None
+    if count < 1:
+        return None
+    return socket.socket(fileno=SD_LISTEN_FDS_START)
+
+
+class ASRDaemon:
+    """在一个进程内持有共享模型，为多个前端提供识别"""
+
+    def __init__(self, socket_path: str = ASR_DAEMON_SOCKET, idle_exit: float = 0.0) -> None:
+        self.socket_path = socket_path
+        self.idle_exit = idle_exit
+        self.running = True
+        self.asr = None
+        self._ready = threading.Event()
+        self._load_error = None
+        self._last_activity = time.monotonic()
+        self._clients = 0
+        self._active = 0
+        self._clients_lock = threading.Lock()
+
+    def _load(self) -> None:
+        """后台加载模型：连接与 ping 在加载期间即可响应"""
+        from app import model_registry
+
+        try:
+            self.asr = model_registry.acquire()
+            logger.info("ASR 守护进程模型已就绪")
+        except Exception as exc:  # noqa: BLE001
+            self._load_error = str(exc)
+            logger.error("ASR 守护进程加载模型失败: %s", exc)
+        finally:
+            self._ready.set()
+
+    def _listen(self):
+        sock = _activation_socket()
+        if sock is not None:
+            logger.info("使用 systemd socket 激活传入的监听 socket")
+            return sock, False
+
+        if os.path.exists(self.socket_path):
+            if not stat.S_ISSOCK(os.lstat(self.socket_path).st_mode):
+                raise RuntimeError(f"socket 路径已存在且不是 socket: {self.socket_path}")
+            os.remove(self.socket_path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        sock.listen(16)
+        return sock, True
+
+    def run(self) -> None:
+        sock, owns_path = self._listen()
+        sock.settimeout(1.0)
+        threading.Thread(target=self._load, daemon=True, name="ASRDaemonLoad").start()
+        logger.info("ASR 守护进程已启动，监听: %s", sock.getsockname() or self.socket_path)
+
+        try:
+            while self.running:
+                try:
+                    conn, _ = sock.accept()
+                except socket.timeout:
+                    if self._idle_expired():
+                        logger.info("空闲超过 %.0f 秒，ASR 守护进程退出", self.idle_exit)
+                        break
+                    continue
+                self._touch()
+                threading.Thread(
+                    target=self._serve,
+                    args=(conn,),
+                    daemon=True,
+                    name="ASRDaemonClient",
+                ).start()
+        finally:
+            sock.close()
+            if owns_path:
+                try:
+                    os.remove(self.socket_path)
+                except OSError:
+                    pass
+            if self.asr is not None:
+                self.asr.release()
+            logger.info("ASR 守护进程已停止")
+
+    def _touch(self) -> None:
+        self._last_activity = time.monotonic()
+
+    def _idle_expired(self) -> bool:
+        if self.idle_exit <= 0:
+            return False
+        # 仍有请求在处理时不退出（连接保持打开但没有请求不算活动）
+        with self._clients_lock:
+            if self._active:
+                return False
+        return time.monotonic() - self._last_activity > self.idle_exit
+
+    def _serve(self, conn: socket.socket) -> None:
+        with self._clients_lock:
+            self._clients += 1
+        try:
+            conn.settimeout(5.0)
+            if conn.recv(len(MAGIC), socket.MSG_WAITALL) != MAGIC:
+                return
+            conn.sendall(MAGIC)
+            conn.settimeout(None)
+            while self.running:
+                frame = read_frame(conn, MAX_REQUEST_BYTES)
+                if frame is None:
+                    return
+                request_id, payload = frame
+                self._touch()
+                with self._clients_lock:
+                    self._active += 1
+                try:
+                    request = json.loads(payload.decode("utf-8"))
+                    size = int(request.get("bytes") or 0)
+                    if not 0 <= size <= MAX_AUDIO_BYTES:
+                        raise ValueError("音频数据过大")
+                    data = b""
+                    if size:
+                        frame = read_frame(conn, MAX_AUDIO_BYTES)
+                        if frame is None or frame[0] != request_id or len(frame[1]) != size:
+                            raise FrameError("音频数据帧不完整")
+                        data = frame[1]
+                    response = self._dispatch(request, data)
+                except FrameError:
+                    raise
+                except Exception as exc:  # noqa: BLE001
+                    logger.error("处理请求失败: %s", exc, exc_info=True)
+                    response = {"success": False, "error": str(exc), "type": "transcription_error"}
+                finally:
+                    with self._clients_lock:
+                        self._active -= 1
+                self._touch()
+                payload = json.dumps(response, ensure_ascii=False, default=_json_default)
+                write_frame(conn, request_id, payload.encode("utf-8"))
+        except (OSError, FrameError) as exc:
+            logger.debug("客户端连接结束: %s", exc)
+        finally:
+            conn.close()
+            with self._clients_lock:
+                self._clients -= 1
+
+    def _dispatch(self, request: dict, data: bytes) -> dict:
+        req_type = request.get("type")
+        if req_type == "ping":
+            return {"pong": True, "ready": self._ready.is_set() and self.asr is not None}
+
+        if not self._ready.wait(timeout=300) or self.asr is None:
+            return {"success": False, "error": self._load_error or "ASR 模型未就绪", "type": "init_error"}
+
+        if req_type == "stats":
+            stats = self.asr.stats()
+            with self._clients_lock:
+                stats.update(success=True, clients=self._clients, pid=os.getpid())
+            return stats
+
+        import numpy as np
+
+        options = request.get("options")
+        trace = UtteranceTrace("daemon")
+        if req_type == "transcribe_samples":
+            dtype = request.get("dtype", "int16")
+            sample_rate = request.get("sample_rate")
+            if dtype not in _DTYPES or not isinstance(sample_rate, int) or sample_rate <= 0:
+                return {"success": False, "error": "音频参数无效", "type": "transcription_error"}
+            samples = np.frombuffer(data, dtype=dtype)
+            return self.asr.transcribe_samples(samples, sample_rate, options, trace=trace)
+
+        if req_type == "transcribe_batch":
+            audio = np.frombuffer(data, dtype=np.float32)
+            lengths = [int(n) for n in request.get("lengths", [])]
+            if sum(lengths) != audio.size:
+                return {"success": False, "error": "lengths 与音频长度不一致", "type": "transcription_error"}
+            offsets = np.cumsum([0] + lengths)
+            waveforms = [audio[offsets[i]:offsets[i + 1]] for i in range(len(lengths))]
+            return {"success": True, "results": self.asr.transcribe_batch(waveforms, options)}
+
+        if req_type == "transcribe_audio":
+            audio_path = request.get("audio_path")
+            if not audio_path:
+                return {"success": False, "error": "缺少 audio_path 参数", "type": "transcription_error"}
+            return self.asr.transcribe_audio(audio_path, options, trace=trace)
+
+        return {"success": False, "error": f"未知的请求类型: {req_type}", "type": "transcription_error"}
+
+    def stop(self, *_args) -> None:
+        self.running = False
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="VoCoType 常驻 ASR 守护进程")
+    parser.add_argument("--socket", default=ASR_DAEMON_SOCKET, help=f"Unix socket 路径（默认 {ASR_DAEMON_SOCKET}）")
+    parser.add_argument(
+        "--idle-exit",
+        type=float,
+        default=0.0,
+        help="空闲多少秒后退出（配合 systemd socket 激活使用，0 表示常驻）",
+    )
+    parser.add_argument("--debug", action="store_true", help="输出调试日志")
+    args = parser.parse_args()
+
+    setup_logging("DEBUG" if args.debug else "INFO")
+    daemon = ASRDaemon(args.socket, idle_exit=args.idle_exit)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    try:
+        daemon.run()
+    except Exception as exc:  # noqa: BLE001
+        logger.error("ASR 守护进程异常退出: %s", exc)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
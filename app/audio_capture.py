@@ -5,11 +5,13 @@ from __future__ import annotations
 import logging
 import queue
 import threading
-from typing import Optional
+from typing import Callable, Optional
 
 import numpy as np
 import sounddevice as sd
 
+from .pcm_buffer import PcmRingBuffer
+
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +21,14 @@ class AudioCaptureError(RuntimeError):
 
 
 class AudioCapture:
-    """Capture audio frames from the default (or configured) microphone."""
+    """Capture audio frames from the default (or configured) microphone.
+
+    hot_mic=True 时输入流在 open() 后保持常开：未录音期间音频写入预录环形缓冲区，
+    start() 时先把最近 preroll_ms 的音频放入队列，避免按键与开流延迟吞掉第一个字。
+
+    start(on_frame=...) 时音频块不经过队列，由音频回调直接交给 on_frame
+    （块是 PortAudio 缓冲区上的只读视图，on_frame 需自行拷贝，例如写入 PcmBuffer）。
+    """
 
     def __init__(
         self,
@@ -27,56 +36,110 @@ class AudioCapture:
         block_ms: int,
         device: Optional[str] = None,
         queue_size: int = 200,
+        hot_mic: bool = False,
+        preroll_ms: int = 0,
     ) -> None:
         self.sample_rate = sample_rate
         self.block_ms = block_ms
         self.device = device
+        self.hot_mic = hot_mic
         self._queue: "queue.Queue[np.ndarray]" = queue.Queue(maxsize=queue_size)
         self._stream: Optional[sd.RawInputStream] = None
         self._lock = threading.Lock()
         self._running = False
+        # 是否将音频帧送入队列（非热麦克风模式下与流的启停一致）
+        self._capturing = False
+        self._capture_lock = threading.Lock()
+        self._on_frame: Optional[Callable[[np.ndarray], None]] = None
 
         self._block_size = int(self.sample_rate * self.block_ms / 1000)
         if self._block_size <= 0:
             raise ValueError("block_ms too small for selected sample rate")
 
+        preroll_samples = int(self.sample_rate * max(preroll_ms, 0) / 1000)
+        self._preroll: Optional[PcmRingBuffer] = (
+            PcmRingBuffer(preroll_samples) if hot_mic and preroll_samples > 0 else None
+        )
+
     @property
     def queue(self) -> "queue.Queue[np.ndarray]":
         return self._queue
 
-    def start(self) -> None:
+    def open(self) -> None:
+        """热麦克风模式：提前打开输入流（只写入预录缓冲区，不入队）"""
+        if not self.hot_mic:
+            return
         with self._lock:
-            if self._running:
+            self._open_stream()
+
+    def start(self, on_frame: Optional[Callable[[np.ndarray], None]] = None) -> None:
+        with self._lock:
+            if self._capturing:
                 return
 
             self.flush()
-            self._stream = self._create_stream(self.device)
-            try:
-                self._stream.start()
-            except Exception:
-                self._stream.close()
-                self._stream = self._create_stream(self._fallback_device())
-                self._stream.start()
-
-            self._running = True
-            logger.info(
-                "音频采集已启动，采样率=%sHz，块大小=%s样本，设备=%s",
-                self.sample_rate,
-                self._block_size,
-                self._stream.device,
-            )
+            self._open_stream()
+            with self._capture_lock:
+                self._on_frame = on_frame
+                if self._preroll is not None:
+                    preroll = self._preroll.read_latest()
+                    self._preroll.clear()
+                    if preroll.size:
+                        self._deliver(preroll)
+                        logger.debug("已附加预录音频 %.0fms", preroll.size * 1000 / self.sample_rate)
+                self._capturing = True
 
     def stop(self) -> None:
         with self._lock:
-            if not self._running:
+            with self._capture_lock:
+                self._capturing = False
+                self._on_frame = None
+            if self.hot_mic:
+                # 热麦克风模式保持输入流常开，仅停止入队
                 return
+            self._close_stream()
 
-            assert self._stream is not None
-            self._stream.stop()
+    def close(self) -> None:
+        """关闭输入流（热麦克风模式下退出时调用）"""
+        with self._lock:
+            with self._capture_lock:
+                self._capturing = False
+                self._on_frame = None
+            self._close_stream()
+            if self._preroll is not None:
+                self._preroll.clear()
+
+    def _open_stream(self) -> None:
+        if self._running:
+            return
+
+        self._stream = self._create_stream(self.device)
+        try:
+            self._stream.start()
+        except Exception:
             self._stream.close()
-            self._stream = None
-            self._running = False
-            logger.info("音频采集已停止")
+            self._stream = self._create_stream(self._fallback_device())
+            self._stream.start()
+
+        self._running = True
+        logger.info(
+            "音频采集已启动，采样率=%sHz，块大小=%s样本，设备=%s%s",
+            self.sample_rate,
+            self._block_size,
+            self._stream.device,
+            "（热麦克风）" if self.hot_mic else "",
+        )
+
+    def _close_stream(self) -> None:
+        if not self._running:
+            return
+
+        assert self._stream is not None
+        self._stream.stop()
+        self._stream.close()
+        self._stream = None
+        self._running = False
+        logger.info("音频采集已停止")
 
     def flush(self) -> None:
         while not self._queue.empty():
@@ -118,6 +181,21 @@ class AudioCapture:
             logger.warning("音频流状态: %s", status)
 
         frame = np.frombuffer(in_data, dtype=np.int16)
+        with self._capture_lock:
+            if not self._capturing:
+                if self._preroll is not None:
+                    self._preroll.write(frame)
+                return
+            self._deliver(frame)
+
+    def _deliver(self, frame: np.ndarray) -> None:
+        """把音频块交给 on_frame 或放入队列（调用方持有 _capture_lock）"""
+        if self._on_frame is not None:
+            try:
+                self._on_frame(frame)
+            except Exception as exc:
+                logger.error("处理音频帧时出错: %s", exc)
+            return
         try:
             self._queue.put_nowait(frame.copy())
         except queue.Full:
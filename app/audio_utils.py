@@ -1,13 +1,21 @@
 """音频处理工具模块
 
 提供音频配置加载和重采样等通用功能，供 IBus 和 Fcitx5 共享使用。
+numpy 在用到时才导入，输入法进程只读取配置时不加载它。
 """
 from __future__ import annotations
 
 import logging
+import os
+import threading
+import wave
+from functools import lru_cache
+from math import gcd
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import numpy as np
+if TYPE_CHECKING:
+    import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +23,8 @@ logger = logging.getLogger(__name__)
 SAMPLE_RATE = 16000
 # 默认原生采样率
 DEFAULT_NATIVE_SAMPLE_RATE = 44100
+# 热麦克风默认预录时长（毫秒）
+DEFAULT_PREROLL_MS = 300
 
 
 def load_audio_config() -> tuple[int | None, int]:
@@ -43,20 +53,366 @@ def load_audio_config() -> tuple[int | None, int]:
         return None, DEFAULT_NATIVE_SAMPLE_RATE
 
 
+def load_hot_mic_config() -> tuple[bool, int]:
+    """从配置文件加载热麦克风设置
+
+    audio.conf 的 [audio] 段中 hot_mic = true 时输入流常开，
+    按下 PTT 时附加之前 preroll_ms 毫秒的预录音频。
+
+    Returns:
+        (hot_mic, preroll_ms): 是否启用热麦克风（默认关闭）和预录时长
+    """
+    config_file = Path.home() / ".config" / "vocotype" / "audio.conf"
+    if not config_file.exists():
+        return False, DEFAULT_PREROLL_MS
+
+    try:
+        import configparser
+        config = configparser.ConfigParser()
+        config.read(config_file)
+
+        hot_mic = config.getboolean('audio', 'hot_mic', fallback=False)
+        preroll_ms = config.getint('audio', 'preroll_ms', fallback=DEFAULT_PREROLL_MS)
+        if hot_mic:
+            logger.info("热麦克风已启用: 预录 %dms", preroll_ms)
+        return hot_mic, max(preroll_ms, 0)
+    except Exception as e:
+        logger.warning("读取热麦克风配置失败: %s，保持关闭", e)
+        return False, DEFAULT_PREROLL_MS
+
+
+# 声卡设备节点目录，热插拔时其中的节点增删会改变目录 mtime
+_SOUND_DEVICE_DIR = "/dev/snd"
+
+# (配置设备, 配置采样率) -> (协商出的设备, 采样率)
+_input_settings_cache: dict[tuple[int | None, int | None], tuple[int | None, int]] = {}
+_input_settings_stamp: int | None = None
+_input_settings_lock = threading.Lock()
+
+
+def _sound_devices_stamp() -> int | None:
+    try:
+        return os.stat(_SOUND_DEVICE_DIR).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _find_input_device(sd, device: int | None) -> int | None:
+    """选择可用的输入设备，优先使用显式配置"""
+    if device is not None:
+        try:
+            info = sd.query_devices(device)
+            if info.get("max_input_channels", 0) > 0:
+                return device
+            logger.warning("设备 %s 无输入通道，回退选择输入设备", device)
+        except Exception as exc:
+            logger.warning("查询设备 %s 失败: %s", device, exc)
+
+    try:
+        devices = sd.query_devices()
+        for idx, info in enumerate(devices):
+            if info.get("max_input_channels", 0) > 0:
+                logger.info("回退至输入设备 #%s (%s)", idx, info.get("name", "unknown"))
+                return idx
+    except Exception as exc:
+        logger.warning("查询输入设备列表失败: %s", exc)
+
+    return None
+
+
+def _find_sample_rate(sd, device: int | None, preferred: int | None) -> int:
+    """选择可用采样率：优先 16kHz（免去重采样），其次配置值，最后设备默认值"""
+    candidates = [SAMPLE_RATE]
+    if preferred and preferred != SAMPLE_RATE:
+        candidates.append(preferred)
+    for rate in candidates:
+        try:
+            sd.check_input_settings(device=device, samplerate=rate, channels=1, dtype="int16")
+            return rate
+        except Exception:
+            pass
+
+    try:
+        info = sd.query_devices(device if device is not None else None, kind="input")
+        default_sr = int(info.get("default_samplerate", 0)) if info else 0
+        if default_sr:
+            sd.check_input_settings(device=device, samplerate=default_sr, channels=1, dtype="int16")
+            return default_sr
+    except Exception:
+        pass
+
+    return preferred or SAMPLE_RATE
+
+
+def resolve_input_settings(device: int | None, preferred_rate: int | None) -> tuple[int | None, int]:
+    """协商输入设备与采样率，结果在进程内缓存
+
+    首次调用时枚举 PortAudio 设备并检查采样率，之后直接返回缓存结果，避免每次按下 PTT
+    都遍历所有 host API。声卡热插拔（/dev/snd 变化）或调用
+    invalidate_input_settings() 后重新协商。
+
+    Args:
+        device: 配置的设备 ID（None 表示自动选择）
+        preferred_rate: 配置的采样率
+
+    Returns:
+        (device, sample_rate): 实际使用的设备 ID 和采样率
+    """
+    global _input_settings_stamp
+
+    key = (device, preferred_rate)
+    stamp = _sound_devices_stamp()
+    with _input_settings_lock:
+        if stamp != _input_settings_stamp:
+            if _input_settings_cache:
+                logger.info("检测到音频设备变化，重新协商输入设备")
+            _input_settings_cache.clear()
+            _input_settings_stamp = stamp
+        cached = _input_settings_cache.get(key)
+        if cached is not None:
+            return cached
+
+        import sounddevice as sd
+
+        resolved_device = _find_input_device(sd, device)
+        sample_rate = _find_sample_rate(sd, resolved_device, preferred_rate)
+        _input_settings_cache[key] = (resolved_device, sample_rate)
+        logger.info("输入设备协商结果: 设备=%s, 采样率=%d", resolved_device, sample_rate)
+        return resolved_device, sample_rate
+
+
+def invalidate_input_settings(reason: object = None) -> None:
+    """丢弃已协商的输入设置（打开输入流出现 PortAudio 错误时调用）"""
+    with _input_settings_lock:
+        if _input_settings_cache:
+            logger.info("清除输入设备缓存: %s", reason)
+        _input_settings_cache.clear()
+
+
+# 重采样滤波器参数：每侧过零点数、截止频率相对奈奎斯特频率的比例、Kaiser 窗 beta
+_RESAMPLE_ZEROS = 12
+_RESAMPLE_ROLLOFF = 0.9
+_RESAMPLE_BETA = 8.0
+# 一次计算的输出样本数上限，限制临时数组大小
+_RESAMPLE_CHUNK = 65536
+# 每个相位至少有这么多输出时按相位做步进矩阵乘，否则逐样本收集（流式小块）
+_RESAMPLE_MIN_PHASE_ROWS = 16
+
+
+@lru_cache(maxsize=8)
+def _polyphase_filter(up: int, down: int) -> tuple[np.ndarray, int]:
+    """设计 up/down 有理比例的 Kaiser 窗 sinc 多相滤波器组
+
+    Returns:
+        (taps, half): taps 形状为 (up, 2*half)，第 p 行对应输出位置小数部分为 p/up 的相位；
+        输出样本 n 使用输入 [n*down//up - half + 1, n*down//up + half] 区间
+    """
+    import numpy as np
+
+    # 截止频率（周期/输入样本），降采样时取输出奈奎斯特频率以抗混叠
+    cutoff = 0.5 * min(1.0, up / down) * _RESAMPLE_ROLLOFF
+    half_width = _RESAMPLE_ZEROS / (2.0 * cutoff)
+    half = int(np.ceil(half_width))
+
+    offsets = np.arange(1 - half, half + 1, dtype=np.float64)
+    phases = np.arange(up, dtype=np.float64)[:, None] / up
+    distance = offsets[None, :] - phases
+    window = np.i0(_RESAMPLE_BETA * np.sqrt(np.clip(1.0 - (distance / half_width) ** 2, 0.0, 1.0)))
+    window /= np.i0(_RESAMPLE_BETA)
+    window[np.abs(distance) > half_width] = 0.0
+    taps = 2.0 * cutoff * np.sinc(2.0 * cutoff * distance) * window
+    # 每个相位的直流增益归一化为 1
+    taps /= taps.sum(axis=1, keepdims=True)
+    return taps.astype(np.float32), half
+
+
+class StreamingResampler:
+    """多相 FIR 重采样器，可逐块处理（保留块间滤波器状态）
+
+    常见的 44100/48000 → 16000 比例的滤波器组会被缓存，逐块调用与整段调用结果一致，
+    流式识别中 20ms 的小块也不会在块边界产生失真。
+    """
+
+    def __init__(self, orig_sr: int, target_sr: int) -> None:
+        import numpy as np
+
+        g = gcd(int(orig_sr), int(target_sr))
+        self.orig_sr = orig_sr
+        self.target_sr = target_sr
+        self._up = int(target_sr) // g
+        self._down = int(orig_sr) // g
+        self._taps, self._half = _polyphase_filter(self._up, self._down)
+        # 尚需保留的输入样本；_offset 为 _buf[0] 的绝对位置（起始前补 half 个零）
+        self._buf = np.zeros(self._half, dtype=np.float32)
+        self._offset = -self._half
+        self._total_in = 0
+        self._next_out = 0
+
+    def process(self, block: np.ndarray, final: bool = False) -> np.ndarray:
+        """送入一块 float32 单声道音频，返回目前可以计算的输出样本
+
+        Args:
+            block: 输入音频块
+            final: 是否为最后一块（补零并输出全部剩余样本）
+        """
+        import numpy as np
+
+        block = np.asarray(block, dtype=np.float32).reshape(-1)
+        parts = [self._buf, block]
+        self._total_in += block.size
+        if final:
+            parts.append(np.zeros(self._half, dtype=np.float32))
+            end = -(-self._total_in * self._up // self._down)
+        else:
+            # 输出 n 需要输入到 n*down//up + half 为止
+            last_base = self._total_in - 1 - self._half
+            end = -(-(last_base + 1) * self._up // self._down) if last_base >= 0 else 0
+        buf = np.concatenate(parts) if block.size or final else self._buf
+
+        start = self._next_out
+        if end <= start:
+            self._buf = buf
+            return np.zeros(0, dtype=np.float32)
+
+        out = np.empty(end - start, dtype=np.float32)
+        for chunk_start in range(start, end, _RESAMPLE_CHUNK):
+            chunk_end = min(chunk_start + _RESAMPLE_CHUNK, end)
+            out[chunk_start - start:chunk_end - start] = self._compute(buf, chunk_start, chunk_end)
+
+        self._next_out = end
+        # 丢弃后续输出不再需要的输入
+        keep_from = end * self._down // self._up - self._half + 1 - self._offset
+        if keep_from > 0:
+            buf = buf[keep_from:].copy()
+            self._offset += keep_from
+        self._buf = buf
+        return out
+
+    def _compute(self, buf: np.ndarray, start: int, end: int) -> np.ndarray:
+        import numpy as np
+
+        width = 2 * self._half
+        count = end - start
+        if count >= self._up * _RESAMPLE_MIN_PHASE_ROWS:
+            # 同一相位的输出在输入上等距分布：滑动窗口视图上的步进矩阵乘，无需收集拷贝
+            windows = np.lib.stride_tricks.sliding_window_view(buf, width)
+            out = np.empty(count, dtype=np.float32)
+            for r in range(self._up):
+                n0 = start + r
+                rows = len(range(n0, end, self._up))
+                first = n0 * self._down // self._up - self._half + 1 - self._offset
+                phase = (n0 * self._down) % self._up
+                out[r::self._up] = (
+                    windows[first:first + self._down * (rows - 1) + 1:self._down] @ self._taps[phase]
+                )
+            return out
+
+        n = np.arange(start, end, dtype=np.int64)
+        first = n * self._down // self._up - self._half + 1 - self._offset
+        phases = (n * self._down) % self._up
+        frames = buf[first[:, None] + np.arange(width)]
+        return np.einsum("ij,ij->i", frames, self._taps[phases])
+
+
 def resample_audio(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
     """重采样音频到目标采样率
 
+    使用带抗混叠低通的多相 FIR 滤波器（见 StreamingResampler）。
+
     Args:
-        audio: 原始音频数据
+        audio: 原始音频数据（int16 或 float32）
         orig_sr: 原始采样率
         target_sr: 目标采样率
 
     Returns:
-        重采样后的音频数据
+        重采样后的音频数据，dtype 与输入一致
     """
+    import numpy as np
+
     if orig_sr == target_sr:
         return audio
-    duration = len(audio) / orig_sr
-    target_length = int(duration * target_sr)
-    indices = np.linspace(0, len(audio) - 1, target_length)
-    return np.interp(indices, np.arange(len(audio)), audio.astype(np.float32)).astype(np.int16)
+    audio = np.asarray(audio)
+    resampled = StreamingResampler(orig_sr, target_sr).process(audio.reshape(-1), final=True)
+    if np.issubdtype(audio.dtype, np.integer):
+        info = np.iinfo(audio.dtype)
+        return np.clip(np.rint(resampled), info.min, info.max).astype(audio.dtype)
+    return resampled.astype(audio.dtype, copy=False)
+
+
+def pcm_to_waveform(
+    samples,
+    sample_rate: int,
+    target_sr: int = SAMPLE_RATE,
+    resampler: StreamingResampler | None = None,
+) -> np.ndarray:
+    """将录音 PCM 数据转换为 target_sr 单声道 float32 波形（[-1, 1]），多声道取第一声道
+
+    逐块转换时传入 StreamingResampler，以保留块间的滤波器状态。
+    """
+    import numpy as np
+
+    audio = np.asarray(samples)
+    if audio.ndim > 1:
+        audio = audio[:, 0]
+
+    if np.issubdtype(audio.dtype, np.integer):
+        waveform = audio.astype(np.float32) / 32768.0
+    else:
+        waveform = audio.astype(np.float32, copy=False)
+
+    if resampler is not None:
+        return resampler.process(waveform)
+    if sample_rate != target_sr:
+        waveform = resample_audio(waveform, sample_rate, target_sr)
+    return waveform
+
+
+def load_audio_file(path: str | Path, target_sr: int = SAMPLE_RATE) -> np.ndarray:
+    """读取音频文件为 target_sr 单声道 float32 波形（[-1, 1]），多声道取平均
+
+    PCM WAV 用标准库 wave 直接解析，其他格式交给 soundfile；
+    两者都不导入 librosa（及其 numba/scipy 依赖链）。
+    """
+    import numpy as np
+
+    try:
+        waveform, sample_rate = _read_pcm_wav(path)
+    except (wave.Error, EOFError):
+        # 非 PCM WAV（浮点 WAV、FLAC 等）
+        import soundfile as sf
+
+        data, sample_rate = sf.read(str(path), dtype="float32", always_2d=True)
+        waveform = data.mean(axis=1, dtype=np.float32) if data.shape[1] > 1 else data[:, 0]
+
+    if sample_rate != target_sr:
+        waveform = resample_audio(waveform, sample_rate, target_sr)
+    return waveform
+
+
+def _read_pcm_wav(path: str | Path) -> tuple[np.ndarray, int]:
+    import numpy as np
+
+    with wave.open(str(path), "rb") as wf:
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        sample_rate = wf.getframerate()
+        raw = wf.readframes(wf.getnframes())
+
+    if width == 1:
+        # 8-bit WAV 为无符号
+        audio = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        audio = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = (b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)) << 8 >> 8
+        audio = ints.astype(np.float32) / 8388608.0
+    elif width == 4:
+        audio = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise wave.Error(f"unsupported sample width: {width}")
+
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    return audio, sample_rate
+
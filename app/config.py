@@ -17,6 +17,9 @@ DEFAULT_CONFIG: Dict[str, Any] = {
         # 单次录音的最大大小（字节），默认20MB
         # 达到此限制后将自动停止录音并开始转录
         "max_session_bytes": 20 * 1024 * 1024,
+        # 热麦克风：输入流常开并保留按键前 preroll_ms 的音频（默认关闭，麦克风仅在录音时打开）
+        "hot_mic": False,
+        "preroll_ms": 300,
     },
     "vad": {
         "start_threshold": 0.02,
@@ -139,13 +139,8 @@ if __name__ == "__main__":
         sys.exit(1)
 
 
-def get_model_cache_path(model_name, revision):
-    """
-    离线优先获取模型路径
-    1. 先检查本地缓存是否存在且完整
-    2. 如果本地存在，直接返回路径（避免联网）
-    3. 如果不存在，才调用 snapshot_download 进行下载
-    """
+def local_model_path(model_name):
+    """返回本地缓存中的模型目录（不联网），不存在时返回 None"""
     from pathlib import Path
 
     # 构建本地缓存路径（与Rust端保持一致）
@@ -156,15 +151,24 @@ def get_model_cache_path(model_name, revision):
     short_name = model_name.split('/')[-1] if '/' in model_name else model_name
     model_dir = cache_base / short_name
 
+    # 只要有一个模型文件存在，就认为缓存有效
+    if (model_dir / "model_quant.onnx").exists() or (model_dir / "model.onnx").exists():
+        return str(model_dir)
+    return None
+
+
+def get_model_cache_path(model_name, revision):
+    """
+    离线优先获取模型路径
+    1. 先检查本地缓存是否存在且完整
+    2. 如果本地存在，直接返回路径（避免联网）
+    3. 如果不存在，才调用 snapshot_download 进行下载
+    """
     # 检查模型是否已缓存
-    if model_dir.exists():
-        quant_file = model_dir / "model_quant.onnx"
-        base_file = model_dir / "model.onnx"
-
-        # 只要有一个模型文件存在，就认为缓存有效
-        if quant_file.exists() or base_file.exists():
-            logger.info(f"使用本地缓存模型: {model_dir}")
-            return str(model_dir)
+    model_dir = local_model_path(model_name)
+    if model_dir is not None:
+        logger.info(f"使用本地缓存模型: {model_dir}")
+        return model_dir
 
     # 本地不存在，需要下载
     logger.info(f"本地缓存不存在，开始下载模型: {model_name}")
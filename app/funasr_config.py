@@ -10,6 +10,43 @@ import os
 # 模型版本，可通过环境变量覆盖
 MODEL_REVISION = os.environ.get("FUNASR_MODEL_REVISION", "v2.0.5")
 
+# 流式识别模式：
+#   off（默认）：松开 F9 后整段识别
+#   online：按住期间用 paraformer-online 边录边识别
+#   vad：按住期间用流式 VAD 切句，每句结束即交给离线 ASR 识别，松开时拼接结果
+
+STREAMING_MODE = os.environ.get("FUNASR_STREAMING_MODE", "off").strip().lower()
+
+# ONNX Runtime 优化图缓存：首次加载时保存优化后的模型，之后直接加载以缩短冷启动
+ORT_CACHE = os.environ.get("FUNASR_ORT_CACHE", "true").strip().lower() not in ("0", "false", "no")
+ORT_CACHE_DIR = os.environ.get(
+    "FUNASR_ORT_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "modelscope", "hub", "vocotype-ort"),
+)
+# CPU 内存池（funasr_onnx 默认关闭；开启后推理更快但常驻内存更高）
+ORT_CPU_MEM_ARENA = os.environ.get("FUNASR_ORT_CPU_MEM_ARENA", "false").strip().lower() in ("1", "true", "yes")
+# 模型权重只读内存映射：优化图缓存的权重另存为外部数据文件（.onnx.data）并以 mmap 加载，
+# IBus、Fcitx5 Backend、setup-audio 等进程共享同一份页缓存；同时关闭权重预打包
+# （预打包会复制出进程私有的权重），单次推理略慢
+MMAP_WEIGHTS = os.environ.get("FUNASR_MMAP_WEIGHTS", "false").strip().lower() in ("1", "true", "yes")
+
+# 标点恢复结果缓存：按原始文本缓存的条目数（0 关闭），短确认语（"好的"、"收到"）高度重复
+PUNC_CACHE_SIZE = int(os.environ.get("FUNASR_PUNC_CACHE_SIZE", "512"))
+# 原始文本不超过该字数时跳过标点模型直接输出（0 关闭）
+PUNC_BYPASS_CHARS = int(os.environ.get("FUNASR_PUNC_BYPASS_CHARS", "0"))
+
+# 进程内共享模型（app.model_registry）无人使用多少秒后释放（0 立即释放，负数常驻）
+MODEL_IDLE_UNLOAD_S = float(os.environ.get("FUNASR_MODEL_IDLE_UNLOAD_S", "300"))
+
+# 常驻 ASR 守护进程（app.asr_daemon）：
+#   auto（默认）：守护进程可连接时使用，否则在本进程内加载模型
+#   require：必须使用守护进程；off：始终在本进程内加载
+ASR_DAEMON_MODE = os.environ.get("VOCOTYPE_ASR_DAEMON", "auto").strip().lower()
+ASR_DAEMON_SOCKET = os.environ.get(
+    "VOCOTYPE_ASR_SOCKET",
+    os.path.join(os.environ.get("XDG_RUNTIME_DIR") or "/tmp", f"vocotype-asr-{os.getuid()}.sock"),
+)
+
 # 模型配置（默认使用 ONNX 版本，仍可通过环境变量覆盖）
 MODELS = {
     "asr": {
@@ -33,12 +70,20 @@ MODELS = {
         ),
         "type": "punc",
     },
+    # 流式 ASR 模型，仅在 STREAMING_MODE=online 时加载
+    "asr_online": {
+        "name": os.environ.get(
+            "FUNASR_ASR_ONLINE_MODEL",
+            "iic/speech_paraformer-large_asr_nat-zh-cn-16k-common-vocab8404-online-onnx",
+        ),
+        "type": "asr_online",
+    },
 }
 
 # 获取模型列表（用于下载脚本）
 def get_models_for_download():
     """返回用于下载的模型配置列表"""
-    return [
+    models = [
         {
             "name": MODELS["asr"]["name"],
             "type": "asr",
@@ -52,4 +97,12 @@ def get_models_for_download():
             "type": "punc",
         },
     ]
+    if STREAMING_MODE == "online":
+        models.append(
+            {
+                "name": MODELS["asr_online"]["name"],
+                "type": "asr_online",
+            }
+        )
+    return models
 
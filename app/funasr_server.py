@@ -6,6 +6,8 @@ FunASR模型服务器
 """
 
 import argparse
+import importlib
+import importlib.util
 import json
 import logging
 import traceback
@@ -15,29 +17,79 @@ import sys
 import warnings
 import time
 import threading
-import tempfile
+import types
+from contextlib import contextmanager
+from functools import lru_cache
 
 # 过滤掉 jieba 的 pkg_resources 弃用警告
 warnings.filterwarnings("ignore", category=UserWarning, module="jieba._compat")
 
+from app.thread_budget import get_thread_plan, model_scope
+
 # 在导入任何深度学习库之前设置环境变量
-os.environ.setdefault("OMP_NUM_THREADS", "8")  # ONNX 推理并行线程数，可提升速度
+# ONNX 推理并行线程数：按 CPU 拓扑与 cgroup 配额分配（显式设置的 OMP_NUM_THREADS 作为上限）
+os.environ.setdefault("OMP_NUM_THREADS", str(get_thread_plan().threads_for("asr")))
 # 默认使用 CPU 进行推理；如需使用 GPU，可在外部设置环境变量 FUNASR_DEVICE=cuda:0
 os.environ.setdefault("FUNASR_DEVICE", "cpu")
 
-from app.funasr_config import MODEL_REVISION, MODELS
+from app.funasr_config import (
+    MMAP_WEIGHTS,
+    MODEL_REVISION,
+    MODELS,
+    ORT_CACHE,
+    PUNC_BYPASS_CHARS,
+    PUNC_CACHE_SIZE,
+    STREAMING_MODE,
+)
 from app.download_models import get_model_cache_path
 from app.logging_config import setup_logging
+from app import paraformer_batch
+from app.trace import UtteranceTrace
 
 
 logger = logging.getLogger(__name__)
 
+# 模型输入采样率（Paraformer / Fsmn_vad 均为 16kHz）
+ASR_SAMPLE_RATE = 16000
+# paraformer-online 分块配置 [左看, 当前块, 右看]，单位 60ms 帧：当前块 600ms
+STREAM_CHUNK_SIZE = (5, 10, 5)
+
+
+@contextmanager
+def _librosa_placeholder():
+    """导入 funasr_onnx 期间用占位模块满足其顶层的 import librosa
+
+    funasr_onnx 各模型模块在顶层 import librosa，但只在传入文件路径时才调用（本项目从不这样调用）。
+    作用域内 sys.modules 中的 librosa 是占位模块，首次访问属性时才导入真正的 librosa；
+    退出作用域时把占位模块移出 sys.modules，之后其他代码 import librosa 得到的仍是真正的安装。
+    """
+    if "librosa" in sys.modules or importlib.util.find_spec("librosa") is None:
+        yield
+        return
+
+    placeholder = types.ModuleType("librosa")
+
+    def load(attr):
+        if sys.modules.get("librosa") is placeholder:
+            del sys.modules["librosa"]
+        return getattr(importlib.import_module("librosa"), attr)
+
+    placeholder.__getattr__ = load
+    sys.modules["librosa"] = placeholder
+    try:
+        yield
+    finally:
+        if sys.modules.get("librosa") is placeholder:
+            del sys.modules["librosa"]
+
 
 class FunASRServer:
     def __init__(self):
         self.asr_model = None
         self.vad_model = None
         self.punc_model = None
+        self.asr_online_model = None
+        self.vad_online_model = None
         self.initialized = False
         self.running = True
         self.transcription_count = 0  # 转录计数器
@@ -50,6 +102,20 @@ class FunASRServer:
             "vad": MODELS["vad"]["name"],
             "punc": MODELS["punc"]["name"],
         }
+        self.online_model_name = MODELS["asr_online"]["name"]
+        self.streaming_mode = STREAMING_MODE
+        # 流式模型（paraformer-online / Fsmn_vad_online）的前端带有内部状态，
+        # 同一时刻只能服务一个流式会话
+        self._stream_lock = threading.Lock()
+        # 可选模型的加载完成事件（名称 -> Event）与加载耗时
+        self._model_events = {}
+        self._model_state_lock = threading.Lock()
+        self.model_load_times = {}
+        # 标点恢复结果 LRU 缓存（键为原始文本；lru_cache 自带线程安全与命中统计）
+        self._punc_cached = (
+            lru_cache(maxsize=PUNC_CACHE_SIZE)(self._run_punc) if PUNC_CACHE_SIZE > 0 else self._run_punc
+        )
+        self.punc_bypassed = 0
 
         self.device = self._select_device()
         logger.info(
@@ -88,6 +154,14 @@ class FunASRServer:
             if self.punc_model is not None:
                 logger.debug("释放标点模型")
                 self.punc_model = None
+
+            if self.asr_online_model is not None:
+                logger.debug("释放流式 ASR 模型")
+                self.asr_online_model = None
+
+            if self.vad_online_model is not None:
+                logger.debug("释放流式 VAD 模型")
+                self.vad_online_model = None
             
             # 执行最后一次内存清理（包括 gc.collect 强制回收）
             self._cleanup_memory()
@@ -116,174 +190,149 @@ class FunASRServer:
 
         return "cpu"
 
-    def _load_asr_model(self):
-        """加载ASR模型"""
+    def _device_id(self):
+        """funasr_onnx 加载器的 device_id：CPU 为 -1，cuda:N 取 N"""
+        if self.device and "cuda" in self.device:
+            try:
+                return int(self.device.split(":")[-1])
+            except Exception:
+                return 0
+        return -1
+
+    def _load_model(self, loader, name, model_name, label, parts=("model",), **kwargs):
+        """下载并加载一个 funasr_onnx 模型，失败时返回 None
+
+        Args:
+            loader: funasr_onnx 加载器类（由各 _load_*_model 在调用时导入）
+            name: app.thread_budget 中的模型名，决定线程数与绑核的核心
+            model_name: ModelScope 模型名
+            label: 日志中的模型名称
+            parts: 模型目录中必需的 ONNX 文件（不含扩展名）；全部有 *_quant.onnx 时使用量化模型
+            **kwargs: 传给加载器的其他参数
+        """
         try:
-            model_name_lower = str(self.model_names["asr"]).lower()
-            
-            # 如果是 ONNX 模型，使用 funasr_onnx 专用加载器
-            if "onnx" in model_name_lower:
-                from funasr_onnx.paraformer_bin import Paraformer
+            logger.info("开始加载%s ONNX模型: %s", label, model_name)
+            try:
+                model_dir = get_model_cache_path(model_name, self.model_revision)
+            except Exception as e:
+                logger.error("下载 %s ONNX 模型失败: %s", label, e)
+                return None
 
-                logger.info("开始加载ASR ONNX模型: %s", self.model_names["asr"])
-                try:
-                    model_dir = get_model_cache_path(
-                        self.model_names["asr"],
-                        self.model_revision
-                    )
-                except Exception as e:
-                    logger.error("下载 ASR ONNX 模型失败: %s", e)
-                    return False
+            # 基本完整性校验，优先使用量化模型
+            def has_files(suffix):
+                return all(os.path.exists(os.path.join(model_dir, f"{part}{suffix}.onnx")) for part in parts)
 
-                # 基本完整性校验，优先使用量化模型
-                quant_file = os.path.join(model_dir, "model_quant.onnx")
-                base_file = os.path.join(model_dir, "model.onnx")
+            if has_files("_quant"):
+                use_quantize = True
+            elif has_files(""):
                 use_quantize = False
-                if os.path.exists(quant_file):
-                    use_quantize = True
-                elif not os.path.exists(base_file):
-                    logger.error("ASR 模型目录缺少 model.onnx: %s", model_dir)
-                    return False
-
-                device_id = -1  # CPU
-                if self.device and "cuda" in self.device:
-                    try:
-                        device_id = int(self.device.split(":")[-1])
-                    except Exception:
-                        device_id = 0
-                
-                # 性能优化参数
-                num_threads = int(os.environ.get("OMP_NUM_THREADS", "8"))
-
-                self.asr_model = Paraformer(
+                # app.quantize_models 只处理 asr / vad / punc 的模型目录（流式 VAD 与离线 VAD 共用）
+                quantizable = model_name in (self.model_names[t] for t in ("asr", "vad", "punc"))
+                logger.info(
+                    "%s 模型目录没有 %s，使用 fp32 模型%s",
+                    label,
+                    "/".join(f"{part}_quant.onnx" for part in parts),
+                    "（可运行 python -m app.quantize_models 生成量化模型）" if quantizable else "",
+                )
+            else:
+                logger.error("%s 模型目录缺少 %s: %s", label, "/".join(f"{part}.onnx" for part in parts), model_dir)
+                return None
+
+            # 性能优化参数（线程数见 app.thread_budget）
+            with model_scope(name):
+                model = loader(
                     str(model_dir),
                     batch_size=1,
-                    device_id=device_id,
+                    device_id=self._device_id(),
                     quantize=use_quantize,
-                    intra_op_num_threads=num_threads,  # 线程并行加速
+                    intra_op_num_threads=get_thread_plan().threads_for(name),
+                    **kwargs,
                 )
-                logger.info("ASR ONNX模型加载完成")
-                return True
-            else:
-                logger.error("仅支持 ONNX 模型加载，当前模型名称: %s", self.model_names["asr"]) 
-                return False
-                
+            logger.info("%s ONNX模型加载完成", label)
+            return model
         except Exception as e:
-            logger.error(f"ASR模型加载失败: {str(e)}")
+            logger.error("%s模型加载失败: %s", label, e)
             logger.debug(traceback.format_exc())
-            self.asr_model = None
+            return None
+
+    def _load_asr_model(self):
+        """加载ASR模型"""
+        # 如果是 ONNX 模型，使用 funasr_onnx 专用加载器
+        if "onnx" not in str(self.model_names["asr"]).lower():
+            logger.error("仅支持 ONNX 模型加载，当前模型名称: %s", self.model_names["asr"])
             return False
+        from funasr_onnx.paraformer_bin import Paraformer
+
+        self.asr_model = self._load_model(Paraformer, "asr", self.model_names["asr"], "ASR")
+        return self.asr_model is not None
 
     def _load_vad_model(self):
         """加载VAD模型（使用 funasr_onnx 专用加载器）"""
-        try:
-            from funasr_onnx.vad_bin import Fsmn_vad
+        from funasr_onnx.vad_bin import Fsmn_vad
 
-            logger.info("开始加载VAD ONNX模型: %s", self.model_names["vad"])
-            try:
-                model_dir = get_model_cache_path(
-                    self.model_names["vad"],
-                    self.model_revision
-                )
-            except Exception as e:
-                logger.error("下载 VAD ONNX 模型失败: %s", e)
-                return False
-
-            quant_file = os.path.join(model_dir, "model_quant.onnx")
-            base_file = os.path.join(model_dir, "model.onnx")
-            use_quantize = False
-            if os.path.exists(quant_file):
-                use_quantize = True
-            elif not os.path.exists(base_file):
-                logger.error("VAD 模型目录缺少 model.onnx: %s", model_dir)
-                return False
-
-            device_id = -1  # CPU
-            if self.device and "cuda" in self.device:
-                try:
-                    device_id = int(self.device.split(":")[-1])
-                except Exception:
-                    device_id = 0
-            
-            num_threads = int(os.environ.get("OMP_NUM_THREADS", "8"))
-
-            self.vad_model = Fsmn_vad(
-                str(model_dir),
-                batch_size=1,
-                device_id=device_id,
-                quantize=use_quantize,
-                intra_op_num_threads=num_threads,
-            )
-            logger.info("VAD ONNX模型加载完成")
-            return True
-        except Exception as e:
-            logger.error(f"VAD模型加载失败: {str(e)}")
-            logger.debug(traceback.format_exc())
-            self.vad_model = None
-            return False
+        self.vad_model = self._load_model(Fsmn_vad, "vad", self.model_names["vad"], "VAD")
+        return self.vad_model is not None
 
     def _load_punc_model(self):
         """加载标点恢复模型（使用 funasr_onnx 专用加载器）"""
-        try:
-            from funasr_onnx.punc_bin import CT_Transformer
+        from funasr_onnx.punc_bin import CT_Transformer
+
+        self.punc_model = self._load_model(CT_Transformer, "punc", self.model_names["punc"], "标点恢复")
+        return self.punc_model is not None
+
+    def _load_asr_online_model(self):
+        """加载流式ASR模型（paraformer-online，使用 funasr_onnx 专用加载器）"""
+        from funasr_onnx.paraformer_online_bin import Paraformer as ParaformerOnline
+
+        # 流式模型由 encoder(model*.onnx) 与 decoder(decoder*.onnx) 两部分组成
+        self.asr_online_model = self._load_model(
+            ParaformerOnline,
+            "asr_online",
+            self.online_model_name,
+            "流式ASR",
+            parts=("model", "decoder"),
+            chunk_size=list(STREAM_CHUNK_SIZE),
+        )
+        return self.asr_online_model is not None
 
-            logger.info("开始加载标点恢复 ONNX模型: %s", self.model_names["punc"])
-            try:
-                model_dir = get_model_cache_path(
-                    self.model_names["punc"],
-                    self.model_revision
-                )
-            except Exception as e:
-                logger.error("下载 标点 ONNX 模型失败: %s", e)
-                return False
+    def _load_vad_online_model(self):
+        """加载流式VAD模型（与离线 VAD 共用模型文件，使用 Fsmn_vad_online 加载器）"""
+        from funasr_onnx.vad_bin import Fsmn_vad_online
 
-            quant_file = os.path.join(model_dir, "model_quant.onnx")
-            base_file = os.path.join(model_dir, "model.onnx")
-            use_quantize = False
-            if os.path.exists(quant_file):
-                use_quantize = True
-            elif not os.path.exists(base_file):
-                logger.error("标点模型目录缺少 model.onnx: %s", model_dir)
-                return False
+        self.vad_online_model = self._load_model(
+            Fsmn_vad_online, "vad_online", self.model_names["vad"], "流式VAD"
+        )
+        return self.vad_online_model is not None
 
-            device_id = -1  # CPU
-            if self.device and "cuda" in self.device:
-                try:
-                    device_id = int(self.device.split(":")[-1])
-                except Exception:
-                    device_id = 0
-            
-            num_threads = int(os.environ.get("OMP_NUM_THREADS", "8"))
-
-            self.punc_model = CT_Transformer(
-                str(model_dir),
-                batch_size=1,
-                device_id=device_id,
-                quantize=use_quantize,
-                intra_op_num_threads=num_threads,
-            )
-            logger.info("标点恢复 ONNX模型加载完成")
-            return True
-        except Exception as e:
-            logger.error(f"标点恢复模型加载失败: {str(e)}")
-            logger.debug(traceback.format_exc())
-            self.punc_model = None
-            return False
+    # 可选模型：名称 -> (模型属性, 加载方法, 日志名)
+    _OPTIONAL_MODELS = {
+        "vad": ("vad_model", "_load_vad_model", "VAD"),
+        "punc": ("punc_model", "_load_punc_model", "标点恢复"),
+        "asr_online": ("asr_online_model", "_load_asr_online_model", "流式ASR"),
+        "vad_online": ("vad_online_model", "_load_vad_online_model", "流式VAD"),
+    }
+
+    def initialize(self, wait_optional=False):
+        """初始化FunASR模型（分阶段就绪）
+
+        ASR 与可选模型（VAD、标点、流式模型）并行加载，但只等待 ASR：ASR 加载完成即返回，
+        此时已可转录，可选模型就绪前输出不带标点 / 不经 VAD 的文本。
 
-    def initialize(self):
-        """并行初始化FunASR模型"""
+        Args:
+            wait_optional: 是否同时等待可选模型加载完成（CLI 等一次性调用使用）
+        """
         if self.initialized:
+            if wait_optional:
+                self.wait_for_models()
             return {"success": True, "message": "模型已初始化"}
 
         try:
-            import threading
-
-            logger.info("正在并行初始化FunASR模型...")
+            logger.info("正在初始化FunASR模型...")
             start_time = time.time()
 
-            # 预导入 funasr_onnx 子模块，避免多线程导入导致的 ModuleLock 死锁
+            # 预导入 funasr_onnx 子模块，避免多线程导入导致的 ModuleLock 死锁；
+            # 同时避免把 librosa/numba/scipy 导入输入法进程
             try:
-                import importlib
                 pre_modules = (
                     "funasr_onnx.utils.utils",
                     "funasr_onnx.utils.frontend",
@@ -291,91 +340,80 @@ class FunASRServer:
                     "funasr_onnx.vad_bin",
                     "funasr_onnx.punc_bin",
                 )
-                for m in pre_modules:
-                    importlib.import_module(m)
+                if self.streaming_mode == "online":
+                    pre_modules += ("funasr_onnx.paraformer_online_bin",)
+                with _librosa_placeholder():
+                    for m in pre_modules:
+                        importlib.import_module(m)
                 logger.info("funasr_onnx 模块预导入完成")
             except Exception as pre_e:
                 logger.warning("funasr_onnx 预导入失败: %s", str(pre_e))
 
-            # 创建加载结果存储
-            results = {}
-
-            def load_model_thread(model_name, load_func):
-                """模型加载线程包装函数"""
-                thread_start = time.time()
-                results[model_name] = load_func()
-                thread_time = time.time() - thread_start
-                logger.info(f"{model_name}模型加载线程耗时: {thread_time:.2f}秒")
+            logger.info("推理线程分配: %s", get_thread_plan().describe())
+            if ORT_CACHE or MMAP_WEIGHTS or get_thread_plan().pin:
+                try:
+                    from app import ort_cache
+                    ort_cache.install()
+                except Exception as cache_e:
+                    logger.warning("ORT 会话定制（优化图缓存/绑核）启用失败: %s", str(cache_e))
 
             # 根据开关决定是否加载 VAD / PUNC（默认启用）
             load_vad = os.environ.get("FUNASR_USE_VAD", "false").lower() not in ("0", "false", "no")
             load_punc = os.environ.get("FUNASR_USE_PUNC", "true").lower() not in ("0", "false", "no")
 
-            # 创建并启动线程（ASR 必须，VAD/PUNC 可选）
-            threads = [
-                threading.Thread(
-                    target=load_model_thread,
-                    args=("asr", self._load_asr_model),
-                    daemon=True,
-                )
-            ]
+            # 先启动可选模型的后台加载，与 ASR 并行
             if load_vad:
-                threads.append(
-                    threading.Thread(
-                        target=load_model_thread,
-                        args=("vad", self._load_vad_model),
-                        daemon=True,
-                    )
-                )
+                self._load_optional_model("vad")
             if load_punc:
-                threads.append(
-                    threading.Thread(
-                        target=load_model_thread,
-                        args=("punc", self._load_punc_model),
-                        daemon=True,
-                    )
-                )
+                self._load_optional_model("punc")
+            if self.streaming_mode == "online":
+                self._load_optional_model("asr_online")
+            elif self.streaming_mode == "vad":
+                self._load_optional_model("vad_online")
 
-            # 启动所有线程
-            for thread in threads:
-                thread.start()
-
-            # 等待所有线程完成，设置超时
-            timeout_occurred = False
-            for thread in threads:
-                thread.join(timeout=300)  # 5分钟超时
-                if thread.is_alive():
-                    timeout_occurred = True
-                    logger.error("模型加载线程超时，线程仍在运行")
-            
-            # 检查是否有超时
-            if timeout_occurred:
+            results = {}
+
+            def load_asr():
+                thread_start = time.time()
+                try:
+                    results["asr"] = self._load_asr_model()
+                except Exception as e:
+                    # 异常交给主线程处理（ImportError 提示安装 funasr_onnx）
+                    results["asr"] = False
+                    results["error"] = e
+                self.model_load_times["asr"] = time.time() - thread_start
+                logger.info(f"asr模型加载线程耗时: {self.model_load_times['asr']:.2f}秒")
+
+            thread = threading.Thread(target=load_asr, daemon=True)
+            thread.start()
+            thread.join(timeout=300)  # 5分钟超时
+            if thread.is_alive():
+                logger.error("模型加载线程超时，线程仍在运行")
                 return {
                     "success": False,
                     "error": "模型加载超时（超过5分钟）",
                     "type": "timeout_error",
                 }
 
-            # 检查加载结果
-            failed_models = [name for name, success in results.items() if not success]
-
-            if failed_models:
-                error_msg = f"以下模型加载失败: {', '.join(failed_models)}"
+            if isinstance(results.get("error"), ImportError):
+                raise results["error"]
+            if not results.get("asr"):
+                if results.get("error") is not None:
+                    logger.error("ASR模型加载异常: %s", results["error"])
+                error_msg = "以下模型加载失败: asr"
                 logger.error(error_msg)
                 return {"success": False, "error": error_msg, "type": "init_error"}
 
             total_time = time.time() - start_time
             self.initialized = True
-            logger.info(
-                f"所有FunASR模型并行初始化完成，总耗时: {total_time:.2f}秒"
-            )
-            
-            # 预热librosa，避免首次load时的初始化延迟
-            self._warmup_librosa()
-            
+            logger.info(f"ASR模型就绪，可开始转录，耗时: {total_time:.2f}秒")
+
+            if wait_optional:
+                self.wait_for_models()
+
             return {
                 "success": True,
-                "message": f"FunASR模型并行初始化成功，耗时: {total_time:.2f}秒",
+                "message": f"FunASR模型初始化成功，耗时: {total_time:.2f}秒",
             }
 
         except ImportError as e:
@@ -389,182 +427,307 @@ class FunASRServer:
             logger.error(traceback.format_exc())
             return {"success": False, "error": error_msg, "type": "init_error"}
 
-    def transcribe_audio(self, audio_path, options=None):
-        """转录音频文件"""
+    def _load_optional_model(self, name):
+        """在后台线程加载可选模型（已加载、加载中或已失败时不重复加载）"""
+        with self._model_state_lock:
+            if name in self._model_events:
+                return self._model_events[name]
+            event = threading.Event()
+            self._model_events[name] = event
+
+        _, loader, label = self._OPTIONAL_MODELS[name]
+
+        def run():
+            thread_start = time.time()
+            try:
+                ok = getattr(self, loader)()
+            except Exception as e:
+                logger.error("%s模型加载异常: %s", label, e)
+                ok = False
+            elapsed = time.time() - thread_start
+            self.model_load_times[name] = elapsed
+            if ok:
+                logger.info("%s模型就绪，耗时: %.2f秒", label, elapsed)
+            elif name in ("asr_online", "vad_online"):
+                logger.warning("%s模型加载失败，回退为松开后整段识别", label)
+            else:
+                logger.warning("%s模型加载失败，转录结果将不经%s处理", label, label)
+            event.set()
+
+        threading.Thread(target=run, daemon=True, name=f"load-{name}").start()
+        return event
+
+    def is_model_ready(self, name):
+        """指定模型是否已加载可用（asr / vad / punc / asr_online / vad_online）"""
+        if name == "asr":
+            return self.initialized and self.asr_model is not None
+        attr = self._OPTIONAL_MODELS[name][0]
+        return getattr(self, attr) is not None
+
+    def wait_for_models(self, timeout=300):
+        """等待已开始加载的可选模型完成，返回是否全部在超时前结束"""
+        deadline = time.time() + timeout
+        with self._model_state_lock:
+            events = list(self._model_events.values())
+        for event in events:
+            if not event.wait(timeout=max(deadline - time.time(), 0)):
+                return False
+        return True
+
+    def _optional_model(self, name):
+        """返回可选模型；尚未开始加载时按需触发后台加载，并在就绪前返回 None"""
+        model = getattr(self, self._OPTIONAL_MODELS[name][0])
+        if model is None and self.initialized:
+            self._load_optional_model(name)
+        return model
+
+    def transcribe_audio(self, audio_path, options=None, trace=None):
+        """转录音频文件
+
+        传入 UtteranceTrace 时各阶段耗时记录到该对象（由调用方输出日志），
+        否则内部创建一个并在结束时输出；两种情况下结果都带有 "trace" 字段。
+        """
         if not self.initialized:
             init_result = self.initialize()
             if not init_result["success"]:
                 return init_result
 
+        owned = trace is None
+        if owned:
+            trace = UtteranceTrace("transcribe_audio")
         try:
             # 检查音频文件是否存在
             if not os.path.exists(audio_path):
                 return {"success": False, "error": f"音频文件不存在: {audio_path}"}
 
             logger.info(f"开始转录音频文件: {audio_path}")
-            duration = self._get_audio_duration(audio_path)
-
-            # 设置默认选项
-            default_options = {
-                "batch_size_s": 60,
-                "hotword": "",
-                # 默认启用 VAD / PUNC，可在外部通过选项或环境变量关闭
-                "use_vad": os.environ.get("FUNASR_USE_VAD", "false").lower() not in ("0", "false", "no"),
-                "use_punc": os.environ.get("FUNASR_USE_PUNC", "true").lower() not in ("0", "false", "no"),
-                "language": "zh",
-            }
+            # 只解码一次，VAD / ASR 复用同一份波形（funasr_onnx 传路径时会各自重新解码）
+            with trace.span("decode"):
+                waveform = self._load_audio_file(audio_path)
+            duration = len(waveform) / float(ASR_SAMPLE_RATE)
+            self.total_audio_duration += duration  # 累计音频时长
 
-            if options:
-                default_options.update(options)
+            return self._transcribe_waveform(waveform, duration, options, trace)
 
-            # 执行语音识别（VAD 处理）
-            audio_path_for_asr = audio_path
-            tmp_vad_path = None
-            if default_options["use_vad"] and self.vad_model:
-                # funasr_onnx.Fsmn_vad 直接调用，返回 segments [[start_ms, end_ms], ...]
-                vad_result = self.vad_model(audio_path)
-                segments = []
-                if isinstance(vad_result, list) and vad_result:
-                    if isinstance(vad_result[0], list) and vad_result[0] and isinstance(vad_result[0][0], (list, tuple)):
-                        segments = vad_result[0]
-                    else:
-                        segments = vad_result
-                segment_count = len(segments)
-                logger.info("VAD处理完成，检测到 %s 个语音段", segment_count)
-                if segment_count == 0:
-                    self.transcription_count += 1
-                    if self.transcription_count % 10 == 0:
-                        self._cleanup_memory()
-                        logger.info(f"已完成 {self.transcription_count} 次转录，执行内存清理")
-                    return {
-                        "success": True,
-                        "text": "",
-                        "raw_text": "",
-                        "confidence": 0.0,
-                        "duration": duration,
-                        "language": "zh-CN",
-                        "model_type": (
-                            "onnx" if "onnx" in str(self.model_names.get("asr", "")).lower() else "pytorch"
-                        ),
-                        "models": self.model_names,
-                    }
+        except Exception as e:
+            error_msg = f"音频转录失败: {str(e)}"
+            logger.error(error_msg)
+            logger.error(traceback.format_exc())
+            return {"success": False, "error": error_msg, "type": "transcription_error"}
+        finally:
+            if owned:
+                trace.log()
+
+    def transcribe_samples(self, samples, sample_rate=ASR_SAMPLE_RATE, options=None, trace=None):
+        """直接转录内存中的 PCM 数据（不经过临时 WAV 文件）
+
+        Args:
+            samples: 单声道 PCM 数据（int16 或 [-1, 1] 范围的 float32 ndarray）
+            sample_rate: samples 的采样率，非 16kHz 时自动重采样
+            options: 与 transcribe_audio 相同的识别选项
+            trace: 可选的 UtteranceTrace，用法与 transcribe_audio 相同
+
+        Returns:
+            与 transcribe_audio 相同格式的结果字典
+        """
+        if not self.initialized:
+            init_result = self.initialize()
+            if not init_result["success"]:
+                return init_result
 
-                try:
-                    import soundfile as sf
-                    import numpy as np
-
-                    audio_data, sample_rate = sf.read(audio_path, dtype="int16")
-                    if audio_data.ndim > 1:
-                        audio_data = audio_data[:, 0]
-
-                    slices = []
-                    for segment in segments:
-                        if not isinstance(segment, (list, tuple)) or len(segment) < 2:
-                            continue
-                        start_ms, end_ms = segment[0], segment[1]
-                        try:
-                            start_idx = max(0, int(float(start_ms) * sample_rate / 1000.0))
-                            end_idx = min(len(audio_data), int(float(end_ms) * sample_rate / 1000.0))
-                        except Exception:
-                            continue
-                        if end_idx > start_idx:
-                            slices.append(audio_data[start_idx:end_idx])
-
-                    if slices:
-                        trimmed = np.concatenate(slices)
-                        tmp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-                        tmp_vad_path = tmp_file.name
-                        tmp_file.close()
-                        sf.write(tmp_vad_path, trimmed, sample_rate, subtype="PCM_16")
-                        audio_path_for_asr = tmp_vad_path
-                        logger.info("VAD裁剪完成，使用裁剪后的音频进行识别")
-                except Exception as exc:
-                    logger.warning("VAD裁剪失败，回退原始音频: %s", exc)
-            elif default_options["use_vad"] and not self.vad_model:
-                logger.warning("use_vad=True 但VAD模型未加载，跳过VAD处理")
-
-            # 执行ASR识别（根据模型类型使用不同接口）
+        owned = trace is None
+        if owned:
+            trace = UtteranceTrace("transcribe_samples")
+        try:
+            with trace.span("resample"):
+                waveform = self._samples_to_waveform(samples, sample_rate)
+            duration = len(waveform) / float(ASR_SAMPLE_RATE)
+            self.total_audio_duration += duration  # 累计音频时长
+
+            logger.info("开始转录内存音频: %.2f秒 (原始采样率=%sHz)", duration, sample_rate)
+            return self._transcribe_waveform(waveform, duration, options, trace)
+
+        except Exception as e:
+            error_msg = f"音频转录失败: {str(e)}"
+            logger.error(error_msg)
+            logger.error(traceback.format_exc())
+            return {"success": False, "error": error_msg, "type": "transcription_error"}
+        finally:
+            if owned:
+                trace.log()
+
+    @property
+    def streaming_available(self):
+        """流式识别模型是否可用"""
+        if not self.initialized:
+            return False
+        if self.streaming_mode == "online":
+            return self.asr_online_model is not None
+        if self.streaming_mode == "vad":
+            return self.vad_online_model is not None
+        return False
+
+    def create_stream_session(self, sample_rate, on_partial=None, options=None, infer=None):
+        """创建一个流式识别会话（按住 PTT 期间边录边识别）
+
+        Args:
+            sample_rate: 之后送入 accept() 的 PCM 采样率
+            on_partial: 部分识别结果回调 on_partial(text)，在识别线程中调用
+            options: 与 transcribe_audio 相同的识别选项（用于标点等）
+            infer: 调用离线 ASR/标点模型的执行函数 infer(fn, *args)，默认在识别线程上直接调用
+
+        Returns:
+            StreamSession（online 模式为 OnlineStreamSession，vad 模式为
+            VadSegmentedSession）；流式模型不可用或已有会话进行中时返回 None
+        """
+        if not self.streaming_available:
+            return None
+        if not self._stream_lock.acquire(blocking=False):
+            logger.warning("已有流式识别会话进行中，本次回退为整段识别")
+            return None
+
+        from app.streaming import OnlineStreamSession, VadSegmentedSession
+
+        session_cls = OnlineStreamSession if self.streaming_mode == "online" else VadSegmentedSession
+        try:
+            return session_cls(
+                self,
+                sample_rate,
+                on_partial=on_partial,
+                options=options,
+                release=self._stream_lock.release,
+                infer=infer,
+            )
+        except Exception:
+            self._stream_lock.release()
+            raise
+
+    def transcribe_batch(self, waveforms, options=None, traces=None):
+        """批量转录多段 16kHz float32 波形
+
+        VAD 与标点仍逐条处理，ASR 以 batch_size>1 一次推理，适合短时间内涌入的
+        多个请求（多输入上下文、回放工具、数据集重转写等）。
+
+        Args:
+            traces: 与 waveforms 一一对应的 UtteranceTrace（可含 None）；vad/punc 记录各自耗时，
+                    asr 记录本次批量推理的总耗时（同批请求都要等待整批完成）
+
+        Returns:
+            与 waveforms 一一对应的结果字典列表，格式同 transcribe_audio
+        """
+        if traces is None:
+            traces = [None] * len(waveforms)
+        traces = [trace if trace is not None else UtteranceTrace("batch") for trace in traces]
+        if not self.initialized:
+            return [
+                {"success": False, "error": "FunASR服务器未初始化", "type": "init_error"}
+                for _ in waveforms
+            ]
+
+        default_options = self._resolve_options(options)
+        results = [None] * len(waveforms)
+        pending = []  # (index, waveform_for_asr, duration)
+        for index, waveform in enumerate(waveforms):
+            duration = waveform.size / float(ASR_SAMPLE_RATE)
+            self.total_audio_duration += duration
+            traces[index].annotate(audio_s=round(duration, 3))
             try:
-                if hasattr(self.asr_model, "generate"):
-                    # PyTorch 模型使用 generate 方法
-                    asr_result = self.asr_model.generate(
-                        input=audio_path_for_asr,
-                        batch_size_s=default_options["batch_size_s"],
-                        hotword=default_options["hotword"],
-                        cache={},
-                    )
-                else:
-                    # ONNX 模型直接调用（funasr_onnx.Paraformer）
-                    asr_result = self.asr_model([audio_path_for_asr])
-            finally:
-                if tmp_vad_path:
-                    try:
-                        os.remove(tmp_vad_path)
-                    except OSError:
-                        logger.debug("删除VAD临时文件失败: %s", tmp_vad_path)
-
-            # 提取识别文本（兼容 PyTorch 和 ONNX 两种格式）
-            if isinstance(asr_result, list) and len(asr_result) > 0:
-                first_item = asr_result[0]
-                # PyTorch 格式: [{"text": "..."}]
-                if isinstance(first_item, dict) and "text" in first_item:
-                    raw_text = first_item["text"]
-                # ONNX 格式: [{"preds": (text_string, token_list)}]
-                elif isinstance(first_item, dict) and "preds" in first_item:
-                    preds = first_item["preds"]
-                    if isinstance(preds, tuple) and len(preds) > 0:
-                        raw_text = str(preds[0])
-                    else:
-                        raw_text = str(preds)
-                else:
-                    raw_text = str(first_item)
+                with traces[index].span("vad"):
+                    waveform_for_asr = self._apply_vad(waveform, default_options)
+            except Exception as e:
+                logger.error("批量转录 VAD 处理失败: %s", e)
+                results[index] = {"success": False, "error": f"音频转录失败: {str(e)}", "type": "transcription_error"}
+                continue
+            if waveform_for_asr is None:
+                results[index] = self._build_result("", "", 0.0, duration)
             else:
-                raw_text = str(asr_result)
+                pending.append((index, waveform_for_asr, duration))
 
-            logger.info(f"ASR识别完成，原始文本: {raw_text[:100]}...")
+        if not pending:
+            return results
 
-            # 使用标点恢复（ONNX 的 CT_Transformer 直接调用）
-            final_text = raw_text
-            if default_options["use_punc"] and self.punc_model and raw_text.strip():
-                try:
-                    # funasr_onnx.CT_Transformer 返回 (text_with_punc, punc_list)
-                    punc_result = self.punc_model(raw_text)
-                    if isinstance(punc_result, tuple) and len(punc_result) > 0:
-                        final_text = str(punc_result[0])
-                    else:
-                        final_text = str(punc_result)
-                    logger.info("标点恢复完成")
-                except Exception as e:
-                    logger.warning(f"标点恢复失败，使用原始文本: {str(e)}")
-
-            self.transcription_count += 1
+        try:
+            asr_start = time.monotonic()
+            asr_items = self._run_asr_batch([item[1] for item in pending], default_options)
+            asr_elapsed = time.monotonic() - asr_start
+            for index, _, _ in pending:
+                traces[index].spans["asr"] = traces[index].spans.get("asr", 0.0) + asr_elapsed
+        except Exception as e:
+            error_msg = f"音频转录失败: {str(e)}"
+            logger.error(error_msg)
+            logger.error(traceback.format_exc())
+            for index, _, _ in pending:
+                results[index] = {"success": False, "error": error_msg, "type": "transcription_error"}
+            return results
+
+        for (index, _, duration), asr_item in zip(pending, asr_items):
+            raw_text = self._extract_text([asr_item])
+            with traces[index].span("punc"):
+                final_text = self._punctuate(raw_text, default_options["use_punc"])
+            confidence = self._extract_confidence([asr_item])
+            results[index] = self._build_result(final_text, raw_text, confidence, duration)
+            results[index]["trace"] = traces[index].as_dict()
+        logger.info("批量转录完成，共 %s 条", len(waveforms))
+        return results
+
+    def _apply_vad(self, waveform, default_options):
+        """按需执行 VAD 裁剪，返回用于识别的波形；未检测到语音时返回 None"""
+        if not default_options["use_vad"]:
+            return waveform
+        vad_model = self._optional_model("vad")
+        if not vad_model:
+            logger.info("use_vad=True 但VAD模型尚未就绪，跳过VAD处理")
+            return waveform
+
+        # funasr_onnx.Fsmn_vad 直接调用，返回 segments [[start_ms, end_ms], ...]
+        vad_result = vad_model(waveform)
+        segments = []
+        if isinstance(vad_result, list) and vad_result:
+            if isinstance(vad_result[0], list) and vad_result[0] and isinstance(vad_result[0][0], (list, tuple)):
+                segments = vad_result[0]
+            else:
+                segments = vad_result
+        segment_count = len(segments)
+        logger.info("VAD处理完成，检测到 %s 个语音段", segment_count)
+        if segment_count == 0:
+            return None
 
-            confidence = 0.0
-            if isinstance(asr_result, list) and asr_result:
-                first_item = asr_result[0]
-                if isinstance(first_item, dict):
-                    confidence = first_item.get("confidence", 0.0)
-                else:
-                    confidence = getattr(first_item, "confidence", 0.0)
+        try:
+            trimmed = self._slice_segments(waveform, segments)
+            if trimmed is not None:
+                logger.info("VAD裁剪完成，使用裁剪后的音频进行识别")
+                return trimmed
+        except Exception as exc:
+            logger.warning("VAD裁剪失败，回退原始音频: %s", exc)
+        return waveform
+
+    def _transcribe_waveform(self, waveform, duration, options=None, trace=None):
+        """对 16kHz float32 波形执行 VAD / ASR / 标点恢复，各阶段耗时记录到 trace"""
+        if trace is None:
+            trace = UtteranceTrace("waveform")
+        trace.annotate(audio_s=round(duration, 3))
+        try:
+            default_options = self._resolve_options(options)
 
-            result = {
-                "success": True,
-                "text": final_text,
-                "raw_text": raw_text,
-                "confidence": confidence,
-                "duration": duration,
-                "language": "zh-CN",
-                "model_type": (
-                    "onnx" if "onnx" in str(self.model_names.get("asr", "")).lower() else "pytorch"
-                ),
-                "models": self.model_names,
-            }
+            # 执行语音识别（VAD 处理）
+            with trace.span("vad"):
+                waveform_for_asr = self._apply_vad(waveform, default_options)
+            if waveform_for_asr is None:
+                result = self._build_result("", "", 0.0, duration)
+                result["trace"] = trace.as_dict()
+                return result
+
+            with trace.span("asr"):
+                asr_result = self._run_asr(waveform_for_asr, default_options)
+            raw_text = self._extract_text(asr_result)
+            logger.info(f"ASR识别完成，原始文本: {raw_text[:100]}...")
 
-            # 生产环境：每10次转录后进行内存清理
-            if self.transcription_count % 10 == 0:
-                self._cleanup_memory()
-                logger.info(f"已完成 {self.transcription_count} 次转录，执行内存清理")
+            with trace.span("punc"):
+                final_text = self._punctuate(raw_text, default_options["use_punc"])
 
+            confidence = self._extract_confidence(asr_result)
+            result = self._build_result(final_text, raw_text, confidence, duration)
+            result["trace"] = trace.as_dict()
             logger.info(f"转录完成，最终文本: {final_text[:100]}...")
             return result
 
@@ -574,58 +737,207 @@ class FunASRServer:
             logger.error(traceback.format_exc())
             return {"success": False, "error": error_msg, "type": "transcription_error"}
 
-    def _get_audio_duration(self, audio_path):
-        """获取音频时长"""
-        try:
-            import librosa
+    def _run_asr(self, waveform, default_options):
+        """执行ASR识别（根据模型类型使用不同接口）"""
+        if hasattr(self.asr_model, "generate"):
+            # PyTorch 模型使用 generate 方法
+            return self.asr_model.generate(
+                input=waveform,
+                batch_size_s=default_options["batch_size_s"],
+                hotword=default_options["hotword"],
+                cache={},
+            )
+        # ONNX 模型直接调用（funasr_onnx.Paraformer 接受 16kHz float32 ndarray）
+        return self.asr_model(waveform)
+
+    def _run_asr_batch(self, waveforms, default_options):
+        """批量执行ASR识别，返回与输入一一对应的单条结果（dict）列表"""
+        def run_single(waveform):
+            asr_result = self._run_asr(waveform, default_options)
+            if isinstance(asr_result, list):
+                return asr_result[0] if asr_result else {"preds": ""}
+            return asr_result
+
+        # PyTorch 模型、单条请求或未经验证的 funasr_onnx 版本直接走原有接口
+        if len(waveforms) == 1 or not paraformer_batch.supports_batch(self.asr_model):
+            return [run_single(w) for w in waveforms]
+
+        max_batch = max(1, int(os.environ.get("FUNASR_BATCH_MAX", "8")))
+        # 按长度排序后分批，减少补零带来的无效计算
+        order = sorted(range(len(waveforms)), key=lambda i: waveforms[i].size)
+        items = [None] * len(waveforms)
+        for beg in range(0, len(order), max_batch):
+            batch_idx = order[beg:beg + max_batch]
+            batch = [waveforms[i] for i in batch_idx]
+            try:
+                batch_items = paraformer_batch.infer_batch(self.asr_model, batch)
+            except Exception as exc:
+                # 静音/噪声等会导致整批推理失败，逐条重试以隔离问题音频
+                logger.warning("批量推理失败，逐条重试: %s", exc)
+                for i in batch_idx:
+                    items[i] = run_single(waveforms[i])
+                continue
+            for i, item in zip(batch_idx, batch_items):
+                items[i] = item
+        return items
+
+    @staticmethod
+    def _resolve_options(options=None):
+        """合并默认识别选项与调用方传入的选项"""
+        default_options = {
+            "batch_size_s": 60,
+            "hotword": "",
+            # 默认启用 VAD / PUNC，可在外部通过选项或环境变量关闭
+            "use_vad": os.environ.get("FUNASR_USE_VAD", "false").lower() not in ("0", "false", "no"),
+            "use_punc": os.environ.get("FUNASR_USE_PUNC", "true").lower() not in ("0", "false", "no"),
+            "language": "zh",
+        }
 
-            duration = librosa.get_duration(path=audio_path)
-            self.total_audio_duration += duration  # 累计音频时长
-            return duration
-        except Exception as e:
-            logger.debug(f"获取音频时长失败: {str(e)}")
-            return 0.0
+        if options:
+            default_options.update(options)
+        return default_options
+
+    @staticmethod
+    def _extract_text(asr_result):
+        """提取识别文本（兼容 PyTorch 和 ONNX 两种格式）"""
+        if isinstance(asr_result, list) and len(asr_result) > 0:
+            first_item = asr_result[0]
+            # PyTorch 格式: [{"text": "..."}]
+            if isinstance(first_item, dict) and "text" in first_item:
+                return first_item["text"]
+            # ONNX 格式: [{"preds": (text_string, token_list)}]
+            if isinstance(first_item, dict) and "preds" in first_item:
+                preds = first_item["preds"]
+                if isinstance(preds, (tuple, list)) and len(preds) > 0:
+                    return str(preds[0])
+                return str(preds)
+            return str(first_item)
+        return str(asr_result)
+
+    @staticmethod
+    def _extract_confidence(asr_result):
+        """提取识别置信度，模型未提供时为 0.0"""
+        if isinstance(asr_result, list) and asr_result:
+            first_item = asr_result[0]
+            if isinstance(first_item, dict):
+                return first_item.get("confidence", 0.0)
+            return getattr(first_item, "confidence", 0.0)
+        return 0.0
+
+    def _punctuate(self, raw_text, use_punc=True):
+        """使用标点恢复（ONNX 的 CT_Transformer 直接调用），失败时返回原始文本
+
+        结果按原始文本缓存；不超过 FUNASR_PUNC_BYPASS_CHARS 字的短文本直接返回。
+        """
+        if not (use_punc and raw_text.strip()):
+            return raw_text
+        if len(raw_text.strip()) <= PUNC_BYPASS_CHARS:
+            self.punc_bypassed += 1
+            return raw_text
+        punc_model = self._optional_model("punc")
+        if not punc_model:
+            logger.info("标点模型尚未就绪，输出不带标点的文本")
+            return raw_text
 
-    def _warmup_librosa(self):
-        """预热librosa库，避免首次load时的初始化延迟（这是真正的问题所在）"""
         try:
-            logger.info("开始预热librosa，触发音频库初始化...")
-            warmup_start = time.time()
-            
-            import tempfile
-            import numpy as np
-            import wave
-            
-            # 创建一个极短的测试音频（10ms）
-            sample_rate = 16000
-            samples = int(sample_rate * 0.01)
-            audio_data = np.zeros(samples, dtype=np.int16)
-            
-            # 写入临时WAV文件
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp_file:
-                tmp_path = tmp_file.name
-                with wave.open(tmp_path, 'wb') as wf:
-                    wf.setnchannels(1)
-                    wf.setsampwidth(2)
-                    wf.setframerate(sample_rate)
-                    wf.writeframes(audio_data.tobytes())
-            
-            try:
-                # 调用librosa.load触发初始化（这是funasr_onnx内部使用的）
-                import librosa
-                _, _ = librosa.load(tmp_path, sr=16000)
-                
-                warmup_time = time.time() - warmup_start
-                logger.info(f"librosa预热完成，耗时: {warmup_time:.2f}秒")
-            finally:
-                try:
-                    os.remove(tmp_path)
-                except Exception:
-                    pass
-                    
+            final_text = self._punc_cached(raw_text)
+            logger.info("标点恢复完成")
+            return final_text
         except Exception as e:
-            logger.warning(f"librosa预热失败（不影响使用）: {str(e)}")
-    
+            logger.warning(f"标点恢复失败，使用原始文本: {str(e)}")
+            return raw_text
+
+    def _run_punc(self, raw_text):
+        # funasr_onnx.CT_Transformer 返回 (text_with_punc, punc_list)
+        punc_result = self.punc_model(raw_text)
+        if isinstance(punc_result, tuple) and len(punc_result) > 0:
+            return str(punc_result[0])
+        return str(punc_result)
+
+    def punc_cache_stats(self):
+        """标点缓存统计：命中、未命中、当前条目数、容量与短文本跳过次数"""
+        stats = {"hits": 0, "misses": 0, "size": 0, "maxsize": PUNC_CACHE_SIZE}
+        if hasattr(self._punc_cached, "cache_info"):
+            info = self._punc_cached.cache_info()
+            stats.update(hits=info.hits, misses=info.misses, size=info.currsize)
+        stats["bypassed"] = self.punc_bypassed
+        return stats
+
+    def stats(self):
+        """运行统计：转录次数、累计音频时长、模型加载耗时与就绪状态、标点缓存"""
+        return {
+            "transcriptions": self.transcription_count,
+            "audio_seconds": round(self.total_audio_duration, 2),
+            "models": {
+                "load_times": {name: round(seconds, 3) for name, seconds in self.model_load_times.items()},
+                "ready": {name: self.is_model_ready(name) for name in ("asr", *self._OPTIONAL_MODELS)},
+            },
+            "punc_cache": self.punc_cache_stats(),
+        }
+
+    def _build_result(self, final_text, raw_text, confidence, duration):
+        """构造转录结果并更新计数器"""
+        self.transcription_count += 1
+
+        result = {
+            "success": True,
+            "text": final_text,
+            "raw_text": raw_text,
+            "confidence": confidence,
+            "duration": duration,
+            "language": "zh-CN",
+            "model_type": (
+                "onnx" if "onnx" in str(self.model_names.get("asr", "")).lower() else "pytorch"
+            ),
+            "models": self.model_names,
+        }
+
+        # 生产环境：每10次转录后进行内存清理
+        if self.transcription_count % 10 == 0:
+            self._cleanup_memory()
+            logger.info(f"已完成 {self.transcription_count} 次转录，执行内存清理")
+            logger.info("标点缓存: %s", self.punc_cache_stats())
+
+        return result
+
+    @staticmethod
+    def _slice_segments(waveform, segments):
+        """按 VAD 语音段（毫秒）裁剪并拼接波形，无有效语音段时返回 None"""
+        import numpy as np
+
+        slices = []
+        for segment in segments:
+            if not isinstance(segment, (list, tuple)) or len(segment) < 2:
+                continue
+            start_ms, end_ms = segment[0], segment[1]
+            try:
+                start_idx = max(0, int(float(start_ms) * ASR_SAMPLE_RATE / 1000.0))
+                end_idx = min(len(waveform), int(float(end_ms) * ASR_SAMPLE_RATE / 1000.0))
+            except Exception:
+                continue
+            if end_idx > start_idx:
+                slices.append(waveform[start_idx:end_idx])
+
+        if not slices:
+            return None
+        if len(slices) == 1:
+            return slices[0]
+        return np.concatenate(slices)
+
+    @staticmethod
+    def _samples_to_waveform(samples, sample_rate, resampler=None):
+        """将 PCM 数据转换为模型需要的 16kHz 单声道 float32 波形"""
+        from app.audio_utils import pcm_to_waveform
+
+        return pcm_to_waveform(samples, sample_rate, ASR_SAMPLE_RATE, resampler=resampler)
+
+    @staticmethod
+    def _load_audio_file(audio_path):
+        """解码音频文件为 16kHz 单声道 float32 波形（WAV 头直接解析，不经 librosa）"""
+        from app.audio_utils import load_audio_file
+
+        return load_audio_file(audio_path, ASR_SAMPLE_RATE)
+
     def _cleanup_memory(self):
         """生产环境内存清理"""
         try:
@@ -690,7 +1002,7 @@ def main():
     args = parser.parse_args()
 
     server = FunASRServer()
-    init_result = server.initialize()
+    init_result = server.initialize(wait_optional=True)
     success = init_result.get("success", False)
 
     indent = 2 if args.pretty else None
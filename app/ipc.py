@@ -0,0 +1,56 @@
+"""Length-prefixed framing for the persistent backend socket protocol.
+
+连接建立后客户端先发送 4 字节 MAGIC，服务端回送同样的 MAGIC 表示支持持久连接；
+之后双方收发的每一帧为：
+
+    [payload 长度: uint32 大端][请求 ID: uint32 大端][payload]
+
+响应帧携带与请求相同的 ID，因此同一连接上可以有多个请求同时在途。
+"""
+
+from __future__ import annotations
+
+import socket
+import struct
+from typing import Optional, Tuple
+
+# 持久连接握手标识（协议版本 1）
+MAGIC = b"VCT1"
+
+HEADER = struct.Struct("!II")
+
+
+class FrameError(Exception):
+    """帧格式错误或连接在帧中途断开"""
+
+
+def recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    """读取恰好 size 字节；在读到任何数据前遇到 EOF 时返回 None"""
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            if not buf:
+                return None
+            raise FrameError(f"连接在帧中途关闭（{len(buf)}/{size} 字节）")
+        buf += chunk
+    return bytes(buf)
+
+
+def read_frame(sock: socket.socket, max_bytes: int) -> Optional[Tuple[int, bytes]]:
+    """读取一帧，返回 (request_id, payload)；对端正常关闭时返回 None"""
+    header = recv_exact(sock, HEADER.size)
+    if header is None:
+        return None
+    length, request_id = HEADER.unpack(header)
+    if length > max_bytes:
+        raise FrameError(f"帧过大: {length} 字节（上限 {max_bytes}）")
+    payload = recv_exact(sock, length) if length else b""
+    if payload is None:
+        raise FrameError("连接在帧中途关闭")
+    return request_id, payload
+
+
+def write_frame(sock: socket.socket, request_id: int, payload: bytes) -> None:
+    """发送一帧（调用方负责多线程写入时的加锁）"""
+    sock.sendall(HEADER.pack(len(payload), request_id) + payload)
@@ -1,57 +1,115 @@
-"""统一的日志配置模块 - 项目唯一的日志配置点"""
+"""统一的日志配置模块 - 项目唯一的日志配置点
 
+日志记录经 QueueHandler 放入内存队列，由 QueueListener 后台线程格式化并写入控制台和文件，
+调用 logger 的线程（IBus/GLib 主循环、Fcitx5 Backend 的按键处理）不会阻塞在磁盘 I/O 上。
+"""
+
+import atexit
 import logging
 import os
+import queue
 import sys
 from datetime import datetime
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from typing import Dict, Optional
+
+DEFAULT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+DEFAULT_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+# 按子系统设置的日志级别，格式: "ibus.engine=DEBUG,backend.rime_handler=WARNING"
+LOG_LEVELS_ENV = "VOCOTYPE_LOG_LEVELS"
+
+_listener: Optional[QueueListener] = None
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """只在调用线程合并消息参数，时间戳、格式与异常堆栈的格式化交给后台线程
+
+    标准 QueueHandler.prepare 会在调用线程执行完整的 Formatter.format；
+    队列只在进程内传递，exc_info 可以原样交给后台线程处理。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
 
 
-def setup_logging(level: str = "INFO", log_dir: str = None) -> None:
+def parse_log_levels(spec: Optional[str]) -> Dict[str, int]:
+    """解析 "name=LEVEL,name=LEVEL" 形式的子系统日志级别，忽略无法识别的条目"""
+    levels = {}
+    for item in (spec or "").split(","):
+        name, sep, level = item.partition("=")
+        value = logging.getLevelName(level.strip().upper()) if sep else None
+        if name.strip() and isinstance(value, int):
+            levels[name.strip()] = value
+    return levels
+
+
+def setup_logging(
+    level: str = "INFO",
+    log_dir: str = None,
+    *,
+    log_file: str = None,
+    fmt: str = DEFAULT_FORMAT,
+    levels: Optional[Dict[str, str]] = None,
+) -> None:
     """配置全局日志系统（应该在程序入口最早调用）
-    
+
     Args:
         level: 日志级别 (DEBUG/INFO/WARNING/ERROR)
         log_dir: 日志目录，如果提供则同时输出到文件
                 文件命名格式：log_YYYY-MM-DD.log
                 自动轮转：每天午夜，最多保留3个备份，单文件最大10MB
-    
+        log_file: 直接指定日志文件（不轮转，如 IBus 的 VOCOTYPE_LOG_FILE）
+        fmt: 日志格式
+        levels: 子系统日志级别，如 {"ibus.engine": "DEBUG"}；
+                环境变量 VOCOTYPE_LOG_LEVELS 中的设置优先
+
     特性：
         - 控制台输出到stderr（避免干扰stdout通信）
         - 可选的文件日志持久化
-        - 防止重复配置（清空已有handlers）
+        - 防止重复配置（清空已有handlers，停止旧的后台线程）
         - 统一的日志格式
+        - 写入在后台线程完成，调用方只付出入队的开销
     """
+    global _listener
+
     root_logger = logging.getLogger()
-    
+
     # 避免重复配置：清空已有handlers
+    stop_logging()
     if root_logger.handlers:
         root_logger.handlers.clear()
-    
+
     root_logger.setLevel(getattr(logging, level.upper(), logging.INFO))
-    
+
+    subsystem_levels = {name: logging.getLevelName(value.upper()) for name, value in (levels or {}).items()}
+    subsystem_levels.update(parse_log_levels(os.environ.get(LOG_LEVELS_ENV)))
+    for name, value in subsystem_levels.items():
+        if isinstance(value, int):
+            logging.getLogger(name).setLevel(value)
+
     # 统一日志格式
-    formatter = logging.Formatter(
-        "%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
-    
+    formatter = logging.Formatter(fmt, datefmt=DEFAULT_DATEFMT)
+
     # 控制台输出（使用stderr避免干扰stdout通信）
     console_handler = logging.StreamHandler(sys.stderr)
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
-    
+    handlers = [console_handler]
+    messages = []
+
     # 可选的文件输出
     if log_dir:
         try:
             os.makedirs(log_dir, exist_ok=True)
-            
+
             # 按日期命名日志文件
             log_file = os.path.join(
-                log_dir, 
+                log_dir,
                 f"log_{datetime.now().strftime('%Y-%m-%d')}.log"
             )
-            
+
             # 使用TimedRotatingFileHandler实现按日期轮转
             # when='midnight': 每天午夜轮转
             # interval=1: 每1天
@@ -63,19 +121,60 @@ def setup_logging(level: str = "INFO", log_dir: str = None) -> None:
                 backupCount=3,
                 encoding='utf-8'
             )
-            
+
             # 添加文件大小限制（10MB）
             # 注意：TimedRotatingFileHandler没有原生的maxBytes，
             # 但我们可以设置属性供监控使用
             file_handler.maxBytes = 10 * 1024 * 1024
-            
+
             file_handler.setFormatter(formatter)
-            root_logger.addHandler(file_handler)
-            
-            logging.info(f"日志系统已初始化 - 级别={level}, 文件={log_file}")
+            handlers.append(file_handler)
         except Exception as e:
             # 文件日志失败不应该阻止程序启动
-            logging.warning(f"文件日志配置失败，仅使用控制台日志: {e}")
-    else:
-        logging.info(f"日志系统已初始化 - 级别={level}, 仅控制台输出")
+            messages.append((logging.WARNING, f"文件日志配置失败，仅使用控制台日志: {e}"))
+            log_file = None
+    elif log_file:
+        try:
+            file_handler = logging.FileHandler(log_file, encoding='utf-8')
+            file_handler.setFormatter(formatter)
+            handlers.append(file_handler)
+        except OSError as e:
+            messages.append((logging.WARNING, f"文件日志配置失败，仅使用控制台日志: {e}"))
+            log_file = None
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root_logger.addHandler(_DeferredQueueHandler(log_queue))
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    for msg_level, message in messages:
+        logging.log(msg_level, message)
+    overrides = ", ".join(
+        f"{name}={logging.getLevelName(value)}"
+        for name, value in subsystem_levels.items()
+        if isinstance(value, int)
+    )
+    logging.info(
+        "日志系统已初始化 - 级别=%s, %s%s",
+        level,
+        f"文件={log_file}" if log_file else "仅控制台输出",
+        f", 子系统级别: {overrides}" if overrides else "",
+    )
+
+
+def stop_logging() -> None:
+    """停止后台写日志线程并写出队列中剩余的记录（可重复调用）"""
+    global _listener
+
+    listener = _listener
+    _listener = None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            try:
+                handler.close()
+            except Exception:
+                pass
+
 
+atexit.register(stop_logging)
@@ -0,0 +1,173 @@
+"""进程内共享的 ASR 模型注册表
+
+VoCoTypeFactory 在一次会话中可能创建多个 VoCoTypeEngine 实例，每个实例以前都会
+构造自己的 FunASRServer，同一 ibus-engine 进程里因此可能同时持有多份约 700MB 的模型。
+这里按引用计数管理进程内唯一的 FunASRServer：
+
+- acquire() 返回共享句柄，首个调用方负责加载，并发调用方等待同一次加载完成；
+- 整段识别经单线程执行器串行执行，多个引擎实例不会同时进入同一组 ONNX 会话；
+- 最后一个句柄 release() 后，模型在 FUNASR_MODEL_IDLE_UNLOAD_S 秒内无人使用才释放
+  （负数表示常驻），避免引擎短暂销毁重建时反复加载。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from app.funasr_config import MODEL_IDLE_UNLOAD_S
+
+logger = logging.getLogger(__name__)
+
+_cond = threading.Condition()
+_server = None
+_refs = 0
+_loading = False
+_executor: Optional[ThreadPoolExecutor] = None
+_idle_timer: Optional[threading.Timer] = None
+
+
+class SharedASR:
+    """共享 FunASRServer 的句柄
+
+    transcribe_audio / transcribe_samples / transcribe_batch 在共享执行器上运行；
+    create_stream_session 创建的会话对离线 ASR/标点模型的调用也提交到该执行器。
+    其余属性（streaming_available 等）直接转发给 FunASRServer。
+    """
+
+    def __init__(self, server, executor: ThreadPoolExecutor) -> None:
+        self._server = server
+        self._executor = executor
+        self._released = False
+
+    @property
+    def server(self):
+        return self._server
+
+    def _infer(self, fn, *args, **kwargs):
+        return self._executor.submit(fn, *args, **kwargs).result()
+
+    def transcribe_audio(self, *args, **kwargs) -> dict:
+        return self._infer(self._server.transcribe_audio, *args, **kwargs)
+
+    def transcribe_samples(self, *args, **kwargs) -> dict:
+        return self._infer(self._server.transcribe_samples, *args, **kwargs)
+
+    def transcribe_batch(self, *args, **kwargs) -> list:
+        return self._infer(self._server.transcribe_batch, *args, **kwargs)
+
+    def create_stream_session(self, *args, **kwargs):
+        return self._server.create_stream_session(*args, infer=self._infer, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._server, name)
+
+    def release(self) -> None:
+        """归还句柄（可重复调用）"""
+        if self._released:
+            return
+        self._released = True
+        release(self)
+
+
+def acquire(timeout: float = 300.0) -> SharedASR:
+    """获取共享的 ASR 服务，必要时加载模型
+
+    Raises:
+        RuntimeError: 模型加载失败或等待超时
+    """
+    global _server, _refs, _loading, _executor
+
+    with _cond:
+        _cancel_idle_timer()
+        _refs += 1
+        while _loading:
+            if not _cond.wait(timeout=timeout):
+                _refs -= 1
+                raise RuntimeError("等待共享 ASR 模型加载超时")
+        if _server is not None:
+            logger.info("复用已加载的共享 ASR 模型（引用数=%d）", _refs)
+            return SharedASR(_server, _executor)
+        _loading = True
+
+    # 在锁外加载，其他调用方在 _cond 上等待
+    server = None
+    error = None
+    try:
+        from app.funasr_server import FunASRServer
+
+        logger.info("加载共享 ASR 模型...")
+        server = FunASRServer()
+        result = server.initialize()
+        if not result.get("success"):
+            error = result.get("error", "unknown")
+            server = None
+    except Exception as exc:  # noqa: BLE001
+        error = str(exc)
+        server = None
+
+    with _cond:
+        _loading = False
+        if server is not None:
+            _server = server
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ASRInference")
+        else:
+            _refs -= 1
+        _cond.notify_all()
+        if server is None:
+            raise RuntimeError(f"FunASR 初始化失败: {error}")
+        return SharedASR(server, _executor)
+
+
+def release(handle: SharedASR) -> None:
+    """归还句柄；引用数归零后按空闲策略释放模型"""
+    global _refs, _idle_timer
+
+    with _cond:
+        if handle.server is not _server or _refs <= 0:
+            return
+        _refs -= 1
+        logger.info("归还共享 ASR 模型（引用数=%d）", _refs)
+        if _refs > 0 or MODEL_IDLE_UNLOAD_S < 0:
+            return
+        if MODEL_IDLE_UNLOAD_S == 0:
+            _unload_locked()
+            return
+        _idle_timer = threading.Timer(MODEL_IDLE_UNLOAD_S, _unload_if_idle)
+        _idle_timer.daemon = True
+        _idle_timer.start()
+
+
+def reference_count() -> int:
+    """当前持有共享模型的句柄数"""
+    with _cond:
+        return _refs
+
+
+def _cancel_idle_timer() -> None:
+    global _idle_timer
+
+    if _idle_timer is not None:
+        _idle_timer.cancel()
+        _idle_timer = None
+
+
+def _unload_if_idle() -> None:
+    with _cond:
+        if _refs == 0 and not _loading:
+            _unload_locked()
+
+
+def _unload_locked() -> None:
+    """释放模型（调用方持有 _cond）"""
+    global _server, _idle_timer
+
+    _idle_timer = None
+    server = _server
+    _server = None
+    if server is not None:
+        logger.info("共享 ASR 模型已空闲，释放模型")
+        server.cleanup()
@@ -0,0 +1,272 @@
+"""ONNX Runtime 优化图缓存
+
+funasr_onnx 每次创建 InferenceSession 都会重新优化整张图，
+大模型（Paraformer-large、CT-Transformer）在每次进程启动时都要付出这部分耗时。
+install() 把 funasr_onnx 使用的 OrtInferSession 替换为带缓存的版本：首次加载时把
+优化后的模型写入缓存目录，之后直接加载已优化的模型并关闭图优化。
+
+缓存的图只做到 ORT_ENABLE_EXTENDED：ORT_ENABLE_ALL 的布局优化与具体 CPU 相关，
+序列化后在其他机器（如经 NFS 共享的 $HOME）上可能出错或变慢。
+
+缓存文件名为 <模型名>.<路径摘要>.<版本摘要>.<格式>.onnx。版本摘要覆盖模型大小、修改时间、
+模型版本与 onnxruntime 版本，变化时生成新的缓存文件；其他版本的缓存可能仍被另一个进程
+（如升级 onnxruntime 前启动的守护进程）使用，不会自动删除，只清理旧命名格式的缓存。
+需要回收空间时可直接删除缓存目录。线程数等会话参数不影响序列化的图，不参与缓存键，
+线程分配不同的进程（IBus、基准测试、量化工具）共用同一份缓存。
+仅对 CPU 推理启用，CUDA 等执行提供者的优化结果与设备相关。
+
+会话参数同时应用 app.thread_budget 的绑核设置（FUNASR_PIN_THREADS）。
+
+FUNASR_MMAP_WEIGHTS 开启时，缓存的优化模型把权重另存为外部数据文件（<缓存名>.onnx.data），
+onnxruntime 以只读 mmap 映射该文件而不是读入进程堆，同时运行的多个进程共享同一份页缓存。
+权重预打包会把矩阵乘的权重复制为进程私有的布局，该模式下一并关闭。
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import logging
+import os
+import platform
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from app.funasr_config import MMAP_WEIGHTS, MODEL_REVISION, ORT_CACHE, ORT_CACHE_DIR, ORT_CPU_MEM_ARENA
+from app.thread_budget import get_thread_plan, intra_op_affinities, loading_model
+
+logger = logging.getLogger(__name__)
+
+# 使用 OrtInferSession 的 funasr_onnx 模块
+_PATCHED_MODULES = (
+    "funasr_onnx.paraformer_bin",
+    "funasr_onnx.paraformer_online_bin",
+    "funasr_onnx.vad_bin",
+    "funasr_onnx.punc_bin",
+)
+
+_install_lock = threading.Lock()
+_installed = False
+
+
+def _session_options(intra_op_num_threads: int):
+    """与 funasr_onnx 一致的会话参数，内存池可通过 FUNASR_ORT_CPU_MEM_ARENA 开启
+
+    inter-op 线程数与绑核的核心按 thread_budget.model_scope 标记的模型选取。
+    """
+    from onnxruntime import SessionOptions
+
+    model = loading_model()
+    sess_opt = SessionOptions()
+    sess_opt.intra_op_num_threads = intra_op_num_threads
+    sess_opt.inter_op_num_threads = get_thread_plan().inter_threads_for(model)
+    sess_opt.log_severity_level = 4
+    sess_opt.enable_cpu_mem_arena = ORT_CPU_MEM_ARENA
+    affinities = intra_op_affinities(intra_op_num_threads, model)
+    if affinities:
+        sess_opt.add_session_config_entry("session.intra_op_thread_affinities", affinities)
+    if MMAP_WEIGHTS:
+        # 预打包的权重是进程私有的副本，关闭后推理直接读取映射的权重
+        sess_opt.add_session_config_entry("session.disable_prepacking", "1")
+    return sess_opt
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:12]
+
+
+def _cache_file(model_file: Path) -> Path:
+    import onnxruntime
+
+    stat = model_file.stat()
+    source = _digest(model_file.resolve())
+    version = _digest(stat.st_size, stat.st_mtime_ns, MODEL_REVISION, onnxruntime.__version__, platform.machine())
+    # 内嵌权重与外部权重（FUNASR_MMAP_WEIGHTS）两种格式并存，互不清理
+    layout = "mmap" if MMAP_WEIGHTS else "std"
+    return Path(ORT_CACHE_DIR) / model_file.parent.name / f"{model_file.stem}.{source}.{version}.{layout}.onnx"
+
+
+def _data_file(cache_file: Path) -> Path:
+    """缓存模型的外部权重文件（仅 FUNASR_MMAP_WEIGHTS 模式生成）"""
+    return cache_file.with_name(f"{cache_file.name}.data")
+
+
+def _unlink(path: Path) -> bool:
+    # 已映射该文件的进程不受影响：unlink 只删除目录项，映射的 inode 保留到进程退出
+    try:
+        path.unlink()
+        return True
+    except OSError:
+        return False
+
+
+def _remove_stale(cache_file: Path) -> None:
+    """删除同一模型的旧命名格式缓存
+
+    当前格式的其他版本可能正被别的进程加载或映射（例如另一个 onnxruntime 版本的进程），
+    一律保留。
+    """
+    stem = cache_file.name.split(".", 1)[0]
+    for path in cache_file.parent.glob(f"{stem}.*.onnx"):
+        if len(path.name[: -len(".onnx")].split(".")) == 4:
+            continue
+        if _unlink(path):
+            logger.info("已删除过期的 ORT 优化模型: %s", path)
+        _unlink(_data_file(path))
+
+
+@contextmanager
+def _generation_lock(cache_file: Path):
+    """跨进程互斥地生成缓存，避免两个进程同时写同一个外部权重文件"""
+    try:
+        lock = open(cache_file.parent / f"{cache_file.name.split('.', 1)[0]}.lock", "w")
+    except OSError:
+        yield
+        return
+    with lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def _load_cached(cache_file: Path, intra_op_num_threads: int, providers):
+    """加载缓存的优化模型，失败时删除缓存并返回 None"""
+    from onnxruntime import GraphOptimizationLevel, InferenceSession
+
+    sess_opt = _session_options(intra_op_num_threads)
+    sess_opt.graph_optimization_level = GraphOptimizationLevel.ORT_DISABLE_ALL
+    try:
+        session = InferenceSession(str(cache_file), sess_options=sess_opt, providers=providers)
+        logger.info("已加载缓存的 ORT 优化模型%s: %s", "（权重内存映射）" if MMAP_WEIGHTS else "", cache_file)
+        return session
+    except Exception as exc:
+        logger.warning("缓存的 ORT 优化模型无法加载，重新生成: %s", exc)
+        _unlink(cache_file)
+        _unlink(_data_file(cache_file))
+        return None
+
+
+def create_session(model_file, intra_op_num_threads: int = 4):
+    """创建 CPU InferenceSession，优先加载缓存的优化模型
+
+    FUNASR_ORT_CACHE 与 FUNASR_MMAP_WEIGHTS 均关闭时仅应用会话参数；
+    权重内存映射依赖外部数据格式的缓存文件，因此开启时即使关闭 FUNASR_ORT_CACHE 也会生成缓存。
+    """
+    from onnxruntime import GraphOptimizationLevel, InferenceSession
+
+    model_file = Path(model_file)
+    providers = [("CPUExecutionProvider", {"arena_extend_strategy": "kSameAsRequested"})]
+    if not (ORT_CACHE or MMAP_WEIGHTS):
+        sess_opt = _session_options(intra_op_num_threads)
+        sess_opt.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_ALL
+        return InferenceSession(str(model_file), sess_options=sess_opt, providers=providers)
+
+    cache_file = _cache_file(model_file)
+
+    if cache_file.exists():
+        session = _load_cached(cache_file, intra_op_num_threads, providers)
+        if session is not None:
+            return session
+
+    if not MMAP_WEIGHTS:
+        return _optimize(model_file, cache_file, intra_op_num_threads, providers)
+
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+    except OSError as exc:
+        logger.warning("无法创建 ORT 缓存目录 %s: %s", cache_file.parent, exc)
+    with _generation_lock(cache_file):
+        # 等待锁期间其他进程可能已生成缓存
+        if cache_file.exists():
+            session = _load_cached(cache_file, intra_op_num_threads, providers)
+            if session is not None:
+                return session
+        # 不覆盖旧的权重文件：正在映射它的进程会看到被改写的内容
+        _unlink(_data_file(cache_file))
+        session = _optimize(model_file, cache_file, intra_op_num_threads, providers)
+        if cache_file.exists():
+            # 生成缓存的会话持有原模型权重的私有副本，改为加载映射外部权重的缓存
+            mapped = _load_cached(cache_file, intra_op_num_threads, providers)
+            if mapped is not None:
+                return mapped
+    return session
+
+
+def _optimize(model_file: Path, cache_file: Path, intra_op_num_threads: int, providers):
+    """以 ORT_ENABLE_EXTENDED 优化加载原模型，并把优化结果写入缓存
+
+    生成缓存的会话与之后加载缓存的会话使用同一份优化结果，首次启动与后续启动的行为一致。
+    """
+    from onnxruntime import GraphOptimizationLevel, InferenceSession
+
+    sess_opt = _session_options(intra_op_num_threads)
+    sess_opt.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    # 先写入唯一的临时文件再改名：避免其他进程读到半个文件，
+    # 也避免同一进程内并发加载同一模型（如 vad 与 vad_online）时写入同一个临时文件
+    tmp_file = None
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=f"{cache_file.name}.", suffix=".tmp", dir=cache_file.parent)
+        os.close(fd)
+        tmp_file = Path(tmp_name)
+        sess_opt.optimized_model_filepath = str(tmp_file)
+        if MMAP_WEIGHTS:
+            # 外部数据文件名相对于模型所在目录，改名后的缓存模型仍指向同一个文件
+            sess_opt.add_session_config_entry(
+                "session.optimized_model_external_initializers_file_name", _data_file(cache_file).name
+            )
+    except OSError as exc:
+        logger.warning("无法创建 ORT 缓存目录 %s: %s", cache_file.parent, exc)
+        tmp_file = None
+
+    try:
+        session = InferenceSession(str(model_file), sess_options=sess_opt, providers=providers)
+    except Exception:
+        if tmp_file is not None and tmp_file.exists():
+            tmp_file.unlink()
+        raise
+    if tmp_file is not None and tmp_file.exists():
+        if tmp_file.stat().st_size == 0:
+            # onnxruntime 未写出优化模型（mkstemp 预先创建的空文件）
+            _unlink(tmp_file)
+            return session
+        try:
+            os.replace(tmp_file, cache_file)
+            _remove_stale(cache_file)
+            logger.info("已缓存 ORT 优化模型: %s", cache_file)
+        except OSError as exc:
+            logger.warning("保存 ORT 优化模型失败: %s", exc)
+    return session
+
+
+def install() -> None:
+    """让 funasr_onnx 的模型加载器使用带缓存的 OrtInferSession（可重复调用）"""
+    global _installed
+
+    with _install_lock:
+        if _installed:
+            return
+
+        from funasr_onnx.utils.utils import OrtInferSession
+
+        class CachedOrtInferSession(OrtInferSession):
+            def __init__(self, model_file, device_id=-1, intra_op_num_threads=4):
+                if str(device_id) != "-1":
+                    super().__init__(model_file, device_id, intra_op_num_threads=intra_op_num_threads)
+                    return
+                self._verify_model(model_file)
+                self.session = create_session(model_file, intra_op_num_threads)
+
+        # 只替换已导入的模块（initialize 会先预导入本次需要的加载器）
+        for name in _PATCHED_MODULES:
+            module = sys.modules.get(name)
+            if module is not None and hasattr(module, "OrtInferSession"):
+                module.OrtInferSession = CachedOrtInferSession
+
+        _installed = True
+        if ORT_CACHE:
+            logger.info("ORT 优化图缓存已启用: %s", ORT_CACHE_DIR)
+        if MMAP_WEIGHTS:
+            logger.info("模型权重以只读内存映射加载，进程间共享页缓存")
@@ -0,0 +1,59 @@
+"""funasr_onnx Paraformer 的批量推理适配
+
+funasr_onnx.Paraformer.__call__ 只对文件路径列表分批，内存中的波形要批量推理只能直接调用
+其内部的 extract_feat / infer / decode 与 funasr_onnx.utils.postprocess_utils。
+这些都不是公开接口，这里集中封装，并只在验证过的 funasr_onnx 版本上启用，
+其他版本由调用方回退逐条推理。
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 验证过内部接口的 funasr_onnx 版本（前缀匹配，与 requirements.txt 的固定版本一致）
+TESTED_VERSIONS = ("0.4.",)
+
+_supported: Optional[bool] = None
+
+
+def _installed_version() -> Optional[str]:
+    try:
+        from importlib.metadata import version
+
+        return version("funasr_onnx")
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def supports_batch(model) -> bool:
+    """模型是否可以走批量推理（funasr_onnx 版本经过验证且具备所需的内部方法）"""
+    global _supported
+
+    if not all(hasattr(model, name) for name in ("extract_feat", "infer", "decode")):
+        return False
+    if _supported is None:
+        installed = _installed_version()
+        _supported = installed is not None and installed.startswith(TESTED_VERSIONS)
+        if not _supported:
+            logger.warning("funasr_onnx %s 未经批量推理验证，批量请求回退逐条识别", installed or "(未知版本)")
+    return _supported
+
+
+def infer_batch(model, waveforms: list) -> List[dict]:
+    """一次推理多段 16kHz float32 波形，返回与输入一一对应的 {"preds": ...}"""
+    from funasr_onnx.utils.postprocess_utils import (
+        sentence_postprocess,
+        sentence_postprocess_sentencepiece,
+    )
+
+    if getattr(model, "language", None) == "en-bpe":
+        postprocess = sentence_postprocess_sentencepiece
+    else:
+        postprocess = sentence_postprocess
+    feats, feats_len = model.extract_feat(waveforms)
+    outputs = model.infer(feats, feats_len)
+    preds = model.decode(outputs[0], outputs[1])
+    return [{"preds": postprocess(pred)} for pred in preds]
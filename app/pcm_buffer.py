@@ -0,0 +1,162 @@
+"""Preallocated PCM buffers shared by the capture paths."""
+
+from __future__ import annotations
+
+import threading
+from typing import Optional
+
+import numpy as np
+
+
+class PcmRingBuffer:
+    """定长 PCM 环形缓冲区
+
+    启动时一次性分配存储，音频回调中写入只做切片拷贝，不产生新的数组；
+    写满后覆盖最旧的样本。用于热麦克风模式下保存按下 PTT 之前的预录音频。
+    """
+
+    def __init__(self, capacity: int, dtype=np.int16) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self._data = np.zeros(capacity, dtype=dtype)
+        self._capacity = capacity
+        self._write_pos = 0
+        self._filled = 0
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def __len__(self) -> int:
+        return self._filled
+
+    def write(self, samples: np.ndarray) -> None:
+        """追加样本（可在音频回调中调用）"""
+        samples = np.asarray(samples).reshape(-1)
+        count = samples.size
+        if count == 0:
+            return
+
+        with self._lock:
+            if count >= self._capacity:
+                # 只保留最新的 capacity 个样本
+                self._data[:] = samples[-self._capacity:]
+                self._write_pos = 0
+                self._filled = self._capacity
+                return
+
+            end = self._write_pos + count
+            if end <= self._capacity:
+                self._data[self._write_pos:end] = samples
+            else:
+                first = self._capacity - self._write_pos
+                self._data[self._write_pos:] = samples[:first]
+                self._data[:count - first] = samples[first:]
+            self._write_pos = end % self._capacity
+            self._filled = min(self._filled + count, self._capacity)
+
+    def read_latest(self, count: Optional[int] = None) -> np.ndarray:
+        """按时间顺序返回最近 count 个样本的副本（默认全部已写入样本）"""
+        with self._lock:
+            if count is None or count > self._filled:
+                count = self._filled
+            if count <= 0:
+                return np.zeros(0, dtype=self._data.dtype)
+
+            start = (self._write_pos - count) % self._capacity
+            if start + count <= self._capacity:
+                return self._data[start:start + count].copy()
+            return np.concatenate((self._data[start:], self._data[:self._write_pos]))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._write_pos = 0
+            self._filled = 0
+
+
+class PcmBuffer:
+    """可增长的预分配 PCM 缓冲区
+
+    音频回调直接把每个块拷贝进连续存储，不再为每个 20ms 块创建数组，
+    录音结束时 take() 直接返回已写入部分的视图，省去 np.concatenate 的整段拷贝。
+    容量不足时按倍数扩容（整段录音只发生 O(log n) 次）。
+
+    take() 交出当前存储后换用备用存储；调用方用完结果后调用 release() 归还，
+    该存储即成为下一次 take() 的备用存储，两块存储轮换使用，稳态下不再分配。
+    未归还时 take() 才会新分配一块初始容量的存储。
+    """
+
+    def __init__(self, initial_capacity: int, dtype=np.int16) -> None:
+        if initial_capacity <= 0:
+            raise ValueError("initial_capacity must be positive")
+        self._initial_capacity = initial_capacity
+        self._dtype = np.dtype(dtype)
+        self._data = np.empty(initial_capacity, dtype=self._dtype)
+        self._spare: Optional[np.ndarray] = None
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return self._size * self._dtype.itemsize
+
+    def append(self, samples: np.ndarray) -> None:
+        """追加样本（可在音频回调中调用）"""
+        samples = np.asarray(samples).reshape(-1)
+        count = samples.size
+        if count == 0:
+            return
+
+        with self._lock:
+            end = self._size + count
+            if end > self._data.size:
+                self._grow(end)
+            self._data[self._size:end] = samples
+            self._size = end
+
+    def take(self) -> np.ndarray:
+        """取出已写入的样本并清空缓冲区
+
+        返回的是原存储的视图（不拷贝），缓冲区随后改用备用存储，
+        因此调用方可以在后台线程中继续使用结果，不受下一次录音影响。
+        """
+        with self._lock:
+            if self._size == 0:
+                return np.zeros(0, dtype=self._dtype)
+            data = self._data[:self._size]
+            if self._spare is not None:
+                self._data, self._spare = self._spare, None
+            else:
+                self._data = np.empty(self._initial_capacity, dtype=self._dtype)
+            self._size = 0
+            return data
+
+    def release(self, samples: np.ndarray) -> None:
+        """归还 take() 返回的数组，其存储留给下一次 take() 使用
+
+        调用后不得再读取 samples。不是由 take() 取出的数组会被忽略。
+        """
+        storage = samples.base if samples.base is not None else samples
+        if not isinstance(storage, np.ndarray) or storage.dtype != self._dtype:
+            return
+        if storage.ndim != 1 or storage.size < self._initial_capacity:
+            return
+        with self._lock:
+            if storage is not self._data:
+                self._spare = storage
+
+    def clear(self) -> None:
+        with self._lock:
+            self._size = 0
+
+    def _grow(self, required: int) -> None:
+        capacity = self._data.size
+        while capacity < required:
+            capacity *= 2
+        data = np.empty(capacity, dtype=self._dtype)
+        data[:self._size] = self._data[:self._size]
+        self._data = data
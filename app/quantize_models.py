@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""为本地 fp32 模型生成 int8 动态量化模型（model_quant.onnx）
+
+_load_*_model 优先加载模型目录中的 model_quant.onnx，缺失时回退 fp32 的 model.onnx
+（例如通过 FUNASR_ASR_MODEL 等指定的自定义模型）。本工具从本地 model.onnx 生成量化模型，
+在本地 WAV 语料上与 fp32 模型对比，达标后才放入模型目录：
+
+- ASR：字错误率（CER）的增量。语料中与 WAV 同名的 .txt 作为参考文本，缺失时以 fp32 结果为参考
+- 标点：在 fp32 ASR 文本上对比两个模型的标点位置与符号一致率
+- VAD：语音段的时间重叠率（IoU）
+- 三者均要求量化模型不慢于 fp32（--min-speedup）
+
+量化参数与 FunASR 导出时一致（MatMul 按通道 uint8 动态量化，跳过输出层与偏置编码器）。
+已有 model_quant.onnx 的模型默认跳过；--force 重新生成时原文件备份为 model_quant.onnx.bak，
+--revert 撤销本工具生成的量化模型。
+
+用法：
+    python -m app.quantize_models --corpus ~/vocotype-corpus [--models asr,punc] [--dry-run]
+    python -m app.quantize_models --revert
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.download_models import local_model_path
+from app.funasr_config import MODELS
+from app.logging_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+MODEL_TYPES = ("asr", "vad", "punc")
+QUANT_FILE = "model_quant.onnx"
+BASE_FILE = "model.onnx"
+# 本工具生成的量化模型旁记录验证结果，--revert 只撤销有该记录的模型
+MARKER_FILE = "model_quant.vocotype.json"
+BACKUP_SUFFIX = ".bak"
+
+PUNCTUATION = set("，。？！、；：,.?!;:")
+
+
+def edit_distance(ref: str, hyp: str) -> int:
+    """字符级编辑距离"""
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1]
+
+
+def normalize_text(text: str) -> str:
+    """计算 CER 前去掉标点与空白"""
+    return "".join(ch for ch in text if ch not in PUNCTUATION and not ch.isspace())
+
+
+def punctuation_slots(text: str) -> Dict[int, str]:
+    """标点位置：第 n 个非标点字符之后的标点符号"""
+    slots = {}
+    count = 0
+    for ch in text:
+        if ch in PUNCTUATION:
+            slots[count] = slots.get(count, "") + ch
+        elif not ch.isspace():
+            count += 1
+    return slots
+
+
+def punctuation_agreement(reference: str, candidate: str) -> float:
+    """两个标点结果在出现标点的位置上的一致率（均无标点时为 1）"""
+    ref, cand = punctuation_slots(reference), punctuation_slots(candidate)
+    positions = set(ref) | set(cand)
+    if not positions:
+        return 1.0
+    return sum(ref.get(p) == cand.get(p) for p in positions) / len(positions)
+
+
+def segment_iou(reference: list, candidate: list) -> float:
+    """两组语音段 [[start_ms, end_ms], ...] 的时间重叠率（均无语音时为 1）"""
+
+    def covered(segments):
+        return {ms for start, end in segments for ms in range(int(start) // 10, int(end) // 10)}
+
+    ref, cand = covered(reference), covered(candidate)
+    if not ref and not cand:
+        return 1.0
+    return len(ref & cand) / len(ref | cand)
+
+
+def collect_corpus(corpus: Path, limit: Optional[int]) -> List[Path]:
+    files = sorted(corpus.rglob("*.wav")) if corpus.is_dir() else [corpus]
+    return files[:limit] if limit else files
+
+
+def quantize(base_file: Path, output_file: Path) -> None:
+    """MatMul 按通道 uint8 动态量化（与 FunASR 导出的 model_quant.onnx 一致）"""
+    try:
+        import onnx
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError as exc:
+        raise RuntimeError(f"量化需要 onnx 与 onnxruntime.quantization: {exc}（pip install onnx）") from exc
+
+    model = onnx.load(str(base_file), load_external_data=False)
+    nodes_to_exclude = [
+        node.name
+        for node in model.graph.node
+        if "output" in node.name or "bias_encoder" in node.name or "bias_decoder" in node.name
+    ]
+    del model
+    quantize_dynamic(
+        model_input=str(base_file),
+        model_output=str(output_file),
+        op_types_to_quantize=["MatMul"],
+        per_channel=True,
+        reduce_range=False,
+        weight_type=QuantType.QUInt8,
+        nodes_to_exclude=nodes_to_exclude,
+    )
+
+
+def stage_candidate(model_dir: Path) -> Path:
+    """在模型目录下建立暂存目录：链接模型的其余文件，量化结果写为其中的 model_quant.onnx
+
+    funasr_onnx 的加载器只接受模型目录，暂存目录让量化模型在放入模型目录之前即可加载验证。
+    """
+    staging = model_dir / f".quantize-{os.getpid()}"
+    staging.mkdir()
+    for entry in model_dir.iterdir():
+        if entry.name in (QUANT_FILE, staging.name) or entry.name.startswith(".quantize-"):
+            continue
+        (staging / entry.name).symlink_to(entry.resolve())
+    return staging
+
+
+def load_model(model_type: str, model_dir: Path, quantize_flag: bool):
+    """以与 FunASRServer 相同的方式加载 funasr_onnx 模型（CPU）"""
+    from app.thread_budget import get_thread_plan
+
+    threads = get_thread_plan().threads_for(model_type)
+    if model_type == "asr":
+        from funasr_onnx.paraformer_bin import Paraformer as loader
+    elif model_type == "vad":
+        from funasr_onnx.vad_bin import Fsmn_vad as loader
+    else:
+        from funasr_onnx.punc_bin import CT_Transformer as loader
+    return loader(str(model_dir), batch_size=1, device_id=-1, quantize=quantize_flag, intra_op_num_threads=threads)
+
+
+def _vad_segments(vad_result) -> list:
+    if isinstance(vad_result, list) and vad_result:
+        if isinstance(vad_result[0], list) and vad_result[0] and isinstance(vad_result[0][0], (list, tuple)):
+            return vad_result[0]
+        return vad_result
+    return []
+
+
+def run_model(model_type: str, model, inputs: list) -> tuple:
+    """对全部输入推理，返回 (输出列表, 总耗时秒)"""
+    from app.funasr_server import FunASRServer
+
+    outputs = []
+    elapsed = 0.0
+    if inputs:
+        # 首次推理包含内存分配与内核选择，预热一次不计入耗时，避免加速比失真
+        model(inputs[0])
+    for item in inputs:
+        start = time.perf_counter()
+        result = model(item)
+        elapsed += time.perf_counter() - start
+        if model_type == "asr":
+            outputs.append(FunASRServer._extract_text(result))
+        elif model_type == "vad":
+            outputs.append(_vad_segments(result))
+        else:
+            outputs.append(str(result[0]) if isinstance(result, tuple) else str(result))
+    return outputs, elapsed
+
+
+def evaluate(model_type: str, fp32_outputs: list, quant_outputs: list, references: list) -> dict:
+    """对比 fp32 与量化模型的输出"""
+    if model_type == "asr":
+        errors_fp32 = errors_quant = chars = 0
+        for fp32_text, quant_text, ref in zip(fp32_outputs, quant_outputs, references):
+            ref = normalize_text(ref if ref is not None else fp32_text)
+            chars += len(ref)
+            errors_fp32 += edit_distance(ref, normalize_text(fp32_text))
+            errors_quant += edit_distance(ref, normalize_text(quant_text))
+        cer_fp32 = errors_fp32 / chars if chars else 0.0
+        cer_quant = errors_quant / chars if chars else 0.0
+        return {"cer_fp32": round(cer_fp32, 4), "cer_quant": round(cer_quant, 4), "cer_delta": round(cer_quant - cer_fp32, 4)}
+    if model_type == "vad":
+        scores = [segment_iou(a, b) for a, b in zip(fp32_outputs, quant_outputs)]
+        return {"vad_iou": round(sum(scores) / len(scores), 4) if scores else 1.0}
+    scores = [punctuation_agreement(a, b) for a, b in zip(fp32_outputs, quant_outputs)]
+    return {"punc_agreement": round(sum(scores) / len(scores), 4) if scores else 1.0}
+
+
+def passes(metrics: dict, args) -> List[str]:
+    """返回未达标的原因（空列表表示通过）"""
+    failures = []
+    if metrics.get("cer_delta", 0.0) > args.max_cer_delta:
+        failures.append(f"CER 增加 {metrics['cer_delta']:.2%} > {args.max_cer_delta:.2%}")
+    if metrics.get("punc_agreement", 1.0) < args.min_punc_agreement:
+        failures.append(f"标点一致率 {metrics['punc_agreement']:.2%} < {args.min_punc_agreement:.2%}")
+    if metrics.get("vad_iou", 1.0) < args.min_vad_iou:
+        failures.append(f"VAD 重叠率 {metrics['vad_iou']:.2%} < {args.min_vad_iou:.2%}")
+    if metrics["speedup"] < args.min_speedup:
+        failures.append(f"加速比 {metrics['speedup']:.2f}x < {args.min_speedup:.2f}x")
+    return failures
+
+
+def activate(model_dir: Path, staging: Path, metrics: dict) -> None:
+    """把验证通过的量化模型放入模型目录，已有的 model_quant.onnx 备份为 .bak"""
+    quant_file = model_dir / QUANT_FILE
+    marker = model_dir / MARKER_FILE
+    if quant_file.exists() and not marker.exists():
+        os.replace(quant_file, quant_file.with_name(QUANT_FILE + BACKUP_SUFFIX))
+    os.replace(staging / QUANT_FILE, quant_file)
+    marker.write_text(json.dumps(metrics, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def revert(model_dir: Path) -> bool:
+    """撤销本工具生成的量化模型，恢复备份（没有备份时回到 fp32）"""
+    marker = model_dir / MARKER_FILE
+    if not marker.exists():
+        return False
+    quant_file = model_dir / QUANT_FILE
+    backup = quant_file.with_name(QUANT_FILE + BACKUP_SUFFIX)
+    if backup.exists():
+        os.replace(backup, quant_file)
+    elif quant_file.exists():
+        quant_file.unlink()
+    marker.unlink()
+    return True
+
+
+def process(model_type: str, model_dir: Path, wavs: list, references: list, asr_texts: Optional[list], args) -> dict:
+    """量化并验证一个模型，返回报告"""
+    report = {"model": model_type, "dir": str(model_dir)}
+    staging = stage_candidate(model_dir)
+    try:
+        start = time.perf_counter()
+        quantize(model_dir / BASE_FILE, staging / QUANT_FILE)
+        report["quantize_s"] = round(time.perf_counter() - start, 1)
+        report["size_mb"] = {
+            "fp32": round((model_dir / BASE_FILE).stat().st_size / 2**20, 1),
+            "quant": round((staging / QUANT_FILE).stat().st_size / 2**20, 1),
+        }
+
+        # 空文本不经过标点模型（与 FunASRServer._punctuate 一致）
+        inputs = [text for text in asr_texts if text.strip()] if model_type == "punc" else wavs
+        fp32_outputs, fp32_s = run_model(model_type, load_model(model_type, model_dir, False), inputs)
+        quant_outputs, quant_s = run_model(model_type, load_model(model_type, staging, True), inputs)
+
+        metrics = evaluate(model_type, fp32_outputs, quant_outputs, references)
+        metrics["speedup"] = round(fp32_s / quant_s, 2) if quant_s else 0.0
+        metrics["samples"] = len(inputs)
+        report.update(metrics)
+        failures = passes(metrics, args)
+        report["failures"] = failures
+        if failures:
+            report["status"] = "rejected"
+        elif args.dry_run:
+            report["status"] = "verified"
+        else:
+            report["status"] = "activated"
+            activate(model_dir, staging, report)
+        return report
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def fp32_transcripts(model_dir: Optional[Path], wavs: list) -> list:
+    """标点验证的输入：fp32 ASR 的原始识别文本"""
+    if model_dir is None or not (model_dir / BASE_FILE).exists():
+        raise RuntimeError("标点验证需要本地 ASR 模型生成输入文本")
+    texts, _ = run_model("asr", load_model("asr", model_dir, False), wavs)
+    return texts
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="为本地模型生成并验证 int8 动态量化模型")
+    parser.add_argument("--corpus", help="验证用的 WAV 文件或目录（同名 .txt 作为参考文本，可选）")
+    parser.add_argument("--models", default=",".join(MODEL_TYPES), help="要处理的模型（默认 asr,vad,punc）")
+    parser.add_argument("--limit", type=int, help="最多使用的 WAV 文件数")
+    parser.add_argument("--max-cer-delta", type=float, default=0.01, help="允许的 CER 增量（默认 0.01）")
+    parser.add_argument("--min-punc-agreement", type=float, default=0.95, help="标点一致率下限（默认 0.95）")
+    parser.add_argument("--min-vad-iou", type=float, default=0.95, help="VAD 语音段重叠率下限（默认 0.95）")
+    parser.add_argument("--min-speedup", type=float, default=1.0, help="相对 fp32 的最低加速比（默认 1.0）")
+    parser.add_argument("--force", action="store_true", help="已有 model_quant.onnx 时也重新生成")
+    parser.add_argument("--dry-run", action="store_true", help="只验证，不放入模型目录")
+    parser.add_argument("--revert", action="store_true", help="撤销本工具生成的量化模型")
+    parser.add_argument("--debug", action="store_true", help="输出调试日志")
+    args = parser.parse_args()
+
+    setup_logging("DEBUG" if args.debug else "WARNING")
+
+    model_types = [name.strip() for name in args.models.split(",") if name.strip()]
+    unknown = [name for name in model_types if name not in MODEL_TYPES]
+    if unknown:
+        parser.error(f"未知的模型: {', '.join(unknown)}")
+    model_dirs = {}
+    for model_type in MODEL_TYPES:
+        path = local_model_path(MODELS[model_type]["name"])
+        model_dirs[model_type] = Path(path) if path else None
+
+    if args.revert:
+        for model_type in model_types:
+            model_dir = model_dirs[model_type]
+            if model_dir is not None and revert(model_dir):
+                print(f"[{model_type}] 已撤销生成的量化模型: {model_dir}")
+            else:
+                print(f"[{model_type}] 没有本工具生成的量化模型")
+        return 0
+
+    if not args.corpus:
+        parser.error("需要 --corpus 指定验证语料")
+    wavs_paths = collect_corpus(Path(args.corpus).expanduser(), args.limit)
+    if not wavs_paths:
+        print(f"语料中没有 WAV 文件: {args.corpus}", file=sys.stderr)
+        return 1
+
+    pending = []
+    for model_type in model_types:
+        model_dir = model_dirs[model_type]
+        if model_dir is None or not (model_dir / BASE_FILE).exists():
+            print(f"[{model_type}] 跳过：本地没有 fp32 模型 {MODELS[model_type]['name']}")
+        elif (model_dir / QUANT_FILE).exists() and not args.force:
+            print(f"[{model_type}] 跳过：已有 {QUANT_FILE}（--force 重新生成）")
+        else:
+            pending.append(model_type)
+    if not pending:
+        return 0
+
+    from app.funasr_server import FunASRServer
+
+    wavs = [FunASRServer._load_audio_file(str(path)) for path in wavs_paths]
+    references = []
+    for path in wavs_paths:
+        txt = path.with_suffix(".txt")
+        references.append(txt.read_text(encoding="utf-8").strip() if txt.exists() else None)
+    asr_texts = fp32_transcripts(model_dirs["asr"], wavs) if "punc" in pending else None
+
+    failed = False
+    for model_type in pending:
+        print(f"[{model_type}] 量化并验证: {model_dirs[model_type]}")
+        try:
+            report = process(model_type, model_dirs[model_type], wavs, references, asr_texts, args)
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("量化失败", exc_info=True)
+            print(f"[{model_type}] 失败: {exc}")
+            failed = True
+            continue
+        summary = {k: v for k, v in report.items() if k not in ("model", "dir", "failures", "status")}
+        print(f"[{model_type}] {report['status']}: {json.dumps(summary, ensure_ascii=False)}")
+        for reason in report["failures"]:
+            print(f"[{model_type}]   未达标: {reason}")
+        failed = failed or report["status"] == "rejected"
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,383 @@
+"""Streaming recognition sessions fed with PCM blocks while the PTT key is held."""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from .audio_utils import StreamingResampler, pcm_to_waveform
+from .trace import UtteranceTrace
+
+logger = logging.getLogger(__name__)
+
+# 模型输入采样率
+_ASR_SAMPLE_RATE = 16000
+# finish() 放入队列的结束标记：识别线程处理完此前的音频后输出尾块
+_FINISH = object()
+
+
+class StreamSession:
+    """流式识别会话基类
+
+    录音线程通过 accept() 送入任意采样率的 PCM 块，accept() 只把原始块放入队列；
+    转换为 16kHz float32、重采样与分块拼接都在识别线程中完成，音频回调不做任何计算。
+    攒够一个分块后立即推理，使推理与说话重叠进行。
+    松开 PTT 时调用 finish() 处理剩余音频并返回与 FunASRServer.transcribe_audio
+    相同格式的结果字典。
+
+    infer(fn, *args) 用于调用与整段识别共用的离线模型（离线 ASR、标点）：共享模型时由
+    SharedASR 提供，在其唯一的推理执行器上运行，不与整段识别并发进入同一组 ONNX 会话。
+    """
+
+    # 每次送入识别线程的样本数（16kHz），由子类设置
+    chunk_samples = _ASR_SAMPLE_RATE // 2
+
+    def __init__(
+        self,
+        server,
+        sample_rate: int,
+        on_partial: Optional[Callable[[str], None]] = None,
+        options: Optional[dict] = None,
+        release: Optional[Callable[[], None]] = None,
+        infer: Optional[Callable[..., object]] = None,
+    ) -> None:
+        self._server = server
+        self._infer = infer or _call_inline
+        self.sample_rate = sample_rate
+        self._on_partial = on_partial
+        self._options = server._resolve_options(options)
+        self._release = release
+        # 逐块重采样（保留块间滤波器状态）
+        self._resampler = (
+            StreamingResampler(sample_rate, _ASR_SAMPLE_RATE)
+            if sample_rate != _ASR_SAMPLE_RATE
+            else None
+        )
+
+        self._queue: "queue.Queue[object]" = queue.Queue()
+        # 以下状态只在识别线程中访问
+        self._pending: List[np.ndarray] = []
+        self._pending_samples = 0
+        self._total_samples = 0
+        self._closed = False
+        self._error: Optional[str] = None
+        self._trace: Optional[UtteranceTrace] = None
+
+        self._thread = threading.Thread(
+            target=self._run,
+            daemon=True,
+            name=self.__class__.__name__,
+        )
+        self._thread.start()
+
+    @property
+    def duration(self) -> float:
+        """已送入的音频时长（秒）"""
+        return self._total_samples / float(_ASR_SAMPLE_RATE)
+
+    def accept(self, samples) -> None:
+        """送入一个 PCM 块（可在音频回调中调用：只复制原始块并入队）"""
+        if self._closed:
+            return
+        # 音频回调的缓冲区会被复用，必须复制
+        self._queue.put(np.array(samples, copy=True))
+
+    def finish(self, timeout: float = 30.0, trace: Optional[UtteranceTrace] = None) -> dict:
+        """结束会话：处理剩余音频并返回最终结果
+
+        录音期间已完成的推理不计入 trace，"asr" 只包含松开 PTT 后等待尾部识别的时间；
+        结果带有 "trace" 字段，日志由传入 trace 的调用方输出。
+        """
+        if self._closed:
+            return {"success": False, "error": "流式会话已结束", "type": "transcription_error"}
+        self._closed = True
+        self._trace = trace if trace is not None else UtteranceTrace("stream")
+        self._trace.annotate(streaming=True)
+        self._queue.put(_FINISH)
+
+        with self._trace.span("asr"):
+            self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            return {"success": False, "error": "流式识别超时", "type": "timeout_error"}
+        if self._error:
+            return {"success": False, "error": self._error, "type": "transcription_error"}
+
+        try:
+            result = self._finalize()
+            result["trace"] = self._trace.as_dict()
+            return result
+        except Exception as exc:
+            logger.error("流式识别收尾失败: %s", exc, exc_info=True)
+            return {"success": False, "error": f"流式识别失败: {exc}", "type": "transcription_error"}
+
+    def cancel(self) -> None:
+        """放弃会话（不转录），释放流式模型"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+
+    def _run(self) -> None:
+        try:
+            self._on_start()
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                if item is _FINISH:
+                    if not self._error:
+                        self._process(self._flush(), True)
+                    break
+                if not self._error:
+                    self._process(self._convert(item), False)
+        except Exception as exc:
+            self._error = f"流式识别失败: {exc}"
+            logger.error("流式识别线程异常: %s", exc, exc_info=True)
+        finally:
+            try:
+                self._on_stop()
+            finally:
+                if self._release:
+                    self._release()
+
+    def _convert(self, samples: np.ndarray) -> Optional[np.ndarray]:
+        """转换一个原始块，攒够 chunk_samples 时返回拼接好的分块"""
+        waveform = pcm_to_waveform(samples, self.sample_rate, _ASR_SAMPLE_RATE, resampler=self._resampler)
+        if waveform.size == 0:
+            return None
+        self._pending.append(waveform)
+        self._pending_samples += waveform.size
+        self._total_samples += waveform.size
+        if self._pending_samples < self.chunk_samples:
+            return None
+        return self._take_pending()
+
+    def _flush(self) -> np.ndarray:
+        """取出重采样器中滞后的最后几毫秒，返回剩余的全部音频"""
+        if self._resampler is not None:
+            rest = self._resampler.process(np.zeros(0, dtype=np.float32), final=True)
+            if rest.size:
+                self._pending.append(rest)
+                self._total_samples += rest.size
+        return self._take_pending()
+
+    def _take_pending(self) -> np.ndarray:
+        if not self._pending:
+            return np.zeros(0, dtype=np.float32)
+        chunk = self._pending[0] if len(self._pending) == 1 else np.concatenate(self._pending)
+        self._pending = []
+        self._pending_samples = 0
+        return chunk
+
+    def _process(self, chunk: Optional[np.ndarray], is_final: bool) -> None:
+        if chunk is None:
+            return
+        try:
+            self._decode(chunk, is_final)
+        except Exception as exc:
+            self._error = f"流式识别失败: {exc}"
+            logger.error("流式识别块处理失败: %s", exc, exc_info=True)
+
+    def _emit_partial(self, text: str) -> None:
+        if not self._on_partial:
+            return
+        try:
+            self._on_partial(text)
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("部分结果回调失败: %s", exc)
+
+    def _on_start(self) -> None:
+        """识别线程启动时调用（子类可重置模型状态）"""
+
+    def _on_stop(self) -> None:
+        """识别线程退出时调用"""
+
+    def _decode(self, chunk: np.ndarray, is_final: bool) -> None:
+        raise NotImplementedError
+
+    def _finalize(self) -> dict:
+        raise NotImplementedError
+
+
+class OnlineStreamSession(StreamSession):
+    """基于 paraformer-online 的流式识别会话，每 600ms 产出一次部分结果"""
+
+    def __init__(self, server, sample_rate, **kwargs) -> None:
+        from app.funasr_server import STREAM_CHUNK_SIZE
+
+        # 当前块帧数 × 60ms × 16 样本/ms
+        self.chunk_samples = STREAM_CHUNK_SIZE[1] * 960
+        self._model = server.asr_online_model
+        self._param_dict = {"cache": {}, "is_final": False}
+        self._pieces: List[str] = []
+        super().__init__(server, sample_rate, **kwargs)
+
+    @property
+    def text(self) -> str:
+        return "".join(self._pieces)
+
+    def _on_start(self) -> None:
+        # 前端在非 is_final 结束时不会自行清理状态，确保每个会话从干净状态开始
+        self._model.frontend.cache_reset()
+
+    def _on_stop(self) -> None:
+        if not self._param_dict["is_final"]:
+            self._model.frontend.cache_reset()
+
+    def _decode(self, chunk: np.ndarray, is_final: bool) -> None:
+        if is_final and self._total_samples == 0:
+            return
+        self._param_dict["is_final"] = is_final
+        asr_result = self._model(chunk, param_dict=self._param_dict)
+        if not asr_result:
+            return
+        piece = self._server._extract_text(asr_result)
+        if piece:
+            self._pieces.append(piece)
+            self._emit_partial(self.text)
+
+    def _finalize(self) -> dict:
+        raw_text = self.text
+        logger.info("流式识别完成，原始文本: %s...", raw_text[:100])
+        with self._trace.span("punc"):
+            final_text = self._infer(self._server._punctuate, raw_text, self._options["use_punc"])
+        duration = self.duration
+        self._trace.annotate(audio_s=round(duration, 3))
+        self._server.total_audio_duration += duration
+        result = self._server._build_result(final_text, raw_text, 0.0, duration)
+        result["streaming"] = True
+        return result
+
+
+class VadSegmentedSession(StreamSession):
+    """基于流式 VAD 的分句识别会话
+
+    录音期间用 Fsmn_vad_online 检测句子边界，每闭合一个语音段就在识别线程上
+    交给离线 Paraformer 识别；松开 PTT 时只需识别最后一段，再拼接各段文本并统一加标点。
+    """
+
+    # 流式 VAD 每次处理 200ms 音频
+    chunk_samples = _ASR_SAMPLE_RATE // 5
+    # 未识别音频缓冲区的初始容量（10 秒），不够时按倍数扩容
+    _initial_capacity = _ASR_SAMPLE_RATE * 10
+
+    def __init__(self, server, sample_rate, **kwargs) -> None:
+        self._vad = server.vad_online_model
+        self._param_dict = {"in_cache": [], "is_final": False}
+        # 已送入 VAD、尚未被识别消费的音频存放在 _audio[:_audio_size] 中，
+        # _base 为其首样本在会话中的位置
+        self._audio = np.empty(self._initial_capacity, dtype=np.float32)
+        self._audio_size = 0
+        self._base = 0
+        self._decoded_samples = 0
+        self._segment_start: Optional[int] = None
+        self._pieces: List[str] = []
+        self._segment_count = 0
+        super().__init__(server, sample_rate, **kwargs)
+
+    @property
+    def text(self) -> str:
+        return _join_pieces(self._pieces)
+
+    def _on_start(self) -> None:
+        self._vad.frontend.cache_reset()
+        self._vad.vad_scorer.AllResetDetection()
+
+    def _on_stop(self) -> None:
+        # is_final 调用会自行复位；取消或出错时手动清理，避免状态带入下个会话
+        if not self._param_dict["is_final"]:
+            self._vad.frontend.cache_reset()
+            self._vad.vad_scorer.AllResetDetection()
+
+    def _decode(self, chunk: np.ndarray, is_final: bool) -> None:
+        if chunk.size:
+            self._append(chunk)
+            self._decoded_samples += chunk.size
+        if is_final and self._decoded_samples == 0:
+            return
+
+        self._param_dict["is_final"] = is_final
+        # 流式前端不接受空输入，尾块为空时补 10ms 静音触发收尾
+        vad_input = chunk if chunk.size else np.zeros(_ASR_SAMPLE_RATE // 100, dtype=np.float32)
+        vad_result = self._vad(vad_input, param_dict=self._param_dict)
+
+        # 在线模式返回 [[[start_ms, end_ms], ...]]，未闭合的一端为 -1
+        for batch in vad_result or []:
+            for start_ms, end_ms in batch:
+                if start_ms != -1:
+                    self._segment_start = start_ms * _ASR_SAMPLE_RATE // 1000
+                if end_ms != -1 and self._segment_start is not None:
+                    self._recognize(self._segment_start, end_ms * _ASR_SAMPLE_RATE // 1000)
+                    self._segment_start = None
+
+        if is_final and self._segment_start is not None:
+            self._recognize(self._segment_start, self._decoded_samples)
+            self._segment_start = None
+
+    def _append(self, chunk: np.ndarray) -> None:
+        end = self._audio_size + chunk.size
+        if end > self._audio.size:
+            grown = np.empty(max(self._audio.size * 2, end), dtype=np.float32)
+            grown[:self._audio_size] = self._audio[:self._audio_size]
+            self._audio = grown
+        self._audio[self._audio_size:end] = chunk
+        self._audio_size = end
+
+    def _recognize(self, start: int, end: int) -> None:
+        """识别 [start, end) 样本区间，并丢弃此前已不再需要的音频"""
+        lo = min(max(start - self._base, 0), self._audio_size)
+        hi = min(max(end - self._base, 0), self._audio_size)
+        if hi > lo:
+            # _infer 同步返回，识别期间缓冲区不会被写入，可直接传视图
+            self._transcribe_segment(self._audio[lo:hi])
+
+        # 只把尚未识别的尾部移回缓冲区开头
+        remaining = self._audio_size - hi
+        self._audio[:remaining] = self._audio[hi:self._audio_size]
+        self._audio_size = remaining
+        self._base += hi
+
+    def _transcribe_segment(self, segment: np.ndarray) -> None:
+        self._segment_count += 1
+        asr_result = self._infer(self._server._run_asr, segment, self._options)
+        piece = self._server._extract_text(asr_result)
+        logger.debug(
+            "第 %s 段识别完成（%.2fs）: %s",
+            self._segment_count,
+            segment.size / float(_ASR_SAMPLE_RATE),
+            piece[:50],
+        )
+        if piece:
+            self._pieces.append(piece)
+            self._emit_partial(self.text)
+
+    def _finalize(self) -> dict:
+        raw_text = self.text
+        logger.info("分句识别完成，共 %s 段，原始文本: %s...", self._segment_count, raw_text[:100])
+        with self._trace.span("punc"):
+            final_text = self._infer(self._server._punctuate, raw_text, self._options["use_punc"])
+        duration = self.duration
+        self._trace.annotate(audio_s=round(duration, 3))
+        self._server.total_audio_duration += duration
+        result = self._server._build_result(final_text, raw_text, 0.0, duration)
+        result["streaming"] = True
+        return result
+
+
+def _call_inline(fn, *args):
+    """未提供推理执行器时直接在当前线程调用"""
+    return fn(*args)
+
+
+def _join_pieces(pieces: List[str]) -> str:
+    """拼接分段识别文本，英文单词之间补空格"""
+    text = ""
+    for piece in pieces:
+        if text and text[-1].isascii() and text[-1].isalnum() and piece[0].isascii() and piece[0].isalnum():
+            text += " "
+        text += piece
+    return text
@@ -0,0 +1,226 @@
+"""ONNX 推理线程预算
+
+三个 ONNX 会话（ASR / VAD / 标点）以前都使用 OMP_NUM_THREADS（默认 8）个线程，
+4 核笔记本上与 IBus/GLib 主循环和 Rime 争抢 CPU，32 核工作站上又用不满。
+这里根据 cgroup CPU 配额、CPU 亲和性和物理核心数计算可用预算，为每个模型分配
+intra-op / inter-op 线程数，并可选地把推理线程绑定到固定的物理核心。
+
+离线 ASR 的 intra-op 线程数有上限（FUNASR_ASR_MAX_THREADS，默认 8）：再多的线程对
+单条请求的延迟收益很小，多出的核心留给流式会话、标点和其他并发请求。
+绑核时各模型依次占用不同的核心，预算不够时才回绕共用；
+预算不少于 4 核时保留第一个物理核心给输入法主循环。
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_CPU_SYSFS = Path("/sys/devices/system/cpu")
+_CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+# 离线 ASR 的默认 intra-op 线程上限
+DEFAULT_ASR_MAX_THREADS = 8
+# 绑核时依次为各模型划分核心的顺序（离线 ASR 与流式 ASR 优先占用独立的核心）
+_PIN_ORDER = ("asr", "asr_online", "punc", "vad", "vad_online")
+
+# 正在加载的模型名（ort_cache 创建会话时据此选取线程数与核心）
+_loading_model: ContextVar[Optional[str]] = ContextVar("onnx_loading_model", default=None)
+
+
+@dataclass(frozen=True)
+class ThreadPlan:
+    """线程分配结果"""
+
+    budget: int
+    # 推理线程使用的逻辑 CPU（每个物理核心取一个）
+    cpus: Tuple[int, ...]
+    intra: Dict[str, int] = field(default_factory=dict)
+    inter: Dict[str, int] = field(default_factory=dict)
+    # 绑核时各模型使用的 CPU
+    cpu_sets: Dict[str, Tuple[int, ...]] = field(default_factory=dict)
+    pin: bool = False
+    source: str = ""
+
+    def threads_for(self, model: str) -> int:
+        return self.intra.get(model, 1)
+
+    def inter_threads_for(self, model: Optional[str]) -> int:
+        return self.inter.get(model, 1)
+
+    def cpus_for(self, model: Optional[str]) -> Tuple[int, ...]:
+        return self.cpu_sets.get(model, self.cpus)
+
+    def describe(self) -> str:
+        threads = ", ".join(f"{name}={count}" for name, count in self.intra.items())
+        text = f"预算={self.budget}核（{self.source}），线程: {threads}，CPU={list(self.cpus)}"
+        if self.pin:
+            sets = ", ".join(f"{name}={list(cpus)}" for name, cpus in self.cpu_sets.items())
+            return f"{text}，绑核: {sets}"
+        return f"{text}，绑核=否"
+
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    """读取 cgroup CPU 配额（核数），未限制时返回 None"""
+    # cgroup v2: "<quota> <period>" 或 "max <period>"
+    try:
+        quota, period = (_CGROUP_ROOT / "cpu.max").read_text().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+
+    # cgroup v1
+    try:
+        quota = int((_CGROUP_ROOT / "cpu" / "cpu.cfs_quota_us").read_text())
+        period = int((_CGROUP_ROOT / "cpu" / "cpu.cfs_period_us").read_text())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _allowed_cpus() -> list[int]:
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return list(range(os.cpu_count() or 1))
+
+
+def _physical_cpus(allowed: list[int]) -> list[int]:
+    """每个物理核心只保留一个逻辑 CPU（避免把两个线程放到同一核心的超线程上）"""
+    seen = set()
+    result = []
+    for cpu in allowed:
+        topology = _CPU_SYSFS / f"cpu{cpu}" / "topology"
+        try:
+            key = (
+                (topology / "physical_package_id").read_text().strip(),
+                (topology / "core_id").read_text().strip(),
+            )
+        except OSError:
+            key = ("cpu", str(cpu))
+        if key not in seen:
+            seen.add(key)
+            result.append(cpu)
+    return result or allowed
+
+
+def _split_cpus(cpus: list[int], intra: Dict[str, int]) -> Dict[str, Tuple[int, ...]]:
+    """按 _PIN_ORDER 依次为各模型划分连续的核心，超出预算时从头回绕"""
+    sets = {}
+    offset = 0
+    for name in _PIN_ORDER:
+        count = min(intra[name], len(cpus))
+        sets[name] = tuple(cpus[(offset + i) % len(cpus)] for i in range(count))
+        offset += count
+    return sets
+
+
+def plan_threads(env: Optional[Dict[str, str]] = None) -> ThreadPlan:
+    """计算推理线程分配
+
+    显式设置的 OMP_NUM_THREADS 作为预算上限；FUNASR_ASR_MAX_THREADS 限制离线 ASR 的线程数；
+    FUNASR_PIN_THREADS=true 时绑核。
+    """
+    env = os.environ if env is None else env
+    allowed = _allowed_cpus()
+    physical = _physical_cpus(allowed)
+
+    budget = len(physical)
+    source = f"{len(allowed)}逻辑/{len(physical)}物理核心"
+    quota = _cgroup_cpu_limit()
+    if quota is not None and quota < budget:
+        budget = max(1, math.floor(quota))
+        source += f"，cgroup配额{quota:g}"
+
+    explicit = env.get("OMP_NUM_THREADS")
+    if explicit:
+        try:
+            budget = max(1, min(budget, int(explicit)))
+            source += f"，OMP_NUM_THREADS={explicit}"
+        except ValueError:
+            pass
+
+    cpus = physical
+    if budget >= 4:
+        # 保留一个核心给 IBus/GLib 主循环与 Rime
+        budget -= 1
+        cpus = physical[1:]
+    cpus = cpus[:budget]
+
+    try:
+        asr_max = max(1, int(env.get("FUNASR_ASR_MAX_THREADS", DEFAULT_ASR_MAX_THREADS)))
+    except ValueError:
+        asr_max = DEFAULT_ASR_MAX_THREADS
+    intra = {
+        "asr": min(budget, asr_max),
+        # 流式 ASR 与录音同时进行，只用一半预算
+        "asr_online": max(1, min(budget // 2, asr_max)),
+        # 标点模型输入很短，线程再多收益有限
+        "punc": min(budget, 4),
+        # FSMN VAD 很小，单线程即可
+        "vad": 1,
+        "vad_online": 1,
+    }
+    # 模型图按顺序执行（ORT_SEQUENTIAL），不需要 inter-op 线程池
+    inter = {name: 1 for name in intra}
+    pin = env.get("FUNASR_PIN_THREADS", "false").strip().lower() in ("1", "true", "yes")
+    return ThreadPlan(
+        budget=budget,
+        cpus=tuple(cpus),
+        intra=intra,
+        inter=inter,
+        cpu_sets=_split_cpus(cpus, intra) if cpus else {},
+        pin=pin,
+        source=source,
+    )
+
+
+_plan: Optional[ThreadPlan] = None
+
+
+def get_thread_plan() -> ThreadPlan:
+    """进程内共享的线程分配（首次调用时计算）"""
+    global _plan
+    if _plan is None:
+        _plan = plan_threads()
+    return _plan
+
+
+@contextmanager
+def model_scope(model: str) -> Iterator[None]:
+    """标记当前线程正在加载的模型，期间创建的 ORT 会话使用该模型的 inter-op 线程数与核心"""
+    token = _loading_model.set(model)
+    try:
+        yield
+    finally:
+        _loading_model.reset(token)
+
+
+def loading_model() -> Optional[str]:
+    """当前线程正在加载的模型名（不在 model_scope 内时为 None）"""
+    return _loading_model.get()
+
+
+def intra_op_affinities(num_threads: int, model: Optional[str] = None) -> Optional[str]:
+    """生成 ORT session.intra_op_thread_affinities 配置值，未启用绑核时返回 None
+
+    ORT 只为线程池中除调用线程外的 num_threads-1 个线程设置亲和性，
+    逻辑处理器编号从 1 开始，各线程之间以分号分隔。
+    """
+    plan = get_thread_plan()
+    cpus = plan.cpus_for(model)
+    if not plan.pin or num_threads <= 1 or not cpus:
+        return None
+    return ";".join(str(cpus[i % len(cpus)] + 1) for i in range(1, num_threads))
@@ -0,0 +1,83 @@
+"""单次听写的分阶段计时
+
+一次听写从按下 F9 到文本上屏要经过录音、取出缓冲、重采样、VAD、ASR、标点、上屏
+等阶段，TranscriptionResult.inference_latency 只能给出其中推理部分的总耗时。
+UtteranceTrace 用 time.monotonic() 记录各时间点（相对按键时刻的偏移）和各阶段耗时，
+结果随识别结果字典返回（"trace" 字段），并在结束时输出一行结构化日志：
+
+    utterance_trace {"id": 3, "source": "ibus", "marks": {...}, "spans": {...}}
+
+只依赖标准库，可在输入法进程中直接导入。
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_trace_ids = itertools.count(1)
+
+
+class UtteranceTrace:
+    """一次听写的计时记录
+
+    mark() 记录时间点，span() 记录阶段耗时（同名阶段多次执行时累加，如分段 ASR）；
+    各线程只写入不同的键，不需要额外加锁。
+    """
+
+    def __init__(self, source: str = "", origin: Optional[float] = None) -> None:
+        self.id = next(_trace_ids)
+        self.source = source
+        self.origin = time.monotonic() if origin is None else origin
+        self.marks: Dict[str, float] = {}
+        self.spans: Dict[str, float] = {}
+        self.info: Dict[str, object] = {}
+        self._logged = False
+
+    def mark(self, stage: str, at: Optional[float] = None) -> None:
+        """记录时间点（已记录的时间点不覆盖，例如只保留第一个音频块）
+
+        at 为其他线程事先记录的 time.monotonic() 值，省略时取当前时刻。
+        """
+        if stage not in self.marks:
+            self.marks[stage] = time.monotonic() if at is None else at
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """记录 with 块的耗时（异常时同样记录）"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.spans[stage] = self.spans.get(stage, 0.0) + time.monotonic() - start
+
+    def annotate(self, **info) -> None:
+        """附加与计时相关的上下文（音频时长、采样率、是否流式等）"""
+        self.info.update(info)
+
+    def as_dict(self) -> dict:
+        """转换为字典：marks 为相对起点的毫秒偏移，spans 为各阶段毫秒耗时"""
+        result = {
+            "id": self.id,
+            "source": self.source,
+            "marks": {name: round((t - self.origin) * 1000, 1) for name, t in self.marks.items()},
+            "spans": {name: round(value * 1000, 1) for name, value in self.spans.items()},
+        }
+        if self.marks:
+            result["total_ms"] = round((max(self.marks.values()) - self.origin) * 1000, 1)
+        result.update(self.info)
+        return result
+
+    def log(self, level: int = logging.INFO) -> None:
+        """输出一行结构化日志（每条记录只输出一次）"""
+        if self._logged:
+            return
+        self._logged = True
+        if logger.isEnabledFor(level):
+            logger.log(level, "utterance_trace %s", json.dumps(self.as_dict(), ensure_ascii=False))
@@ -17,7 +17,9 @@ import numpy as np
 
 from .audio_capture import AudioCapture
 from .config import ensure_logging_dir, load_config
-from app.funasr_server import FunASRServer
+from .pcm_buffer import PcmBuffer
+from .trace import UtteranceTrace
+from .asr_client import connect_asr
 
 
 logger = logging.getLogger(__name__)
@@ -31,6 +33,8 @@ class TranscriptionResult:
     inference_latency: float
     confidence: float
     error: Optional[str] = None
+    # 分阶段计时（UtteranceTrace.as_dict()，单位毫秒）
+    trace: Optional[dict] = None
 
 
 class TranscriptionWorker:
@@ -40,9 +44,11 @@ class TranscriptionWorker:
         self,
         config_path: Optional[str] = None,
         on_result: Optional[Callable[[TranscriptionResult], None]] = None,
+        on_partial: Optional[Callable[[str], None]] = None,
     ) -> None:
         self.config = load_config(config_path)
         self.on_result = on_result
+        self.on_partial = on_partial
         self.log_dir = ensure_logging_dir(self.config)
         self.last_segment_path: Optional[Path] = None
         self._session_id_counter = itertools.count(1)
@@ -53,21 +59,24 @@ class TranscriptionWorker:
             sample_rate=audio_cfg["sample_rate"],
             block_ms=audio_cfg["block_ms"],
             device=audio_cfg.get("device"),
+            hot_mic=bool(audio_cfg.get("hot_mic", False)),
+            preroll_ms=int(audio_cfg.get("preroll_ms", 300)),
         )
+        # 热麦克风模式下提前打开输入流，预录缓冲区从此开始积累
+        self.audio.open()
 
-        self.fun_server = FunASRServer()
-        init_result = self.fun_server.initialize()
-        if not init_result.get("success"):
-            raise RuntimeError(f"FunASR 初始化失败: {init_result}")
+        # 优先使用常驻 ASR 守护进程，否则与同一进程内的其他使用方共享模型（失败时抛出 RuntimeError）
+        self.fun_server = connect_asr()
 
         self._running = threading.Event()
         self._recording = threading.Event()
         self._stop_requested = threading.Event()
-        self._capture_thread: Optional[threading.Thread] = None
         self._state_lock = threading.RLock()
         self._audio_cfg = audio_cfg
-        self._buffer: list[np.ndarray] = []
-        self._buffer_lock = threading.Lock()
+        # 音频回调直接写入的录音缓冲区（预分配 30 秒，不足时倍增）
+        self._buffer = PcmBuffer(audio_cfg["sample_rate"] * 30)
+        # 流式识别会话（FUNASR_STREAMING_MODE=online/vad 时录音期间边录边识别）
+        self._stream_session = None
         # 单次会话大小限制（字节）与计数器（配置健壮性：转换为正整型，非法回退至20MB）
         try:
             raw_limit = audio_cfg.get("max_session_bytes", 20 * 1024 * 1024)
@@ -79,8 +88,10 @@ class TranscriptionWorker:
             logger.warning("max_session_bytes 配置非法，已回退至 20MB")
         self._session_bytes: int = 0
         
-        # 异步转录队列和工作线程
-        self._transcription_queue: "queue.Queue[Optional[np.ndarray]]" = queue.Queue(maxsize=10)
+        self._trace: Optional[UtteranceTrace] = None
+
+        # 异步转录队列和工作线程（元素为 (音频, 流式会话或 None, 计时)）
+        self._transcription_queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=10)
         self._transcription_thread: Optional[threading.Thread] = None
         self._transcription_running = threading.Event()
         self._transcription_active = threading.Event()
@@ -109,12 +120,15 @@ class TranscriptionWorker:
             self._stop_transcription_worker()
             
             # 清理缓冲区
-            with self._buffer_lock:
-                self._buffer.clear()
+            self._buffer.clear()
             
             # 停止音频捕获
             if hasattr(self, 'audio'):
-                self.audio.stop()
+                self.audio.close()
+
+            # 归还共享 ASR 模型
+            if hasattr(self, 'fun_server'):
+                self.fun_server.release()
                 
             logger.debug("TranscriptionWorker 资源清理完成")
         except Exception as exc:
@@ -184,13 +198,13 @@ class TranscriptionWorker:
         while self._transcription_running.is_set():
             try:
                 # 从队列获取音频数据（阻塞等待，超时1秒）
-                samples = self._transcription_queue.get(timeout=1.0)
+                task = self._transcription_queue.get(timeout=1.0)
             except queue.Empty:
                 # 队列为空，继续等待
                 continue
 
             # None是停止信号
-            if samples is None:
+            if task is None:
                 logger.debug("收到停止信号，转录工作线程退出")
                 self._transcription_queue.task_done()
                 break
@@ -202,11 +216,14 @@ class TranscriptionWorker:
                 self._transcription_completed_count + 1,
                 self._transcription_queue.qsize(),
             )
+            samples, stream_session, trace = task
             try:
-                self._transcribe_once(samples)
+                self._transcribe_once(samples, stream_session, trace)
             except Exception as exc:
                 logger.error("转录工作线程出错: %s", exc, exc_info=True)
             finally:
+                # 录音存储归还给缓冲区，供之后的录音复用
+                self._buffer.release(samples)
                 self._transcription_active.clear()
                 self._transcription_completed_count += 1
                 self._transcription_queue.task_done()
@@ -223,21 +240,35 @@ class TranscriptionWorker:
             logger.info("Transcription worker starting (session_id=%s)", session_id)
             self._running.set()
             self._stop_requested.clear()
-            with self._buffer_lock:
-                self._buffer.clear()
-                self._session_bytes = 0
-            self.audio.start()
+            self._buffer.clear()
+            self._session_bytes = 0
+            self._stream_session = None
+            self._trace = trace = UtteranceTrace("worker")
+            trace.mark("press")
+            if self.fun_server.streaming_available:
+                try:
+                    self._stream_session = self.fun_server.create_stream_session(
+                        self._audio_cfg["sample_rate"],
+                        on_partial=self.on_partial,
+                        options=self.config.get("asr"),
+                    )
+                except Exception as exc:
+                    logger.warning("创建流式识别会话失败，回退整段识别: %s", exc)
             self._recording.set()
-            self._capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
-            self._capture_thread.start()
+            try:
+                self.audio.start(on_frame=self._on_audio_frame)
+            except Exception:
+                self._recording.clear()
+                self._running.clear()
+                if self._stream_session is not None:
+                    self._stream_session.cancel()
+                    self._stream_session = None
+                raise
+            trace.mark("stream_open")
             self._current_session_id = session_id
 
-    def stop(self, _from_capture_thread: bool = False) -> None:
-        """停止录音并提交转录任务
-        
-        Args:
-            _from_capture_thread: 内部参数，标识是否从capture线程调用（避免死锁）
-        """
+    def stop(self) -> None:
+        """停止录音并提交转录任务"""
         # 第一阶段：在锁内快速更新状态并保存资源引用
         with self._state_lock:
             if not self._running.is_set():
@@ -250,33 +281,30 @@ class TranscriptionWorker:
             self._stop_requested.set()
             self._running.clear()
             self._recording.clear()
-            
-            # 保存当前会话的线程引用，避免操作到新会话的线程
-            capture_thread_to_join = self._capture_thread
-            # 清空线程引用，允许新会话创建新线程
-            self._capture_thread = None
+            stream_session = self._stream_session
+            self._stream_session = None
+            trace = self._trace or UtteranceTrace("worker")
+            self._trace = None
+            trace.mark("release")
         
-        # 第二阶段：在锁外执行耗时操作
+        # 第二阶段：在锁外执行耗时操作（audio.stop 返回后回调不会再写入缓冲区）
         self.audio.stop()
-        
-        # 只有从外部调用时才join capture线程，避免自己join自己
-        # 使用保存的线程引用，而不是self._capture_thread
-        if not _from_capture_thread:
-            if capture_thread_to_join and capture_thread_to_join.is_alive():
-                capture_thread_to_join.join(timeout=5)
 
-        combined = self._combine_buffer()
-        self.audio.flush()
+        with trace.span("concatenate"):
+            combined = self._buffer.take()
+        logger.info("会话录音完成，总样本数=%s", combined.size)
 
-        if combined is None or combined.size == 0:
+        if combined.size == 0:
             logger.warning("未捕获到任何音频样本，跳过转写 (session_id=%s)", session_id)
+            if stream_session is not None:
+                stream_session.cancel()
             with self._state_lock:
                 self._current_session_id = None
             return
 
         # 将音频数据提交到转录队列，立即返回（异步处理）
         try:
-            self._transcription_queue.put_nowait(combined)
+            self._transcription_queue.put_nowait((combined, stream_session, trace))
             # 更新计数器时需要锁保护
             with self._state_lock:
                 self._transcription_task_count += 1
@@ -289,67 +317,44 @@ class TranscriptionWorker:
             )
         except queue.Full:
             logger.error("转录队列已满，无法提交新任务 (session_id=%s)！请等待当前转录完成。", session_id)
+            if stream_session is not None:
+                stream_session.cancel()
+            self._buffer.release(combined)
             # 即使队列满了，也不阻塞用户，只是记录错误
         
         # 最后清理session_id
         with self._state_lock:
             self._current_session_id = None
 
-    def _capture_loop(self) -> None:
-        queue_obj = self.audio.queue
-        while self._recording.is_set():
-            try:
-                frame = queue_obj.get(timeout=0.2)
-            except Exception:
-                if not self._recording.is_set():
-                    break
-                continue
+    def _on_audio_frame(self, frame: np.ndarray) -> None:
+        """音频回调：直接写入录音缓冲区并送入流式会话"""
+        if not self._recording.is_set():
+            return
 
-            try:
-                with self._buffer_lock:
-                    if isinstance(frame, np.ndarray):
-                        self._buffer.append(frame)
-                        bytes_added = frame.nbytes
-                    else:
-                        arr = np.frombuffer(frame, dtype=np.int16)
-                        self._buffer.append(arr)
-                        bytes_added = arr.nbytes
-                    self._session_bytes += bytes_added
-            except Exception as exc:
-                logger.error("处理音频帧时出错: %s", exc)
-
-            # 达到单次会话大小上限后，自动停止录音
-            if self._session_bytes >= self._max_session_bytes and not self._stop_requested.is_set():
-                logger.warning(
-                    "单次录音大小达到上限，自动停止（%s/%s 字节，%.2f/%.2f MB）",
-                    self._session_bytes,
-                    self._max_session_bytes,
-                    self._session_bytes / (1024 * 1024),
-                    self._max_session_bytes / (1024 * 1024),
-                )
-                # 从capture线程调用stop，传入标志避免死锁
-                self.stop(_from_capture_thread=True)
-                break  # 停止后立即退出循环
-
-        with self._buffer_lock:
-            frame_count = len(self._buffer)
-        logger.debug("capture loop exiting, collected %s frames", frame_count)
-
-    def _combine_buffer(self) -> Optional[np.ndarray]:
-        with self._buffer_lock:
-            if not self._buffer:
-                return None
-            try:
-                combined = np.concatenate(self._buffer, axis=0)
-                logger.info("会话录音合并完成，总样本数=%s", combined.size)
-                self._buffer.clear()
-                return combined
-            except Exception as exc:
-                logger.error("合并音频缓冲区时出错: %s", exc)
-                self._buffer.clear()  # 即使出错也清理缓冲区
-                return None
+        trace = self._trace
+        if trace is not None:
+            trace.mark("first_sample")
+        self._buffer.append(frame)
+        self._session_bytes += frame.nbytes
+        stream_session = self._stream_session
+        if stream_session is not None:
+            stream_session.accept(frame)
+
+        # 达到单次会话大小上限后，自动停止录音
+        if self._session_bytes >= self._max_session_bytes and not self._stop_requested.is_set():
+            logger.warning(
+                "单次录音大小达到上限，自动停止（%s/%s 字节，%.2f/%.2f MB）",
+                self._session_bytes,
+                self._max_session_bytes,
+                self._session_bytes / (1024 * 1024),
+                self._max_session_bytes / (1024 * 1024),
+            )
+            self._stop_requested.set()
+            # 不能在音频回调中停止音频流，交给独立线程执行
+            threading.Thread(target=self.stop, daemon=True).start()
 
-    def _write_temp_wav(self, samples: np.ndarray) -> str:
+    def _write_recent_wav(self, samples: np.ndarray) -> None:
+        """保存最近一次录音（供诊断和数据集记录插件使用）"""
         import wave
 
         sample_rate = self._audio_cfg["sample_rate"]
@@ -365,31 +370,39 @@ class TranscriptionWorker:
         os.replace(tmp_recent_path, recent_path)
         self.last_segment_path = recent_path
 
-        fd, path = tempfile.mkstemp(prefix="asr_session_", suffix=".wav")
-        os.close(fd)
-        with wave.open(path, "wb") as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)
-            wf.setframerate(sample_rate)
-            wf.writeframes(samples.tobytes())
-
-        return path
+    def _transcribe_once(
+        self,
+        samples: np.ndarray,
+        stream_session=None,
+        trace: Optional[UtteranceTrace] = None,
+    ) -> None:
+        if trace is None:
+            trace = UtteranceTrace("worker")
+        trace.mark("dequeue")
+        try:
+            with trace.span("wav_write"):
+                self._write_recent_wav(samples)
+        except OSError as exc:
+            self.last_segment_path = None
+            logger.warning("保存最近录音失败: %s", exc)
 
-    def _transcribe_once(self, samples: np.ndarray) -> None:
-        tmp_path = self._write_temp_wav(samples)
         start = time.time()
         try:
-            asr_result = self.fun_server.transcribe_audio(
-                tmp_path,
-                options=self.config.get("asr"),
-            )
+            asr_result = None
+            if stream_session is not None:
+                asr_result = stream_session.finish(trace=trace)
+                if not asr_result.get("success"):
+                    logger.warning("流式识别失败，回退整段识别: %s", asr_result.get("error"))
+                    asr_result = None
+            if asr_result is None:
+                asr_result = self.fun_server.transcribe_samples(
+                    samples,
+                    self._audio_cfg["sample_rate"],
+                    options=self.config.get("asr"),
+                    trace=trace,
+                )
         finally:
             inference_latency = time.time() - start
-            try:
-                os.remove(tmp_path)
-            except OSError:
-                logger.debug("删除临时文件失败: %s", tmp_path)
-
 
         if not asr_result.get("success"):
             result = TranscriptionResult(
@@ -399,6 +412,7 @@ class TranscriptionWorker:
                 inference_latency=inference_latency,
                 confidence=0.0,
                 error=asr_result.get("error", "unknown"),
+                trace=trace.as_dict(),
             )
         else:
             final_text = asr_result.get("text", "")
@@ -410,6 +424,7 @@ class TranscriptionWorker:
                 duration=asr_result.get("duration", 0.0),
                 inference_latency=inference_latency,
                 confidence=asr_result.get("confidence", 0.0),
+                trace=trace.as_dict(),
             )
 
         if self.on_result:
@@ -417,6 +432,8 @@ class TranscriptionWorker:
                 self.on_result(result)
             except Exception as exc:  # noqa: BLE001
                 logger.error("处理转写结果时出错: %s", exc)
+        trace.mark("delivered")
+        trace.log()
 
     @property
     def is_running(self) -> bool:
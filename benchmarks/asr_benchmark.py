@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""FunASRServer 延迟 / RTF 基准测试
+
+对本地 WAV 语料逐条执行识别，统计：
+- 冷启动耗时（FunASRServer 构造 + initialize，含各模型加载耗时）
+- 各阶段延迟的 p50/p95/p99：解码、重采样、VAD、ASR、标点，以及
+  transcribe_audio（文件路径）与 transcribe_samples（内存 PCM）的端到端延迟
+- 实时率 RTF（处理耗时 / 音频时长）
+- 峰值 RSS 与线程数
+
+结果以 JSON 输出，可用 compare 子命令对比两次提交的结果：
+
+    python benchmarks/asr_benchmark.py run --corpus ~/wavs --output before.json
+    python benchmarks/asr_benchmark.py run --corpus ~/wavs --output after.json
+    python benchmarks/asr_benchmark.py compare before.json after.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+logger = logging.getLogger("asr_benchmark")
+
+# 参与统计的阶段（顺序即报告顺序）
+STAGES = (
+    "decode",
+    "resample",
+    "vad",
+    "asr",
+    "punc",
+    "transcribe_audio",
+    "transcribe_samples",
+)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """最近秩百分位数（q 取 0-100）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(values: list[float]) -> dict:
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else 0.0,
+    }
+
+
+def peak_rss_mb() -> float:
+    # Linux 上 ru_maxrss 单位为 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def os_thread_count() -> int:
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("Threads:"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return threading.active_count()
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def collect_corpus(corpus: Path, limit: int | None) -> list[Path]:
+    files = sorted(corpus.rglob("*.wav")) if corpus.is_dir() else [corpus]
+    return files[:limit] if limit else files
+
+
+def read_pcm(path: Path):
+    """读取 WAV 的原始 int16 PCM 与采样率（模拟录音回调得到的数据）"""
+    import numpy as np
+    import soundfile as sf
+
+    data, sample_rate = sf.read(str(path), dtype="int16", always_2d=True)
+    return np.ascontiguousarray(data[:, 0]), sample_rate
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_file(server, path: Path, options: dict, stages: dict[str, list[float]]) -> dict:
+    """对单个文件分阶段计时，并分别测量两条端到端路径"""
+    from app.funasr_server import ASR_SAMPLE_RATE
+
+    resolved = server._resolve_options(options)
+
+    waveform, decode_s = timed(server._load_audio_file, str(path))
+    duration = waveform.size / float(ASR_SAMPLE_RATE)
+
+    pcm, sample_rate = read_pcm(path)
+    _, resample_s = timed(server._samples_to_waveform, pcm, sample_rate)
+
+    trimmed, vad_s = timed(server._apply_vad, waveform, resolved)
+    asr_s = punc_s = 0.0
+    text = ""
+    if trimmed is not None:
+        asr_result, asr_s = timed(server._run_asr, trimmed, resolved)
+        raw_text = server._extract_text(asr_result)
+        # 绕过标点缓存，测量模型本身的耗时
+        if resolved["use_punc"] and raw_text.strip() and server.punc_model is not None:
+            text, punc_s = timed(server._run_punc, raw_text)
+        else:
+            text = raw_text
+
+    _, audio_s = timed(server.transcribe_audio, str(path), options)
+    _, samples_s = timed(server.transcribe_samples, pcm, sample_rate, options)
+
+    for name, value in (
+        ("decode", decode_s),
+        ("resample", resample_s),
+        ("vad", vad_s),
+        ("asr", asr_s),
+        ("punc", punc_s),
+        ("transcribe_audio", audio_s),
+        ("transcribe_samples", samples_s),
+    ):
+        stages[name].append(value)
+
+    return {
+        "file": str(path),
+        "duration": duration,
+        "sample_rate": sample_rate,
+        "text": text,
+        "transcribe_audio": audio_s,
+        "transcribe_samples": samples_s,
+        "rtf": samples_s / duration if duration else 0.0,
+    }
+
+
+def run(args) -> int:
+    files = collect_corpus(Path(args.corpus).expanduser(), args.limit)
+    if not files:
+        print(f"语料目录中没有 WAV 文件: {args.corpus}", file=sys.stderr)
+        return 1
+
+    from app.funasr_server import FunASRServer
+    from app.thread_budget import get_thread_plan
+
+    cold_start = time.perf_counter()
+    server = FunASRServer()
+    init_result = server.initialize(wait_optional=True)
+    cold_start_s = time.perf_counter() - cold_start
+    if not init_result.get("success"):
+        print(json.dumps(init_result, ensure_ascii=False), file=sys.stderr)
+        return 1
+    rss_after_load = peak_rss_mb()
+
+    options = {}
+    if args.no_vad:
+        options["use_vad"] = False
+    if args.no_punc:
+        options["use_punc"] = False
+
+    # 预热：首次推理包含 ORT 内部的惰性初始化，不计入统计
+    for path in files[: args.warmup]:
+        server.transcribe_audio(str(path), options)
+
+    stages: dict[str, list[float]] = {name: [] for name in STAGES}
+    per_file = []
+    rtfs = []
+    total_audio = 0.0
+    for _ in range(args.repeat):
+        for path in files:
+            item = bench_file(server, path, options, stages)
+            per_file.append(item)
+            rtfs.append(item["rtf"])
+            total_audio += item["duration"]
+            logger.info("%.2fs 音频 %.3fs (RTF %.3f): %s", item["duration"], item["transcribe_samples"], item["rtf"], path.name)
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+        },
+        "thread_plan": get_thread_plan().describe(),
+        "corpus": {"files": len(files), "repeat": args.repeat, "audio_seconds": total_audio},
+        "cold_start": {"total": cold_start_s, "models": dict(server.model_load_times)},
+        "stages": {name: summarize(values) for name, values in stages.items()},
+        "rtf": summarize(rtfs),
+        "memory": {"rss_after_load_mb": rss_after_load, "peak_rss_mb": peak_rss_mb()},
+        "threads": {"python": threading.active_count(), "os": os_thread_count()},
+        "punc_cache": server.punc_cache_stats(),
+    }
+    if args.per_file:
+        report["files"] = per_file
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+        print(f"结果已写入: {args.output}")
+    print_report(report)
+    return 0
+
+
+def print_report(report: dict) -> None:
+    print(f"\n版本 {report['revision']}，{report['corpus']['files']} 个文件 × {report['corpus']['repeat']}，"
+          f"共 {report['corpus']['audio_seconds']:.1f} 秒音频")
+    print(f"冷启动: {report['cold_start']['total']:.2f}s  "
+          + "  ".join(f"{k}={v:.2f}s" for k, v in report["cold_start"]["models"].items()))
+    print(f"{'阶段':<20}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)")
+    for name, stats in report["stages"].items():
+        print(f"{name:<20}{stats['p50'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}{stats['p99'] * 1000:>10.1f}")
+    rtf = report["rtf"]
+    print(f"RTF p50={rtf['p50']:.3f} p95={rtf['p95']:.3f}")
+    print(f"峰值 RSS: {report['memory']['peak_rss_mb']:.0f}MB，线程: {report['threads']['os']}")
+
+
+def compare(args) -> int:
+    """对比两份结果的 p50/p95，任一阶段变慢超过阈值时返回 1"""
+    before = json.loads(Path(args.before).read_text(encoding="utf-8"))
+    after = json.loads(Path(args.after).read_text(encoding="utf-8"))
+    threshold = args.threshold / 100.0
+    regressed = False
+
+    def row(name, old, new):
+        nonlocal regressed
+        change = (new - old) / old if old else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  ← 变慢"
+            regressed = True
+        print(f"{name:<28}{old * 1000:>10.1f}{new * 1000:>10.1f}{change * 100:>+9.1f}%{flag}")
+
+    print(f"{before['revision']} → {after['revision']}（阈值 {args.threshold:g}%）")
+    print(f"{'指标':<28}{'之前':>10}{'之后':>10}{'变化':>10}  (ms)")
+    row("cold_start", before["cold_start"]["total"], after["cold_start"]["total"])
+    for name in STAGES:
+        if name in before["stages"] and name in after["stages"]:
+            for q in ("p50", "p95"):
+                row(f"{name}.{q}", before["stages"][name][q], after["stages"][name][q])
+    old_rss = before["memory"]["peak_rss_mb"]
+    new_rss = after["memory"]["peak_rss_mb"]
+    print(f"{'peak_rss_mb':<28}{old_rss:>10.0f}{new_rss:>10.0f}")
+    return 1 if regressed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="FunASRServer 延迟 / RTF 基准测试")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="在本地语料上运行基准测试")
+    run_parser.add_argument("--corpus", required=True, help="WAV 文件或包含 WAV 的目录（递归）")
+    run_parser.add_argument("--output", "-o", help="JSON 结果输出路径")
+    run_parser.add_argument("--repeat", type=int, default=3, help="语料重复次数（默认 3）")
+    run_parser.add_argument("--warmup", type=int, default=1, help="不计入统计的预热文件数（默认 1）")
+    run_parser.add_argument("--limit", type=int, help="最多使用的文件数")
+    run_parser.add_argument("--no-vad", action="store_true", help="禁用 VAD")
+    run_parser.add_argument("--no-punc", action="store_true", help="禁用标点恢复")
+    run_parser.add_argument("--per-file", action="store_true", help="在 JSON 中保留逐文件结果")
+    run_parser.add_argument("--verbose", "-v", action="store_true", help="输出逐文件日志")
+
+    compare_parser = sub.add_parser("compare", help="对比两份 JSON 结果")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="判定变慢的百分比（默认 10）")
+
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.INFO if getattr(args, "verbose", False) else logging.WARNING,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    if args.command == "run":
+        return run(args)
+    return compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
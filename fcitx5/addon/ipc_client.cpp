@@ -3,9 +3,13 @@
  */
 
 #include "ipc_client.h"
+#include <arpa/inet.h>
+#include <poll.h>
 #include <sys/socket.h>
 #include <sys/un.h>
 #include <unistd.h>
+#include <algorithm>
+#include <cstdlib>
 #include <cstring>
 #include <cerrno>
 #include <stdexcept>
@@ -15,45 +19,299 @@ using json = nlohmann::json;
 
 namespace vocotype {
 
-IPCClient::IPCClient(const std::string& socket_path)
-    : socket_path_(socket_path) {
-}
-
-IPCClient::~IPCClient() {
-}
-
-std::string IPCClient::sendRequest(const std::string& request) {
+namespace {
+
+// 持久连接握手标识，需与 app/ipc.py 中的 MAGIC 保持一致
+constexpr char kFrameMagic[] = {'V', 'C', 'T', '1'};
+constexpr size_t kFrameMagicSize = sizeof(kFrameMagic);
+// 帧头：payload 长度 + 请求 ID（均为 uint32 大端）
+constexpr size_t kFrameHeaderSize = 8;
+// 单个响应帧上限（与后端 MAX_REQUEST_BYTES 同量级，识别结果远小于此）
+constexpr uint32_t kMaxFrameBytes = 16 * 1024 * 1024;
+// 二进制数据分块大小（须不超过后端 MAX_REQUEST_BYTES）
+constexpr size_t kBodyChunkBytes = 256 * 1024;
+// 等待握手应答的超时，旧后端会一直等待 EOF，超时即视为不支持
+constexpr int kHandshakeTimeoutMs = 500;
+// 握手失败后重试持久连接的退避间隔（逐次加倍）
+constexpr int kHandshakeBackoffInitialMs = 1000;
+constexpr int kHandshakeBackoffMaxMs = 60000;
+
+int connectSocket(const std::string& socket_path) {
     // 创建 Unix Socket
-    int sock = socket(AF_UNIX, SOCK_STREAM, 0);
+    int sock = socket(AF_UNIX, SOCK_STREAM | SOCK_CLOEXEC, 0);
     if (sock < 0) {
-        throw std::runtime_error("Failed to create socket");
+        return -1;
     }
 
     // 连接到服务器
     struct sockaddr_un addr;
     std::memset(&addr, 0, sizeof(addr));
     addr.sun_family = AF_UNIX;
-    std::strncpy(addr.sun_path, socket_path_.c_str(), sizeof(addr.sun_path) - 1);
+    std::strncpy(addr.sun_path, socket_path.c_str(), sizeof(addr.sun_path) - 1);
 
     if (connect(sock, (struct sockaddr*)&addr, sizeof(addr)) < 0) {
         close(sock);
-        throw std::runtime_error("Failed to connect to backend: " + socket_path_);
+        return -1;
     }
+    return sock;
+}
 
-    // 发送请求（确保全部写入）
+bool writeAll(int fd, const char* data, size_t size) {
     size_t total_sent = 0;
-    while (total_sent < request.size()) {
-        ssize_t sent = send(sock, request.data() + total_sent,
-                            request.size() - total_sent, 0);
+    while (total_sent < size) {
+        ssize_t sent = send(fd, data + total_sent, size - total_sent, MSG_NOSIGNAL);
         if (sent < 0) {
             if (errno == EINTR) {
                 continue;
             }
-            close(sock);
-            throw std::runtime_error("Failed to send request");
+            return false;
         }
         total_sent += static_cast<size_t>(sent);
     }
+    return true;
+}
+
+bool readExact(int fd, char* data, size_t size) {
+    size_t total = 0;
+    while (total < size) {
+        ssize_t len = recv(fd, data + total, size - total, 0);
+        if (len < 0) {
+            if (errno == EINTR) {
+                continue;
+            }
+            return false;
+        }
+        if (len == 0) {
+            return false;
+        }
+        total += static_cast<size_t>(len);
+    }
+    return true;
+}
+
+bool readFrame(int fd, uint32_t& request_id, std::string& payload) {
+    char header[kFrameHeaderSize];
+    if (!readExact(fd, header, sizeof(header))) {
+        return false;
+    }
+    uint32_t length = 0;
+    uint32_t id = 0;
+    std::memcpy(&length, header, 4);
+    std::memcpy(&id, header + 4, 4);
+    length = ntohl(length);
+    request_id = ntohl(id);
+    if (length > kMaxFrameBytes) {
+        return false;
+    }
+    payload.resize(length);
+    return length == 0 || readExact(fd, payload.data(), length);
+}
+
+/**
+ * 将 int16 单声道 PCM 写入临时 WAV 文件
+ *
+ * @return 文件路径；失败时返回空字符串
+ */
+std::string writeTempWav(const std::string& pcm, int sample_rate) {
+    char path[] = "/tmp/vocotype-fcitx5-XXXXXX.wav";
+    int fd = mkstemps(path, 4);
+    if (fd < 0) {
+        return {};
+    }
+
+    std::string header;
+    auto append32 = [&header](uint32_t value) {
+        for (int i = 0; i < 4; ++i) {
+            header.push_back(static_cast<char>((value >> (8 * i)) & 0xff));
+        }
+    };
+    auto append16 = [&header](uint16_t value) {
+        header.push_back(static_cast<char>(value & 0xff));
+        header.push_back(static_cast<char>(value >> 8));
+    };
+    uint32_t data_size = static_cast<uint32_t>(pcm.size());
+    header.append("RIFF");
+    append32(36 + data_size);
+    header.append("WAVEfmt ");
+    append32(16);
+    append16(1);  // PCM
+    append16(1);  // 单声道
+    append32(static_cast<uint32_t>(sample_rate));
+    append32(static_cast<uint32_t>(sample_rate) * 2);
+    append16(2);
+    append16(16);
+    header.append("data");
+    append32(data_size);
+
+    bool ok = writeAll(fd, header.data(), header.size()) && writeAll(fd, pcm.data(), pcm.size());
+    close(fd);
+    if (!ok) {
+        unlink(path);
+        return {};
+    }
+    return path;
+}
+
+} // namespace
+
+IPCClient::Connection::~Connection() {
+    if (fd >= 0) {
+        close(fd);
+    }
+}
+
+bool IPCClient::Connection::writeFrame(uint32_t id, const char* data, size_t size) {
+    char header[kFrameHeaderSize];
+    uint32_t length_be = htonl(static_cast<uint32_t>(size));
+    uint32_t id_be = htonl(id);
+    std::memcpy(header, &length_be, 4);
+    std::memcpy(header + 4, &id_be, 4);
+
+    std::lock_guard<std::mutex> send_lock(send_mutex);
+    return writeAll(fd, header, sizeof(header)) && writeAll(fd, data, size);
+}
+
+IPCClient::IPCClient(const std::string& socket_path)
+    : socket_path_(socket_path) {
+}
+
+IPCClient::~IPCClient() {
+    std::lock_guard<std::mutex> lock(mutex_);
+    if (conn_) {
+        markBrokenLocked(conn_);
+    }
+}
+
+std::string IPCClient::sendRequest(const std::string& request) {
+    if (auto response = sendFramedRequest(request)) {
+        return *response;
+    }
+    return sendLegacyRequest(request);
+}
+
+std::shared_ptr<IPCClient::Connection> IPCClient::connectFramedLocked() {
+    if (conn_) {
+        return conn_;
+    }
+    auto now = std::chrono::steady_clock::now();
+    if (now < framed_retry_at_) {
+        return nullptr;
+    }
+
+    int sock = connectSocket(socket_path_);
+    if (sock < 0) {
+        return nullptr;
+    }
+
+    // 握手：发送 MAGIC，后端回送 MAGIC 表示支持持久连接
+    char ack[kFrameMagicSize];
+    struct pollfd pfd = {sock, POLLIN, 0};
+    if (!writeAll(sock, kFrameMagic, kFrameMagicSize) ||
+        poll(&pfd, 1, kHandshakeTimeoutMs) <= 0 ||
+        !readExact(sock, ack, sizeof(ack)) ||
+        std::memcmp(ack, kFrameMagic, kFrameMagicSize) != 0) {
+        close(sock);
+        // 旧后端或后端正忙：退避一段时间再试，期间使用单次连接
+        framed_backoff_ms_ = framed_backoff_ms_ == 0
+            ? kHandshakeBackoffInitialMs
+            : std::min(framed_backoff_ms_ * 2, kHandshakeBackoffMaxMs);
+        framed_retry_at_ = now + std::chrono::milliseconds(framed_backoff_ms_);
+        return nullptr;
+    }
+
+    framed_backoff_ms_ = 0;
+    conn_ = std::make_shared<Connection>();
+    conn_->fd = sock;
+    return conn_;
+}
+
+void IPCClient::markBrokenLocked(const std::shared_ptr<Connection>& conn) {
+    if (!conn->broken) {
+        conn->broken = true;
+        // 唤醒可能阻塞在 recv 上的读取线程；fd 在最后一个引用释放时关闭
+        shutdown(conn->fd, SHUT_RDWR);
+    }
+    if (conn_ == conn) {
+        conn_.reset();
+    }
+    cv_.notify_all();
+}
+
+std::optional<std::string> IPCClient::sendFramedRequest(const std::string& request,
+                                                        const std::string* body) {
+    std::shared_ptr<Connection> conn;
+    uint32_t id = 0;
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        conn = connectFramedLocked();
+        if (!conn) {
+            return std::nullopt;
+        }
+        id = next_id_++;
+        if (next_id_ == 0) {
+            next_id_ = 1;
+        }
+    }
+
+    // 发送请求帧，二进制数据逐块发送，块之间允许其他请求（如按键）插入
+    bool sent = conn->writeFrame(id, request.data(), request.size());
+    bool body_sent = true;
+    if (sent && body) {
+        for (size_t offset = 0; offset < body->size() && body_sent; offset += kBodyChunkBytes) {
+            size_t size = std::min(kBodyChunkBytes, body->size() - offset);
+            body_sent = conn->writeFrame(id, body->data() + offset, size);
+        }
+    }
+
+    std::unique_lock<std::mutex> lock(mutex_);
+    if (!sent || !body_sent) {
+        // 请求未完整送达（如后端重启），后端会丢弃这个不完整的请求，调用方可安全重试
+        markBrokenLocked(conn);
+        return std::nullopt;
+    }
+
+    // 等待响应：同一时刻只有一个线程读取 socket，读到的帧按 ID 分发给等待者
+    while (true) {
+        auto it = conn->responses.find(id);
+        if (it != conn->responses.end()) {
+            std::string response = std::move(it->second);
+            conn->responses.erase(it);
+            return response;
+        }
+        if (conn->broken) {
+            throw std::runtime_error("Backend connection lost");
+        }
+        if (!conn->reader_active) {
+            conn->reader_active = true;
+            lock.unlock();
+            uint32_t response_id = 0;
+            std::string payload;
+            bool ok = readFrame(conn->fd, response_id, payload);
+            lock.lock();
+            conn->reader_active = false;
+            if (ok) {
+                conn->responses[response_id] = std::move(payload);
+                cv_.notify_all();
+            } else {
+                markBrokenLocked(conn);
+            }
+            continue;
+        }
+        cv_.wait(lock);
+    }
+}
+
+std::string IPCClient::sendLegacyRequest(const std::string& request) {
+    int sock = connectSocket(socket_path_);
+    if (sock < 0) {
+        throw std::runtime_error("Failed to connect to backend: " + socket_path_);
+    }
+
+    // 发送请求（确保全部写入）
+    if (!writeAll(sock, request.data(), request.size())) {
+        close(sock);
+        throw std::runtime_error("Failed to send request");
+    }
 
     shutdown(sock, SHUT_WR);
 
@@ -110,6 +368,91 @@ TranscribeResult IPCClient::transcribeAudio(const std::string& audio_path) {
     return result;
 }
 
+TranscribeResult IPCClient::transcribePcm(const std::string& pcm, int sample_rate) {
+    TranscribeResult result;
+
+    try {
+        // 构建请求（PCM 数据随后以同一请求 ID 分块发送）
+        json request = {
+            {"type", "transcribe_pcm"},
+            {"sample_rate", sample_rate},
+            {"bytes", pcm.size()}
+        };
+
+        // 持久连接刚断开（如后端重启）时，第二次调用会重新连接
+        std::optional<std::string> response_str;
+        for (int attempt = 0; attempt < 2 && !response_str; ++attempt) {
+            response_str = sendFramedRequest(request.dump(), &pcm);
+        }
+        if (!response_str) {
+            // 持久连接不可用：写入临时 WAV 改走单次连接协议，不丢弃已录到的语音
+            std::string wav_path = writeTempWav(pcm, sample_rate);
+            if (wav_path.empty()) {
+                result.success = false;
+                result.error = "Failed to write temporary WAV file";
+                return result;
+            }
+            result = transcribeAudio(wav_path);
+            unlink(wav_path.c_str());
+            return result;
+        }
+
+        // 解析响应
+        json response = json::parse(*response_str);
+
+        result.success = response.value("success", false);
+        if (result.success) {
+            result.text = response.value("text", "");
+        } else {
+            result.error = response.value("error", "Unknown error");
+        }
+
+    } catch (const std::exception& e) {
+        result.success = false;
+        result.error = e.what();
+    }
+
+    return result;
+}
+
+bool IPCClient::startRecording() {
+    try {
+        json request = {{"type", "start_recording"}};
+        std::string response_str = sendRequest(request.dump());
+        json response = json::parse(response_str);
+        return response.value("success", false);
+    } catch (const std::exception& e) {
+        return false;
+    }
+}
+
+TranscribeResult IPCClient::stopRecording(bool transcribe) {
+    TranscribeResult result;
+
+    try {
+        json request = {
+            {"type", "stop_recording"},
+            {"transcribe", transcribe}
+        };
+
+        std::string response_str = sendRequest(request.dump());
+        json response = json::parse(response_str);
+
+        result.success = response.value("success", false);
+        if (result.success) {
+            result.text = response.value("text", "");
+        } else {
+            result.error = response.value("error", "Unknown error");
+        }
+
+    } catch (const std::exception& e) {
+        result.success = false;
+        result.error = e.what();
+    }
+
+    return result;
+}
+
 RimeUIState IPCClient::processKey(int keyval, int mask) {
     RimeUIState state;
 
@@ -7,9 +7,15 @@
 #ifndef VOCOTYPE_IPC_CLIENT_H
 #define VOCOTYPE_IPC_CLIENT_H
 
+#include <chrono>
+#include <condition_variable>
+#include <cstdint>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <optional>
 #include <string>
 #include <vector>
-#include <memory>
 
 namespace vocotype {
 
@@ -42,7 +48,9 @@ struct TranscribeResult {
 /**
  * IPC 客户端
  *
- * 通过 Unix Socket 与 Python Backend 通信
+ * 通过 Unix Socket 与 Python Backend 通信。
+ * 优先使用持久连接（MAGIC 握手 + 长度前缀帧 + 请求 ID，多路复用），
+ * 后端不支持时回退到每个请求一次连接、读到 EOF 的旧协议。
  */
 class IPCClient {
 public:
@@ -66,6 +74,33 @@ public:
      */
     TranscribeResult transcribeAudio(const std::string& audio_path);
 
+    /**
+     * 语音识别（直接传输 PCM）
+     *
+     * 优先经持久连接发送；连接刚断开时重连一次，持久连接仍不可用时
+     * 写入临时 WAV 文件改走 transcribeAudio，不丢弃已录到的语音。
+     *
+     * @param pcm int16 小端单声道 PCM 数据
+     * @param sample_rate 采样率（后端负责重采样到 16kHz）
+     * @return 识别结果
+     */
+    TranscribeResult transcribePcm(const std::string& pcm, int sample_rate);
+
+    /**
+     * 在 Backend 进程内开始录音
+     *
+     * @return 是否成功（失败时调用方应回退到录音子进程）
+     */
+    bool startRecording();
+
+    /**
+     * 停止 Backend 录音
+     *
+     * @param transcribe 是否识别录到的音频
+     * @return 识别结果（transcribe 为 false 时仅表示是否停止成功）
+     */
+    TranscribeResult stopRecording(bool transcribe);
+
     /**
      * 处理 Rime 按键
      *
@@ -88,6 +123,23 @@ public:
     bool ping();
 
 private:
+    /**
+     * 持久连接状态（由 shared_ptr 管理，最后一个使用者释放时关闭 fd）
+     */
+    struct Connection {
+        int fd = -1;
+        std::mutex send_mutex;                      // 串行化帧写入
+        std::map<uint32_t, std::string> responses;  // 已读到、待取走的响应
+        bool reader_active = false;                 // 是否有线程正在读取响应帧
+        bool broken = false;
+        ~Connection();
+
+        /**
+         * 发送一帧（内部加 send_mutex）
+         */
+        bool writeFrame(uint32_t id, const char* data, size_t size);
+    };
+
     /**
      * 发送请求并接收响应
      *
@@ -96,7 +148,40 @@ private:
      */
     std::string sendRequest(const std::string& request);
 
+    /**
+     * 通过持久连接发送请求
+     *
+     * @param request JSON 请求字符串
+     * @param body 可选的二进制数据，以同一请求 ID 分块紧随请求帧发送
+     * @return 响应；持久连接不可用或请求未完整送达时返回 std::nullopt（可安全重试）
+     */
+    std::optional<std::string> sendFramedRequest(const std::string& request,
+                                                 const std::string* body = nullptr);
+
+    /**
+     * 单次连接发送请求（旧协议：半关闭写端后读到 EOF）
+     */
+    std::string sendLegacyRequest(const std::string& request);
+
+    /**
+     * 获取或建立持久连接（调用方需持有 mutex_）
+     */
+    std::shared_ptr<Connection> connectFramedLocked();
+
+    /**
+     * 标记连接失效并唤醒等待者（调用方需持有 mutex_）
+     */
+    void markBrokenLocked(const std::shared_ptr<Connection>& conn);
+
     std::string socket_path_;
+
+    std::mutex mutex_;                   // 保护以下成员及 Connection 的非发送字段
+    std::condition_variable cv_;
+    std::shared_ptr<Connection> conn_;
+    uint32_t next_id_ = 1;
+    // 握手失败后在此之前不再尝试持久连接（退避间隔逐次加倍，后端重启后可恢复）
+    std::chrono::steady_clock::time_point framed_retry_at_{};
+    int framed_backoff_ms_ = 0;
 };
 
 } // namespace vocotype
@@ -25,19 +25,33 @@
 
 namespace {
 
-std::string stopRecorderProcess(pid_t pid, int stdin_fd, FILE* stdout_file) {
+/**
+ * 录音进程输出的 PCM 数据
+ */
+struct RecordedAudio {
+    int sample_rate = 0;
+    std::string pcm;  // int16 小端单声道
+};
+
+RecordedAudio stopRecorderProcess(pid_t pid, int stdin_fd, FILE* stdout_file) {
     if (stdin_fd >= 0) {
         close(stdin_fd);
     }
 
-    std::string audio_path;
+    // 录音进程以 --pcm 模式运行：先输出 "PCM <采样率> <字节数>" 头行，随后是原始 PCM
+    RecordedAudio audio;
     if (stdout_file) {
-        char buffer[1024];
-        if (fgets(buffer, sizeof(buffer), stdout_file) != nullptr) {
-            audio_path = buffer;
-            while (!audio_path.empty() &&
-                   (audio_path.back() == '\n' || audio_path.back() == '\r')) {
-                audio_path.pop_back();
+        char buffer[128];
+        int sample_rate = 0;
+        unsigned long size = 0;
+        if (fgets(buffer, sizeof(buffer), stdout_file) != nullptr &&
+            std::sscanf(buffer, "PCM %d %lu", &sample_rate, &size) == 2 &&
+            sample_rate > 0 && size > 0) {
+            audio.pcm.resize(size);
+            if (std::fread(audio.pcm.data(), 1, size, stdout_file) == size) {
+                audio.sample_rate = sample_rate;
+            } else {
+                audio.pcm.clear();
             }
         }
         fclose(stdout_file);
@@ -49,7 +63,7 @@ std::string stopRecorderProcess(pid_t pid, int stdin_fd, FILE* stdout_file) {
         }
     }
 
-    return audio_path;
+    return audio;
 }
 
 } // namespace
@@ -83,12 +97,13 @@ VoCoTypeAddon::VoCoTypeAddon(fcitx::Instance* instance)
 }
 
 VoCoTypeAddon::~VoCoTypeAddon() {
+    if (backend_recording_) {
+        ipc_client_->stopRecording(false);
+        backend_recording_ = false;
+        is_recording_ = false;
+    }
     if (recorder_pid_ > 0 || recorder_stdout_ || recorder_stdin_fd_ >= 0) {
-        std::string audio_path =
-            stopRecorderProcess(recorder_pid_, recorder_stdin_fd_, recorder_stdout_);
-        if (!audio_path.empty()) {
-            std::remove(audio_path.c_str());
-        }
+        stopRecorderProcess(recorder_pid_, recorder_stdin_fd_, recorder_stdout_);
         recorder_pid_ = -1;
         recorder_stdin_fd_ = -1;
         recorder_stdout_ = nullptr;
@@ -215,22 +230,42 @@ void VoCoTypeAddon::startRecording(fcitx::InputContext* ic) {
         return;
     }
 
+    // 优先由常驻 Backend 录音（音频库已初始化，无需启动新进程），失败时回退到录音子进程
+    if (ipc_client_->startRecording()) {
+        backend_recording_ = true;
+    } else if (!startRecorderProcess(ic)) {
+        return;
+    }
+    is_recording_ = true;
+
+    // 显示录音状态
+    auto& inputPanel = ic->inputPanel();
+    fcitx::Text preedit;
+    preedit.append("🎤 录音中...");
+    inputPanel.setClientPreedit(preedit);
+    ic->updatePreedit();
+    ic->updateUserInterface(fcitx::UserInterfaceComponent::InputPanel);
+
+    FCITX_INFO() << "Recording started" << (backend_recording_ ? " (backend)" : "");
+}
+
+bool VoCoTypeAddon::startRecorderProcess(fcitx::InputContext* ic) {
     if (python_venv_path_.empty() || recorder_script_path_.empty()) {
         showError(ic, "录音配置无效");
-        return;
+        return false;
     }
 
     int stdin_pipe[2];
     int stdout_pipe[2];
     if (pipe(stdin_pipe) != 0) {
         showError(ic, "启动录音失败");
-        return;
+        return false;
     }
     if (pipe(stdout_pipe) != 0) {
         close(stdin_pipe[0]);
         close(stdin_pipe[1]);
         showError(ic, "启动录音失败");
-        return;
+        return false;
     }
 
     pid_t pid = fork();
@@ -240,7 +275,7 @@ void VoCoTypeAddon::startRecording(fcitx::InputContext* ic) {
         close(stdout_pipe[0]);
         close(stdout_pipe[1]);
         showError(ic, "启动录音失败");
-        return;
+        return false;
     }
 
     if (pid == 0) {
@@ -255,6 +290,7 @@ void VoCoTypeAddon::startRecording(fcitx::InputContext* ic) {
         execl(python_venv_path_.c_str(),
               python_venv_path_.c_str(),
               recorder_script_path_.c_str(),
+              "--pcm",
               static_cast<char*>(nullptr));
         _exit(127);
     }
@@ -269,23 +305,13 @@ void VoCoTypeAddon::startRecording(fcitx::InputContext* ic) {
         kill(pid, SIGTERM);
         waitpid(pid, nullptr, 0);
         showError(ic, "启动录音失败");
-        return;
+        return false;
     }
 
     recorder_pid_ = pid;
     recorder_stdin_fd_ = stdin_pipe[1];
     recorder_stdout_ = stdout_file;
-    is_recording_ = true;
-
-    // 显示录音状态
-    auto& inputPanel = ic->inputPanel();
-    fcitx::Text preedit;
-    preedit.append("🎤 录音中...");
-    inputPanel.setClientPreedit(preedit);
-    ic->updatePreedit();
-    ic->updateUserInterface(fcitx::UserInterfaceComponent::InputPanel);
-
-    FCITX_INFO() << "Recording started";
+    return true;
 }
 
 void VoCoTypeAddon::stopAndTranscribe(fcitx::InputContext* ic) {
@@ -312,6 +338,8 @@ void VoCoTypeAddon::stopRecording(fcitx::InputContext* ic, bool transcribe) {
         }
     }
 
+    bool backend_recording = backend_recording_;
+    backend_recording_ = false;
     pid_t pid = recorder_pid_;
     int stdin_fd = recorder_stdin_fd_;
     FILE* stdout_file = recorder_stdout_;
@@ -322,29 +350,23 @@ void VoCoTypeAddon::stopRecording(fcitx::InputContext* ic, bool transcribe) {
     auto ic_ref =
         ic ? ic->watch() : fcitx::TrackableObjectReference<fcitx::InputContext>();
 
-    std::thread([this, pid, stdin_fd, stdout_file, transcribe, ic_ref]() mutable {
-        std::string audio_path = stopRecorderProcess(pid, stdin_fd, stdout_file);
-        if (audio_path.empty()) {
-            if (transcribe) {
-                instance_->eventDispatcher().scheduleWithContext(
-                    ic_ref, [this, ic_ref]() {
-                        auto* ic_ptr = ic_ref.get();
-                        if (ic_ptr) {
-                            showError(ic_ptr, "录音失败");
-                        }
-                    });
+    std::thread([this, backend_recording, pid, stdin_fd, stdout_file, transcribe,
+                 ic_ref]() mutable {
+        TranscribeResult result;
+        if (backend_recording) {
+            result = ipc_client_->stopRecording(transcribe);
+        } else {
+            RecordedAudio audio = stopRecorderProcess(pid, stdin_fd, stdout_file);
+            if (audio.pcm.empty()) {
+                result.error = "录音失败";
+            } else if (transcribe) {
+                result = ipc_client_->transcribePcm(audio.pcm, audio.sample_rate);
             }
-            return;
         }
-
         if (!transcribe) {
-            std::remove(audio_path.c_str());
             return;
         }
 
-        TranscribeResult result = ipc_client_->transcribeAudio(audio_path);
-        std::remove(audio_path.c_str());
-
         instance_->eventDispatcher().scheduleWithContext(
             ic_ref, [this, ic_ref, result]() {
                 auto* ic_ptr = ic_ref.get();
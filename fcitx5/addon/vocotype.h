@@ -52,6 +52,13 @@ private:
      */
     void startRecording(fcitx::InputContext* ic);
 
+    /**
+     * 启动录音子进程（Backend 录音不可用时的回退路径）
+     *
+     * @return 是否启动成功
+     */
+    bool startRecorderProcess(fcitx::InputContext* ic);
+
     /**
      * F9 松开：停止录音并转录
      */
@@ -92,6 +99,7 @@ private:
 
     // 录音状态
     bool is_recording_ = false;
+    bool backend_recording_ = false;    // 录音由常驻 Backend 完成（否则为录音子进程）
     pid_t recorder_pid_ = -1;
     int recorder_stdin_fd_ = -1;
     FILE* recorder_stdout_ = nullptr;
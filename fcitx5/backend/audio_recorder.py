@@ -7,15 +7,16 @@
 1. C++ Addon 启动此脚本，传入参数
 2. 脚本开始录音
 3. 脚本输出临时音频文件路径到 stdout
-4. C++ Addon 读取路径，将其发送到 Backend 进行识别
+   （--pcm 模式下改为输出 "PCM <采样率> <字节数>" 头行，随后是 int16 单声道原始 PCM）
+4. C++ Addon 读取路径或 PCM，将其发送到 Backend 进行识别
 """
 from __future__ import annotations
 
 import sys
 import argparse
 import tempfile
-import queue
 import threading
+import time
 import logging
 from pathlib import Path
 
@@ -26,7 +27,14 @@ import sounddevice as sd
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from app.audio_utils import load_audio_config, resample_audio, SAMPLE_RATE
+from app.audio_utils import (
+    SAMPLE_RATE,
+    invalidate_input_settings,
+    load_audio_config,
+    resample_audio,
+    resolve_input_settings,
+)
+from app.pcm_buffer import PcmBuffer
 from app.wave_writer import write_wav
 
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
@@ -39,75 +47,39 @@ class AudioRecorder:
     def __init__(self, device_id: int | None, sample_rate: int):
         self.device_id = device_id
         self.sample_rate = sample_rate
-        self.audio_frames = []
-        self.audio_queue = queue.Queue(maxsize=500)
+        # 录音缓冲区，由音频回调直接写入（预分配 30 秒，不足时倍增）
+        self.audio_buffer = PcmBuffer((sample_rate or SAMPLE_RATE) * 30)
         self.stop_event = threading.Event()
         self.stream = None
+        self._active_sample_rate = sample_rate
+        # 本次录音第一个音频块到达的时刻（time.monotonic()），供分阶段计时使用
+        self.first_frame_at: float | None = None
 
-    def _resolve_input_device(self):
-        """选择可用的输入设备"""
-        if self.device_id is not None:
-            try:
-                info = sd.query_devices(self.device_id)
-                if info.get("max_input_channels", 0) > 0:
-                    return self.device_id
-                logger.warning("设备 %s 无输入通道，回退选择输入设备", self.device_id)
-            except Exception as exc:
-                logger.warning("查询设备 %s 失败: %s", self.device_id, exc)
+    def start(self) -> int:
+        """打开输入流开始录音（可在常驻进程中重复调用）
 
-        try:
-            devices = sd.query_devices()
-            for idx, info in enumerate(devices):
-                if info.get("max_input_channels", 0) > 0:
-                    logger.info("回退至输入设备 #%s (%s)", idx, info.get("name", "unknown"))
-                    return idx
-        except Exception as exc:
-            logger.warning("查询输入设备列表失败: %s", exc)
-
-        return None
-
-    def _resolve_sample_rate(self, device, preferred):
-        """选择可用采样率"""
-        if preferred:
-            try:
-                sd.check_input_settings(
-                    device=device,
-                    samplerate=preferred,
-                    channels=1,
-                    dtype="int16",
-                )
-                return preferred
-            except Exception:
-                pass
-
-        try:
-            info = sd.query_devices(device if device is not None else None, kind="input")
-            default_sr = int(info.get("default_samplerate", 0)) if info else 0
-            if default_sr:
-                sd.check_input_settings(
-                    device=device,
-                    samplerate=default_sr,
-                    channels=1,
-                    dtype="int16",
-                )
-                return default_sr
-        except Exception:
-            pass
-
-        return preferred or SAMPLE_RATE
+        Returns:
+            实际使用的采样率
+        """
+        if self.stream is not None:
+            raise RuntimeError("录音已在进行中")
 
-    def record(self, duration: float | None = None) -> Path:
-        """录制音频
+        self.audio_buffer.clear()
+        self.stop_event.clear()
+        self.first_frame_at = None
 
-        Args:
-            duration: 录制时长（秒），None 表示持续录制直到手动停止
+        try:
+            sample_rate = self._open_stream()
+        except Exception as exc:
+            # 设备可能已拔出或被占用：丢弃缓存的协商结果重试一次
+            invalidate_input_settings(exc)
+            sample_rate = self._open_stream()
 
-        Returns:
-            临时音频文件路径
-        """
-        device = self._resolve_input_device()
-        sample_rate = self._resolve_sample_rate(device, self.sample_rate)
+        logger.info("开始录音...")
+        return sample_rate
 
+    def _open_stream(self) -> int:
+        device, sample_rate = resolve_input_settings(self.device_id, self.sample_rate)
         logger.info("使用设备: %s, 采样率: %d Hz", device, sample_rate)
 
         block_ms = 20
@@ -116,10 +88,9 @@ class AudioRecorder:
         def audio_callback(indata, frame_count, time_info, status):
             if status:
                 logger.warning("音频状态: %s", status)
-            try:
-                self.audio_queue.put_nowait(indata.copy())
-            except queue.Full:
-                pass
+            if self.first_frame_at is None:
+                self.first_frame_at = time.monotonic()
+            self.audio_buffer.append(indata)
 
         # 创建音频流
         self.stream = sd.InputStream(
@@ -130,21 +101,44 @@ class AudioRecorder:
             dtype='int16',
             callback=audio_callback,
         )
-        self.stream.start()
+        self._active_sample_rate = sample_rate
+        try:
+            self.stream.start()
+        except Exception:
+            self.stream.close()
+            self.stream = None
+            raise
+        return sample_rate
 
-        # 采集线程
-        def capture_loop():
-            while not self.stop_event.is_set():
-                try:
-                    frame = self.audio_queue.get(timeout=0.1)
-                    self.audio_frames.append(frame)
-                except queue.Empty:
-                    continue
+    def stop(self) -> tuple[np.ndarray, int]:
+        """停止录音
 
-        capture_thread = threading.Thread(target=capture_loop, daemon=True)
-        capture_thread.start()
+        Returns:
+            (设备原生采样率的 int16 单声道样本，可能为空, 采样率)
+        """
+        if self.stream is None:
+            return np.zeros(0, dtype=np.int16), self.sample_rate
 
-        logger.info("开始录音...")
+        # 停止录音（stop 返回后回调不会再写入缓冲区）
+        self.stream.stop()
+        self.stream.close()
+        self.stream = None
+        self.stop_event.set()
+
+        audio_data = self.audio_buffer.take()
+        logger.info("录音完成，共 %d 样本", audio_data.size)
+        return audio_data, self._active_sample_rate
+
+    def capture(self, duration: float | None = None) -> tuple[np.ndarray, int]:
+        """采集音频
+
+        Args:
+            duration: 录制时长（秒），None 表示持续录制直到手动停止
+
+        Returns:
+            (设备原生采样率的 int16 单声道样本, 采样率)
+        """
+        self.start()
 
         # 如果指定了时长，等待指定时间
         if duration:
@@ -153,20 +147,12 @@ class AudioRecorder:
             # 否则等待 stdin 输入（C++ Addon 会发送停止信号）
             sys.stdin.read()
 
-        # 停止录音
-        self.stop_event.set()
-        self.stream.stop()
-        self.stream.close()
-        capture_thread.join(timeout=1.0)
-
-        logger.info("录音完成，共 %d 帧", len(self.audio_frames))
+        audio_data, sample_rate = self.stop()
 
-        # 合并音频
-        if not self.audio_frames:
-            logger.error("没有录制到音频数据")
-            sys.exit(1)
+        # 检查是否录到音频
+        if audio_data.size == 0:
+            raise RuntimeError("没有录制到音频数据")
 
-        audio_data = np.concatenate(self.audio_frames).flatten()
         audio_duration = len(audio_data) / sample_rate
         logger.info("录音时长: %.2f 秒", audio_duration)
 
@@ -174,6 +160,19 @@ class AudioRecorder:
         if audio_duration < 0.3:
             logger.warning("录音时长过短（< 0.3 秒），可能无法识别")
 
+        return audio_data, sample_rate
+
+    def record(self, duration: float | None = None) -> Path:
+        """录制音频并写入临时 WAV 文件
+
+        Args:
+            duration: 录制时长（秒），None 表示持续录制直到手动停止
+
+        Returns:
+            临时音频文件路径
+        """
+        audio_data, sample_rate = self.capture(duration)
+
         # 重采样到 16kHz（FunASR 要求）
         audio_16k = resample_audio(audio_data, sample_rate, SAMPLE_RATE)
 
@@ -206,6 +205,11 @@ def main():
         default=44100,
         help='Sample rate (default: 44100)'
     )
+    parser.add_argument(
+        '--pcm',
+        action='store_true',
+        help='Write raw int16 PCM to stdout instead of a temp WAV path'
+    )
     args = parser.parse_args()
 
     # 加载配置
@@ -216,9 +220,18 @@ def main():
     # 录音
     recorder = AudioRecorder(device_id, sample_rate)
     try:
-        audio_path = recorder.record(duration=args.duration)
-        # 输出文件路径到 stdout（C++ Addon 会读取此路径）
-        print(audio_path, flush=True)
+        if args.pcm:
+            # 输出原生采样率 PCM（重采样由 Backend 完成），省去 WAV 写入与读取
+            audio_data, sample_rate = recorder.capture(duration=args.duration)
+            pcm = audio_data.astype('<i2', copy=False).tobytes()
+            out = sys.stdout.buffer
+            out.write(f"PCM {sample_rate} {len(pcm)}\n".encode('ascii'))
+            out.write(pcm)
+            out.flush()
+        else:
+            audio_path = recorder.record(duration=args.duration)
+            # 输出文件路径到 stdout（C++ Addon 会读取此路径）
+            print(audio_path, flush=True)
     except KeyboardInterrupt:
         logger.info("录音被中断")
         sys.exit(1)
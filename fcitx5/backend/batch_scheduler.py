@@ -0,0 +1,205 @@
+"""ASR 请求微批调度器
+
+把短时间窗口内到达的多个识别请求合并，交给 FunASRServer.transcribe_batch
+以 batch_size>1 一次推理，避免突发请求在 ASR 锁后逐条排队。
+"""
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 收集窗口（毫秒）：突发时第一个请求到达后再等待多久以合并后续请求。
+# 单独到达的请求（队列为空且没有批次在推理）不等待，直接推理
+DEFAULT_WINDOW_MS = 20.0
+# 单批最大请求数
+DEFAULT_MAX_BATCH = 8
+# submit() 等待识别结果的最长时间（秒）
+DEFAULT_TIMEOUT_S = 120.0
+
+
+class _Request:
+    __slots__ = ("waveform", "options", "result", "done", "trace", "burst")
+
+    def __init__(self, waveform: np.ndarray, options: Optional[dict], trace=None, burst: bool = False) -> None:
+        self.waveform = waveform
+        self.options = options
+        self.result: Optional[dict] = None
+        self.done = threading.Event()
+        self.trace = trace
+        # 到达时已有批次在推理：后续很可能还有请求，值得等待收集窗口
+        self.burst = burst
+
+
+class BatchScheduler:
+    """ASR 微批调度器
+
+    handle_client 线程调用 submit() 后阻塞等待结果；单个调度线程负责收集请求、
+    按识别选项分组并批量推理，因此同一时刻只有一个线程使用 ASR 模型。
+    """
+
+    def __init__(
+        self,
+        asr_server,
+        window_ms: Optional[float] = None,
+        max_batch: Optional[int] = None,
+        timeout_s: float = DEFAULT_TIMEOUT_S,
+    ) -> None:
+        self.asr_server = asr_server
+        if window_ms is None:
+            window_ms = float(os.environ.get("FUNASR_BATCH_WINDOW_MS", DEFAULT_WINDOW_MS))
+        if max_batch is None:
+            max_batch = int(os.environ.get("FUNASR_BATCH_MAX", DEFAULT_MAX_BATCH))
+        self.window_s = max(0.0, window_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.timeout_s = timeout_s
+
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        # 保证 submit() 入队与 stop() 放入停止标记互斥：停止后不再有请求排在标记之后
+        self._state_lock = threading.Lock()
+        self._running = True
+        # 正在推理的请求数（供 stats 请求查看）
+        self._in_flight = 0
+        self._thread = threading.Thread(
+            target=self._run,
+            daemon=True,
+            name="ASRBatchScheduler",
+        )
+        self._thread.start()
+        logger.info(
+            "ASR 微批调度已启动: 窗口=%.0fms, 最大批量=%d",
+            self.window_s * 1000,
+            self.max_batch,
+        )
+
+    def submit(self, waveform: np.ndarray, options: Optional[dict] = None, trace=None) -> dict:
+        """提交一段 16kHz float32 波形并等待识别结果
+
+        传入 UtteranceTrace 时记录排队等待（"queue"）与批量推理（"batch"）的耗时。
+        等待超过 timeout_s 时返回超时错误。
+        """
+        request = _Request(waveform, options, trace, burst=self._in_flight > 0)
+        if trace is not None:
+            trace.mark("submit")
+        with self._state_lock:
+            if not self._running:
+                return {"success": False, "error": "调度器已停止", "type": "transcription_error"}
+            self._queue.put(request)
+        if not request.done.wait(self.timeout_s):
+            logger.error("等待识别结果超时（%.0fs）", self.timeout_s)
+            return {"success": False, "error": "识别超时", "type": "timeout_error"}
+        if trace is not None and "batch_start" in trace.marks:
+            trace.spans["queue"] = trace.marks["batch_start"] - trace.marks["submit"]
+            trace.spans["batch"] = time.monotonic() - trace.marks["batch_start"]
+        return request.result
+
+    @property
+    def pending(self) -> int:
+        """排队等待推理的请求数"""
+        return self._queue.qsize()
+
+    @property
+    def in_flight(self) -> int:
+        """正在推理的请求数"""
+        return self._in_flight
+
+    def stop(self) -> None:
+        """停止调度线程（已排队的请求仍会处理完，停止后的请求直接返回错误）"""
+        with self._state_lock:
+            if not self._running:
+                return
+            self._running = False
+            self._queue.put(None)
+        self._thread.join(timeout=5.0)
+
+    def _collect(self, first: _Request) -> tuple[List[_Request], bool]:
+        """从第一个请求开始收集更多请求
+
+        只有突发时（第一个请求到达时已有批次在推理，或队列中已有其他请求）才在窗口期内等待，
+        单独的听写请求只取走已排队的请求，不付出窗口延迟。
+        """
+        batch = [first]
+        stop = False
+        deadline = None
+        if self.window_s > 0 and (first.burst or not self._queue.empty()):
+            deadline = time.monotonic() + self.window_s
+
+        while len(batch) < self.max_batch:
+            try:
+                if deadline is None:
+                    item = self._queue.get_nowait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        item = self._queue.get_nowait()
+                    else:
+                        item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, stop = self._collect(first)
+            self._in_flight = len(batch)
+            try:
+                self._process(batch)
+            finally:
+                self._in_flight = 0
+            if stop:
+                break
+
+        # 停止后仍留在队列中的请求直接返回错误，避免调用方永久阻塞
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                request.result = {"success": False, "error": "调度器已停止", "type": "transcription_error"}
+                request.done.set()
+
+    def _process(self, batch: List[_Request]) -> None:
+        # 识别选项不同的请求不能合并推理，按选项分组
+        groups: dict = {}
+        for request in batch:
+            key = repr(sorted((request.options or {}).items()))
+            groups.setdefault(key, []).append(request)
+
+        if len(batch) > 1:
+            logger.info("合并 %d 个识别请求进行批量推理", len(batch))
+
+        for requests in groups.values():
+            for request in requests:
+                if request.trace is not None:
+                    request.trace.mark("batch_start")
+                    request.trace.annotate(batch_size=len(requests))
+            try:
+                results = self.asr_server.transcribe_batch(
+                    [r.waveform for r in requests],
+                    options=requests[0].options,
+                    traces=[r.trace for r in requests],
+                )
+            except Exception as exc:
+                logger.error("批量识别失败: %s", exc)
+                results = [
+                    {"success": False, "error": f"音频转录失败: {exc}", "type": "transcription_error"}
+                    for _ in requests
+                ]
+            for request, result in zip(requests, results):
+                request.result = result
+                request.done.set()
@@ -14,27 +14,30 @@ import logging
 import signal
 import stat
 import threading
+import time
 from pathlib import Path
 
+import numpy as np
+
 # 添加项目根目录到 path
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from app.funasr_server import FunASRServer
+from app.asr_client import connect_asr
+from app.audio_utils import load_audio_file, pcm_to_waveform
+from app.ipc import MAGIC, FrameError, read_frame, write_frame
+from app.logging_config import setup_logging
+from app.trace import UtteranceTrace
 from backend.rime_handler import RimeHandler
+from backend.batch_scheduler import BatchScheduler
+from backend.metrics import BackendMetrics, InstrumentedLock, memory_usage
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stderr),
-    ]
-)
 logger = logging.getLogger(__name__)
 
 SOCKET_PATH = "/tmp/vocotype-fcitx5.sock"
 MAX_REQUEST_BYTES = 1024 * 1024
+# transcribe_pcm 音频总大小上限（按 48kHz int16 单声道约 11 分钟）
+MAX_PCM_BYTES = 64 * 1024 * 1024
 REQUEST_TIMEOUT_S = 2.0
 
 
@@ -48,15 +51,22 @@ class Fcitx5Backend:
     """
 
     def __init__(self):
+        # stats 请求返回的运行指标
+        self.metrics = BackendMetrics()
+
         # 语音识别服务
         logger.info("正在初始化 FunASR 服务器...")
-        self.asr_server = FunASRServer()
-        asr_result = self.asr_server.initialize()
-        if not asr_result['success']:
-            logger.error("FunASR 初始化失败: %s", asr_result.get('error'))
+        # 优先使用常驻 ASR 守护进程，与 IBus 引擎等其他前端共享同一份模型
+        try:
+            self.asr_server = connect_asr(streaming=False)
+        except RuntimeError as exc:
+            logger.error("FunASR 初始化失败: %s", exc)
             sys.exit(1)
         logger.info("FunASR 服务器初始化成功")
 
+        # 识别请求经微批调度器合并推理（同时保证 ASR 模型只被一个线程使用）
+        self.batcher = BatchScheduler(self.asr_server)
+
         # Rime 处理器
         self.rime_handler = RimeHandler()
         if self.rime_handler.available:
@@ -64,15 +74,35 @@ class Fcitx5Backend:
         else:
             logger.info("Rime 集成未启用（纯语音模式）")
 
+        # 常驻录音器：进程启动时即完成 sounddevice/PortAudio 初始化，
+        # 按下 F9 时只需打开输入流，不再为每次录音启动 Python 子进程
+        self.recorder = self._create_recorder()
+        self._recording_lock = InstrumentedLock("recording", self.metrics)
+        # 当前后端录音的分阶段计时（start_recording 时创建）
+        self._recording_trace = None
+
         # 标记运行状态
         self.running = True
-        self._asr_lock = threading.Lock()
-        self._rime_lock = threading.Lock()
+        self._rime_lock = InstrumentedLock("rime", self.metrics)
 
         # 注册信号处理
         signal.signal(signal.SIGTERM, self._signal_handler)
         signal.signal(signal.SIGINT, self._signal_handler)
 
+    def _create_recorder(self):
+        """创建常驻录音器；音频库不可用时返回 None（Addon 回退到录音子进程）"""
+        try:
+            from app.audio_utils import load_audio_config
+            from backend.audio_recorder import AudioRecorder
+
+            device_id, sample_rate = load_audio_config()
+            recorder = AudioRecorder(device_id, sample_rate)
+            logger.info("常驻录音器已就绪")
+            return recorder
+        except Exception as exc:
+            logger.warning("常驻录音器不可用，将由 Addon 启动录音子进程: %s", exc)
+            return None
+
     def _cleanup_socket_path(self, path: str) -> None:
         """安全删除旧 socket 文件（避免误删普通文件）"""
         if not os.path.exists(path):
@@ -137,17 +167,24 @@ class Fcitx5Backend:
             logger.info("Fcitx5 Backend 已停止")
 
     def handle_client(self, conn: socket.socket):
-        """处理客户端请求
+        """处理客户端连接
 
         IPC 协议：
-        - 请求格式：JSON 字符串
-        - 响应格式：JSON 字符串
+        - 单次模式（兼容旧客户端）：客户端发送 JSON 请求后半关闭写端，
+          服务端读到 EOF 后返回 JSON 响应并关闭连接
+        - 持久模式：客户端先发送 MAGIC 握手，之后在同一连接上收发长度前缀帧
+          （见 app/ipc.py），每帧带请求 ID，可多路复用
 
         请求类型：
         1. transcribe: 语音识别
            {"type": "transcribe", "audio_path": "/tmp/xxx.wav"}
            -> {"success": true, "text": "识别结果"}
 
+           transcribe_pcm: 直接传输 int16 单声道 PCM（仅持久模式）
+           {"type": "transcribe_pcm", "sample_rate": 48000, "bytes": N}
+           后续以同一请求 ID 发送若干数据帧，累计 N 字节后开始识别
+           -> {"success": true, "text": "识别结果"}
+
         2. key_event: Rime 按键处理
            {"type": "key_event", "keyval": 97, "mask": 0}
            -> {"handled": true, "commit": "...", "preedit": {...}, ...}
@@ -159,13 +196,36 @@ class Fcitx5Backend:
         4. ping: 健康检查
            {"type": "ping"}
            -> {"pong": true}
+
+        5. start_recording / stop_recording: 在后端进程内录音
+           {"type": "start_recording"}
+           -> {"success": true, "sample_rate": 48000}
+           {"type": "stop_recording", "transcribe": true}
+           -> {"success": true, "text": "识别结果"}（transcribe=false 时只停止录音）
+
+        6. stats: 运行指标（计数、各阶段与 Rime 按键延迟分布、队列深度、内存、模型加载耗时）
+           {"type": "stats"}
+           -> {"success": true, "transcriptions": 12, "latency": {...}, ...}
         """
         try:
             conn.settimeout(REQUEST_TIMEOUT_S)
-            # 接收请求（读到 EOF）
+            # 先读取 MAGIC 长度的前缀，用于区分持久模式与单次模式
             chunks = []
             total_bytes = 0
-            while True:
+            while total_bytes < len(MAGIC):
+                chunk = conn.recv(len(MAGIC) - total_bytes)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                total_bytes += len(chunk)
+
+            if b''.join(chunks) == MAGIC:
+                conn.sendall(MAGIC)
+                self._serve_persistent(conn)
+                return
+
+            # 单次模式：继续接收请求（读到 EOF；前缀不足 MAGIC 长度说明已到 EOF）
+            while total_bytes >= len(MAGIC):
                 chunk = conn.recv(8192)
                 if not chunk:
                     break
@@ -180,44 +240,7 @@ class Fcitx5Backend:
             data = b''.join(chunks).decode('utf-8')
 
             request = json.loads(data)
-            req_type = request.get('type')
-
-            logger.debug("收到请求: type=%s", req_type)
-
-            # 处理请求
-            if req_type == 'transcribe':
-                # 语音识别
-                audio_path = request.get('audio_path')
-                if not audio_path:
-                    response = {"success": False, "error": "缺少 audio_path 参数"}
-                else:
-                    with self._asr_lock:
-                        result = self.asr_server.transcribe_audio(audio_path)
-                    response = result
-
-            elif req_type == 'key_event':
-                # Rime 按键处理
-                keyval = request.get('keyval')
-                mask = request.get('mask', 0)
-                if keyval is None:
-                    response = {"handled": False, "error": "缺少 keyval 参数"}
-                else:
-                    with self._rime_lock:
-                        result = self.rime_handler.process_key(keyval, mask)
-                    response = result
-
-            elif req_type == 'reset':
-                # 重置 Rime
-                with self._rime_lock:
-                    self.rime_handler.reset()
-                response = {"success": True}
-
-            elif req_type == 'ping':
-                # 健康检查
-                response = {"pong": True}
-
-            else:
-                response = {"error": f"未知的请求类型: {req_type}"}
+            response = self._safe_dispatch(request)
 
             # 发送响应
             response_str = json.dumps(response, ensure_ascii=False)
@@ -254,11 +277,253 @@ class Fcitx5Backend:
         finally:
             conn.close()
 
+    def _serve_persistent(self, conn: socket.socket):
+        """持久连接：循环读取请求帧直到对端关闭
+
+        Rime 请求在本线程内按到达顺序处理，保证按键顺序；语音识别耗时较长，
+        放到独立线程执行，不阻塞同一连接上的后续按键。
+        """
+        conn.settimeout(None)
+        send_lock = threading.Lock()
+        # 正在上传 PCM 的请求：request_id -> (请求, 已接收数据)
+        uploads: dict[int, tuple[dict, bytearray]] = {}
+        logger.debug("客户端已切换到持久连接模式")
+
+        def reply(request_id: int, response: dict) -> None:
+            payload = json.dumps(response, ensure_ascii=False).encode('utf-8')
+            with send_lock:
+                write_frame(conn, request_id, payload)
+
+        def reply_async(request_id: int, request: dict) -> None:
+            try:
+                reply(request_id, self._safe_dispatch(request))
+            except OSError as exc:
+                logger.warning("发送识别结果失败: %s", exc)
+
+        def dispatch_async(request_id: int, request: dict) -> None:
+            threading.Thread(
+                target=reply_async,
+                args=(request_id, request),
+                daemon=True,
+                name="Fcitx5BackendTranscribe",
+            ).start()
+
+        while self.running:
+            try:
+                frame = read_frame(conn, MAX_REQUEST_BYTES)
+            except FrameError as exc:
+                logger.warning("持久连接帧错误，关闭连接: %s", exc)
+                return
+            if frame is None:
+                return
+            request_id, payload = frame
+
+            # PCM 数据帧：追加到对应请求，收齐后开始识别
+            if request_id in uploads:
+                request, pcm = uploads[request_id]
+                pcm += payload
+                if len(pcm) >= request['bytes']:
+                    del uploads[request_id]
+                    request['_pcm'] = bytes(pcm[:request['bytes']])
+                    dispatch_async(request_id, request)
+                continue
+
+            try:
+                request = json.loads(payload.decode('utf-8'))
+            except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+                logger.error("JSON 解析失败: %s", exc)
+                reply(request_id, {"error": "Invalid JSON"})
+                continue
+
+            req_type = request.get('type')
+            if req_type == 'transcribe_pcm':
+                size = request.get('bytes')
+                if not isinstance(size, int) or size <= 0 or size % 2:
+                    reply(request_id, {"success": False, "error": "bytes 参数无效"})
+                elif size > MAX_PCM_BYTES:
+                    reply(request_id, {"success": False, "error": "音频数据过大"})
+                else:
+                    uploads[request_id] = (request, bytearray())
+            elif req_type == 'stop_recording':
+                # 停止录音在本线程内完成，保证与随后的 start_recording 顺序一致；识别异步进行
+                request['_trace'] = UtteranceTrace("fcitx5")
+                request['_audio'] = self._stop_recorder(request['_trace'])
+                dispatch_async(request_id, request)
+            elif req_type == 'transcribe':
+                dispatch_async(request_id, request)
+            else:
+                reply(request_id, self._safe_dispatch(request))
+
+    def _stop_recorder(self, trace=None):
+        """停止常驻录音器，返回 (样本, 采样率)
+
+        传入 trace 时并入 start_recording 记录的时间点，并记录停止录音与取出缓冲区的耗时。
+        """
+        if self.recorder is None:
+            return np.zeros(0, dtype=np.int16), 0
+        with self._recording_lock:
+            recording_trace = self._recording_trace
+            self._recording_trace = None
+            if trace is not None:
+                if recording_trace is not None:
+                    trace.origin = recording_trace.origin
+                    trace.marks.update(recording_trace.marks)
+                if self.recorder.first_frame_at is not None:
+                    trace.mark("first_sample", at=self.recorder.first_frame_at)
+                trace.mark("release")
+            try:
+                if trace is None:
+                    return self.recorder.stop()
+                with trace.span("concatenate"):
+                    return self.recorder.stop()
+            except Exception as exc:
+                logger.error("停止录音失败: %s", exc)
+                return np.zeros(0, dtype=np.int16), 0
+
+    def _submit(self, waveform, trace: UtteranceTrace) -> dict:
+        """提交识别并附加分阶段计时，输出一行计时日志"""
+        result = self.batcher.submit(waveform, trace=trace)
+        trace.mark("reply")
+        result["trace"] = trace.as_dict()
+        self.metrics.observe_trace(result["trace"])
+        trace.log()
+        return result
+
+    def _stats(self) -> dict:
+        """stats 请求：汇总识别、Rime、队列、内存与模型加载指标"""
+        stats = self.metrics.snapshot()
+        stats.update(self.asr_server.stats())
+        stats.update(
+            success=True,
+            queues={
+                "asr_pending": self.batcher.pending,
+                "asr_in_flight": self.batcher.in_flight,
+                "rime_lock": self._rime_lock.snapshot(),
+                "recording_lock": self._recording_lock.snapshot(),
+            },
+            memory=memory_usage(),
+            threads=threading.active_count(),
+        )
+        return stats
+
+    def _safe_dispatch(self, request: dict) -> dict:
+        """处理请求，异常转换为错误响应"""
+        req_type = request.get('type')
+        self.metrics.count_request(req_type)
+        try:
+            response = self._dispatch(request)
+        except Exception as exc:
+            logger.error("处理请求失败: %s", exc, exc_info=True)
+            response = {"error": str(exc)}
+        if "error" in response:
+            self.metrics.count_error(req_type)
+        return response
+
+    def _dispatch(self, request: dict) -> dict:
+        """根据请求类型分发处理，返回响应字典"""
+        req_type = request.get('type')
+
+        logger.debug("收到请求: type=%s", req_type)
+
+        if req_type == 'transcribe':
+            # 语音识别
+            audio_path = request.get('audio_path')
+            if not audio_path:
+                return {"success": False, "error": "缺少 audio_path 参数"}
+            if not os.path.exists(audio_path):
+                return {"success": False, "error": f"音频文件不存在: {audio_path}"}
+            trace = UtteranceTrace("fcitx5")
+            # 解码在各自的连接线程中并行完成，只有推理进入批处理队列
+            with trace.span("decode"):
+                waveform = load_audio_file(audio_path)
+            return self._submit(waveform, trace)
+
+        if req_type == 'transcribe_pcm':
+            pcm = request.get('_pcm')
+            if pcm is None:
+                return {"success": False, "error": "transcribe_pcm 仅支持持久连接"}
+            sample_rate = request.get('sample_rate')
+            if not isinstance(sample_rate, int) or sample_rate <= 0:
+                return {"success": False, "error": "sample_rate 参数无效"}
+            trace = UtteranceTrace("fcitx5")
+            samples = np.frombuffer(pcm, dtype=np.int16)
+            with trace.span("resample"):
+                waveform = pcm_to_waveform(samples, sample_rate)
+            return self._submit(waveform, trace)
+
+        if req_type == 'start_recording':
+            if self.recorder is None:
+                return {"success": False, "error": "后端录音不可用"}
+            with self._recording_lock:
+                trace = UtteranceTrace("fcitx5")
+                trace.mark("press")
+                try:
+                    sample_rate = self.recorder.start()
+                except Exception as exc:
+                    logger.error("启动录音失败: %s", exc)
+                    return {"success": False, "error": f"启动录音失败: {exc}"}
+                trace.mark("stream_open")
+                self._recording_trace = trace
+            return {"success": True, "sample_rate": sample_rate}
+
+        if req_type == 'stop_recording':
+            if self.recorder is None:
+                return {"success": False, "error": "后端录音不可用"}
+            trace = request.get('_trace')
+            if trace is None:
+                trace = UtteranceTrace("fcitx5")
+                audio_data, sample_rate = self._stop_recorder(trace)
+            else:
+                audio_data, sample_rate = request['_audio']
+            try:
+                if not request.get('transcribe', True):
+                    return {"success": True, "text": ""}
+                if audio_data.size == 0:
+                    return {"success": False, "error": "没有录制到音频数据"}
+                trace.annotate(record_s=round(audio_data.size / sample_rate, 3), sample_rate=sample_rate)
+                with trace.span("resample"):
+                    waveform = pcm_to_waveform(audio_data, sample_rate)
+            finally:
+                # pcm_to_waveform 已复制出 float32 波形，录音存储归还给缓冲区复用
+                self.recorder.audio_buffer.release(audio_data)
+            return self._submit(waveform, trace)
+
+        if req_type == 'key_event':
+            # Rime 按键处理
+            keyval = request.get('keyval')
+            mask = request.get('mask', 0)
+            if keyval is None:
+                return {"handled": False, "error": "缺少 keyval 参数"}
+            # 计时包含等待 Rime 锁的时间，即 Addon 实际感受到的按键延迟
+            start = time.monotonic()
+            with self._rime_lock:
+                result = self.rime_handler.process_key(keyval, mask)
+            self.metrics.observe("rime.key_event", (time.monotonic() - start) * 1000)
+            return result
+
+        if req_type == 'reset':
+            # 重置 Rime
+            with self._rime_lock:
+                self.rime_handler.reset()
+            return {"success": True}
+
+        if req_type == 'ping':
+            # 健康检查
+            return {"pong": True}
+
+        if req_type == 'stats':
+            return self._stats()
+
+        return {"error": f"未知的请求类型: {req_type}"}
+
     def cleanup(self):
         """清理资源"""
         logger.info("正在清理资源...")
         try:
-            self.asr_server.cleanup()
+            if self.recorder is not None:
+                self.recorder.stop()
+            self.batcher.stop()
+            self.asr_server.release()
             self.rime_handler.cleanup()
         except Exception as exc:
             logger.error("清理资源失败: %s", exc)
@@ -284,8 +549,11 @@ def main():
     )
     args = parser.parse_args()
 
-    if args.debug:
-        logging.getLogger().setLevel(logging.DEBUG)
+    # 配置日志（写入在后台线程完成，不阻塞按键请求的处理）
+    setup_logging(
+        "DEBUG" if args.debug else "INFO",
+        fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    )
 
     SOCKET_PATH = args.socket
 
@@ -0,0 +1,158 @@
+"""Fcitx5 Backend 运行指标
+
+为 stats 请求收集计数器与延迟分布，用于在用户机器上排查性能退化而无需附加调试器：
+- 各请求类型的计数与错误数
+- 识别各阶段（来自 UtteranceTrace）与 Rime 按键处理的延迟直方图和百分位
+- 锁与识别队列的等待深度
+"""
+from __future__ import annotations
+
+import bisect
+import resource
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, Optional
+
+# 直方图桶上界（毫秒），最后一个桶收集超出上界的样本
+BUCKET_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+# 百分位基于最近的样本计算
+RECENT_SAMPLES = 1024
+
+
+class LatencyStats:
+    """单个指标的延迟统计：累计直方图 + 最近样本百分位（非线程安全，由 BackendMetrics 加锁）"""
+
+    __slots__ = ("count", "total_ms", "max_ms", "buckets", "recent")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.recent: deque = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, value_ms: float) -> None:
+        self.count += 1
+        self.total_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, value_ms)] += 1
+        self.recent.append(value_ms)
+
+    def snapshot(self) -> dict:
+        ordered = sorted(self.recent)
+
+        def percentile(q: float) -> float:
+            if not ordered:
+                return 0.0
+            rank = max(1, -(-len(ordered) * q // 100))
+            return round(ordered[int(rank) - 1], 2)
+
+        labels = [f"le_{bound}" for bound in BUCKET_BOUNDS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": percentile(50),
+            "p95_ms": percentile(95),
+            "p99_ms": percentile(99),
+            "max_ms": round(self.max_ms, 2),
+            "histogram": dict(zip(labels, self.buckets)),
+        }
+
+
+class BackendMetrics:
+    """Backend 进程内共享的指标集合"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self.requests: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.latency: Dict[str, LatencyStats] = {}
+
+    def count_request(self, req_type: Optional[str]) -> None:
+        with self._lock:
+            key = str(req_type)
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def count_error(self, req_type: Optional[str]) -> None:
+        with self._lock:
+            key = str(req_type)
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def observe(self, name: str, value_ms: float) -> None:
+        with self._lock:
+            stats = self.latency.get(name)
+            if stats is None:
+                stats = self.latency[name] = LatencyStats()
+            stats.observe(value_ms)
+
+    def observe_trace(self, trace: dict) -> None:
+        """记录一次识别的各阶段耗时（UtteranceTrace.as_dict() 的结果）"""
+        for stage, value_ms in trace.get("spans", {}).items():
+            self.observe(f"stage.{stage}", value_ms)
+        if "total_ms" in trace:
+            self.observe("stage.total", trace["total_ms"])
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "uptime_s": round(time.monotonic() - self.started_at, 1),
+                "requests": dict(self.requests),
+                "errors": dict(self.errors),
+                "latency": {name: stats.snapshot() for name, stats in sorted(self.latency.items())},
+            }
+
+
+class InstrumentedLock:
+    """记录等待者数量与等待耗时的互斥锁（用法与 threading.Lock 相同）"""
+
+    def __init__(self, name: str, metrics: BackendMetrics) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._metrics = metrics
+        self._waiting = 0
+        self._max_waiting = 0
+        self._count_lock = threading.Lock()
+
+    def __enter__(self):
+        with self._count_lock:
+            self._waiting += 1
+            self._max_waiting = max(self._max_waiting, self._waiting)
+        start = time.monotonic()
+        self._lock.acquire()
+        waited_ms = (time.monotonic() - start) * 1000
+        with self._count_lock:
+            self._waiting -= 1
+        self._metrics.observe(f"lock.{self.name}", waited_ms)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._lock.release()
+
+    def snapshot(self) -> dict:
+        with self._count_lock:
+            # waiting 包含当前持有者正在获取的瞬间，held 表示锁是否被占用
+            return {
+                "waiting": self._waiting,
+                "max_waiting": self._max_waiting,
+                "held": self._lock.locked(),
+            }
+
+
+def memory_usage() -> dict:
+    """当前与峰值常驻内存（MB）"""
+    result = {}
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                result["rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+            elif line.startswith("VmHWM:"):
+                result["peak_rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+    except (OSError, ValueError):
+        pass
+    if "peak_rss_mb" not in result:
+        # Linux 上 ru_maxrss 单位为 KB
+        result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return result
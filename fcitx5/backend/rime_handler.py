@@ -131,8 +131,9 @@ class RimeHandler:
                 "page_size": int          # 每页候选词数
             }
         """
-        logger.info("process_key: keyval=%d, mask=%d, available=%s, session=%s",
-                    keyval, mask, self.available, self.session is not None)
+        # 每个按键都会经过这里：使用 DEBUG 级别与延迟格式化，默认不产生格式化开销
+        logger.debug("process_key: keyval=%d, mask=%d, available=%s, session=%s",
+                     keyval, mask, self.available, self.session is not None)
 
         if not self.available:
             logger.warning("Rime not available (pyrime not installed)")
@@ -152,7 +153,7 @@ class RimeHandler:
             commit = self.session.get_commit()
             if commit and commit.text:
                 result["commit"] = commit.text
-                logger.info("Rime 提交文本: %s", commit.text)
+                logger.debug("Rime 提交文本: %s", commit.text)
 
             # 获取上下文
             context = self.session.get_context()
@@ -361,6 +361,34 @@ EOF
 
 echo "✓ 后台服务启动器已创建"
 
+# 常驻 ASR 守护进程（socket 激活）：IBus 与 Fcitx5 前端共享同一份模型。
+# 首次连接时启动后保持常驻（--idle-exit 0），避免空闲后的第一次听写重新冷启动模型
+cat > "$HOME/.config/systemd/user/vocotype-asr.socket" << EOF
+[Unit]
+Description=VoCoType ASR Daemon Socket
+
+[Socket]
+ListenStream=%t/vocotype-asr-%U.sock
+SocketMode=0600
+
+[Install]
+WantedBy=sockets.target
+EOF
+
+cat > "$HOME/.config/systemd/user/vocotype-asr.service" << EOF
+[Unit]
+Description=VoCoType ASR Daemon
+Requires=vocotype-asr.socket
+
+[Service]
+Type=simple
+WorkingDirectory=$INSTALL_DIR
+ExecStart=$INSTALL_DIR/.venv/bin/python -m app.asr_daemon --idle-exit 0
+Environment="PYTHONIOENCODING=UTF-8"
+EOF
+
+echo "✓ ASR 守护进程 socket 已创建"
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 # 完成
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -383,6 +411,9 @@ echo "2. 启动后台服务："
 echo ""
 echo "   systemctl --user enable --now vocotype-fcitx5-backend.service"
 echo ""
+echo "   （可选）启用共享 ASR 守护进程，与 IBus 版共用一份模型："
+echo "   systemctl --user enable --now vocotype-asr.socket"
+echo ""
 echo "3. 重启 Fcitx 5："
 echo "     fcitx5 -r"
 echo ""
@@ -9,15 +9,10 @@ from __future__ import annotations
 
 import logging
 import threading
-import queue
-import tempfile
-import os
 import time
 from pathlib import Path
 from typing import Optional, TYPE_CHECKING
 
-import numpy as np
-
 import gi
 gi.require_version('IBus', '1.0')
 from gi.repository import IBus, GLib
@@ -25,12 +20,16 @@ from gi.repository import IBus, GLib
 from app.audio_utils import (
     SAMPLE_RATE,
     DEFAULT_NATIVE_SAMPLE_RATE,
+    invalidate_input_settings,
     load_audio_config,
-    resample_audio,
+    load_hot_mic_config,
+    resolve_input_settings,
 )
+from app.trace import UtteranceTrace
 
 if TYPE_CHECKING:
     from pyrime.session import Session as RimeSession
+    from app.pcm_buffer import PcmRingBuffer
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +37,7 @@ logger = logging.getLogger(__name__)
 BLOCK_MS = 20
 
 AUDIO_DEVICE, CONFIGURED_SAMPLE_RATE = load_audio_config()
+HOT_MIC, PREROLL_MS = load_hot_mic_config()
 
 class VoCoTypeEngine(IBus.Engine):
     """VoCoType IBus语音输入引擎"""
@@ -58,16 +58,26 @@ class VoCoTypeEngine(IBus.Engine):
 
         # 状态
         self._is_recording = False
-        self._audio_frames: list[np.ndarray] = []
-        self._audio_queue: queue.Queue = queue.Queue(maxsize=500)
-        self._stop_event = threading.Event()
-        self._capture_thread: Optional[threading.Thread] = None
+        # numpy 在引擎实例创建时才导入（进程此时已在总线上完成注册）
+        from app.pcm_buffer import PcmBuffer
+
+        # 录音缓冲区，由音频回调直接写入（预分配 30 秒，不足时倍增）
+        self._audio_buffer = PcmBuffer((CONFIGURED_SAMPLE_RATE or SAMPLE_RATE) * 30)
         self._stream = None
+        # 音频回调是否把数据送入采集队列；热麦克风模式下未录音时写入预录缓冲区
+        self._capturing = False
+        self._capture_lock = threading.Lock()
+        self._preroll: Optional[PcmRingBuffer] = None
+        # 流式识别会话（FUNASR_STREAMING_MODE=online/vad 时按住 F9 期间边录边识别）
+        self._stream_session = None
+        # 当前听写的分阶段计时（按下 F9 时创建）
+        self._trace: Optional[UtteranceTrace] = None
 
         # ASR服务器（懒加载）
         self._asr_server = None
         self._asr_initializing = False
         self._asr_ready = threading.Event()
+        self._destroyed = False
         self._native_sample_rate = CONFIGURED_SAMPLE_RATE
 
         # Rime 集成（使用 pyrime 直接调用 librime）
@@ -91,58 +101,6 @@ class VoCoTypeEngine(IBus.Engine):
             logger.info("pyrime 未安装，Rime 集成功能将被禁用")
             return False
 
-    def _resolve_input_device(self, sd):
-        """选择可用的输入设备，优先使用显式配置。"""
-        if AUDIO_DEVICE is not None:
-            try:
-                info = sd.query_devices(AUDIO_DEVICE)
-                if info.get("max_input_channels", 0) > 0:
-                    return AUDIO_DEVICE
-                logger.warning("设备 %s 无输入通道，回退选择输入设备", AUDIO_DEVICE)
-            except Exception as exc:
-                logger.warning("查询设备 %s 失败: %s", AUDIO_DEVICE, exc)
-
-        try:
-            devices = sd.query_devices()
-            for idx, info in enumerate(devices):
-                if info.get("max_input_channels", 0) > 0:
-                    logger.info("回退至输入设备 #%s (%s)", idx, info.get("name", "unknown"))
-                    return idx
-        except Exception as exc:
-            logger.warning("查询输入设备列表失败: %s", exc)
-
-        return None
-
-    def _resolve_sample_rate(self, sd, device, preferred):
-        """选择可用采样率，优先使用指定值。"""
-        if preferred:
-            try:
-                sd.check_input_settings(
-                    device=device,
-                    samplerate=preferred,
-                    channels=1,
-                    dtype="int16",
-                )
-                return preferred
-            except Exception:
-                pass
-
-        try:
-            info = sd.query_devices(device if device is not None else None, kind="input")
-            default_sr = int(info.get("default_samplerate", 0)) if info else 0
-            if default_sr:
-                sd.check_input_settings(
-                    device=device,
-                    samplerate=default_sr,
-                    channels=1,
-                    dtype="int16",
-                )
-                return default_sr
-        except Exception:
-            pass
-
-        return preferred or SAMPLE_RATE
-
     def _read_schema_from_yaml(self, user_yaml: Path) -> Optional[str]:
         """从指定 user.yaml 读取用户偏好方案"""
         if not user_yaml.exists():
@@ -322,6 +280,12 @@ class VoCoTypeEngine(IBus.Engine):
     def do_enable(self):
         """引擎启用"""
         logger.info("Engine enabled")
+        if HOT_MIC and self._stream is None:
+            try:
+                import sounddevice as sd
+                self._open_stream(sd)
+            except Exception as e:
+                logger.warning("热麦克风输入流打开失败，将在录音时重试: %s", e)
 
     def do_disable(self):
         """引擎禁用时清理资源（IBus不会调用do_destroy）"""
@@ -330,6 +294,7 @@ class VoCoTypeEngine(IBus.Engine):
         # 停止录音
         if self._is_recording:
             self._stop_recording()
+        self._close_stream()
 
         # 清除UI
         self._clear_preedit()
@@ -362,11 +327,7 @@ class VoCoTypeEngine(IBus.Engine):
             self._stop_recording()
 
         # 关闭音频流
-        if self._stream:
-            try:
-                self._stream.close()
-            except Exception:
-                pass
+        self._close_stream()
 
         # 释放Rime session
         if self._rime_session:
@@ -384,6 +345,14 @@ class VoCoTypeEngine(IBus.Engine):
                 logger.warning("Failed to destroy Rime session: %s", e)
             self._rime_session = None
 
+        # 归还共享 ASR 模型（最后一个引擎归还后按空闲策略释放）
+        self._destroyed = True
+        self._asr_ready.clear()
+        asr_server = self._asr_server
+        self._asr_server = None
+        if asr_server is not None:
+            asr_server.release()
+
     def do_focus_in(self):
         """获得输入焦点"""
         logger.info("Engine got focus")
@@ -416,15 +385,16 @@ class VoCoTypeEngine(IBus.Engine):
         def init_asr():
             try:
                 logger.info("开始初始化FunASR...")
-                from app.funasr_server import FunASRServer
-                self._asr_server = FunASRServer()
-                result = self._asr_server.initialize()
-                if result["success"]:
-                    logger.info("FunASR初始化成功")
-                    self._asr_ready.set()
-                else:
-                    logger.error(f"FunASR初始化失败: {result.get('error')}")
-                    self._asr_server = None
+                # 优先使用常驻 ASR 守护进程，不可用时同一进程内的所有引擎实例共享一份模型
+                from app.asr_client import connect_asr
+                asr_server = connect_asr()
+                if self._destroyed:
+                    # 加载期间引擎已销毁，立即归还引用
+                    asr_server.release()
+                    return
+                self._asr_server = asr_server
+                logger.info("FunASR初始化成功")
+                self._asr_ready.set()
             except Exception as e:
                 logger.error(f"FunASR初始化异常: {e}")
                 self._asr_server = None
@@ -437,12 +407,13 @@ class VoCoTypeEngine(IBus.Engine):
 
     def do_process_key_event(self, keyval, keycode, state):
         """处理按键事件"""
-        # 调试：记录所有按键
-        is_release = bool(state & IBus.ModifierType.RELEASE_MASK)
-        logger.info(f"Key event: keyval={keyval}, keycode={keycode}, state={state}, is_release={is_release}, F9={self.PTT_KEYVAL}")
-
         # 检查是否是松开事件
         is_release = bool(state & IBus.ModifierType.RELEASE_MASK)
+        # 每个按键都会经过这里：使用 DEBUG 级别与延迟格式化，默认不产生格式化开销
+        logger.debug(
+            "Key event: keyval=%s, keycode=%s, state=%s, is_release=%s",
+            keyval, keycode, state, is_release,
+        )
 
         # 只处理F9键
         if keyval != self.PTT_KEYVAL:
@@ -464,7 +435,7 @@ class VoCoTypeEngine(IBus.Engine):
     def _forward_key_to_rime(self, keyval, keycode, state) -> bool:
         """将按键事件转发给 Rime（使用 pyrime）"""
         if not self._rime_enabled:
-            logger.info("Rime 未启用，按键不处理")
+            logger.debug("Rime 未启用，按键不处理")
             return False
 
         # 懒加载初始化 Rime
@@ -494,7 +465,7 @@ class VoCoTypeEngine(IBus.Engine):
 
             # 处理按键
             handled = self._rime_session.process_key(keyval, rime_mask)
-            logger.info("Rime process_key: keyval=%s mask=%s handled=%s", keyval, rime_mask, handled)
+            logger.debug("Rime process_key: keyval=%s mask=%s handled=%s", keyval, rime_mask, handled)
 
             # 检查是否有提交的文本
             commit = self._rime_session.get_commit()
@@ -502,7 +473,7 @@ class VoCoTypeEngine(IBus.Engine):
                 self._clear_preedit()
                 self.hide_lookup_table()
                 self.commit_text(IBus.Text.new_from_string(commit.text))
-                logger.info("Rime 提交文本: %s", commit.text)
+                logger.debug("Rime 提交文本: %s", commit.text)
 
             # 更新预编辑和候选词
             context = self._rime_session.get_context()
@@ -557,12 +528,14 @@ class VoCoTypeEngine(IBus.Engine):
                     round=False
                 )
 
+                log_candidates = logger.isEnabledFor(logging.DEBUG)
                 for i, candidate in enumerate(menu.candidates):
                     text = candidate.text
                     if candidate.comment:
                         text = f"{text} {candidate.comment}"
                     lookup_table.append_candidate(IBus.Text.new_from_string(text))
-                    logger.debug("  候选 %d: %s", i, text)
+                    if log_candidates:
+                        logger.debug("  候选 %d: %s", i, text)
 
                 self.update_lookup_table(lookup_table, True)
                 logger.debug("update_lookup_table called with %d candidates", len(menu.candidates))
@@ -593,51 +566,35 @@ class VoCoTypeEngine(IBus.Engine):
             import sounddevice as sd
 
             self._is_recording = True
-            self._audio_frames.clear()
-            self._stop_event.clear()
-
-            # 清空队列
-            while not self._audio_queue.empty():
-                try:
-                    self._audio_queue.get_nowait()
-                except queue.Empty:
-                    break
-
-            device = self._resolve_input_device(sd)
-            sample_rate = self._resolve_sample_rate(sd, device, CONFIGURED_SAMPLE_RATE)
-            self._native_sample_rate = sample_rate
-            block_size = int(sample_rate * BLOCK_MS / 1000)
-
-            def audio_callback(indata, frame_count, time_info, status):
-                if status:
-                    logger.warning(f"音频状态: {status}")
+            self._audio_buffer.clear()
+            self._trace = trace = UtteranceTrace("ibus")
+            trace.mark("press")
+
+            # 创建音频流（热麦克风模式下通常已在启用时打开）
+            if self._stream is None:
+                self._open_stream(sd)
+            trace.mark("stream_open")
+            sample_rate = self._native_sample_rate
+
+            # ASR 已就绪时开启流式会话，部分结果作为预编辑显示
+            self._stream_session = None
+            if self._asr_ready.is_set() and self._asr_server is not None:
                 try:
-                    self._audio_queue.put_nowait(indata.copy())
-                except queue.Full:
-                    pass
-
-            # 创建音频流
-            self._stream = sd.InputStream(
-                samplerate=sample_rate,
-                blocksize=block_size,
-                device=device,
-                channels=1,
-                dtype='int16',
-                callback=audio_callback,
-            )
-            self._stream.start()
-
-            # 启动采集线程
-            def capture_loop():
-                while not self._stop_event.is_set():
-                    try:
-                        frame = self._audio_queue.get(timeout=0.1)
-                        self._audio_frames.append(frame)
-                    except queue.Empty:
-                        continue
-
-            self._capture_thread = threading.Thread(target=capture_loop, daemon=True)
-            self._capture_thread.start()
+                    self._stream_session = self._asr_server.create_stream_session(
+                        sample_rate,
+                        on_partial=self._on_partial_text,
+                    )
+                except Exception as exc:
+                    logger.warning("创建流式识别会话失败，回退整段识别: %s", exc)
+
+            # 先放入按键前的预录音频，再开始接收实时音频
+            with self._capture_lock:
+                if self._preroll is not None:
+                    preroll = self._preroll.read_latest()
+                    self._preroll.clear()
+                    if preroll.size:
+                        self._accept_frame(preroll)
+                self._capturing = True
 
             # 显示录音状态
             self._update_preedit("🎤 录音中...")
@@ -649,68 +606,153 @@ class VoCoTypeEngine(IBus.Engine):
         except Exception as e:
             logger.error(f"启动录音失败: {e}")
             self._is_recording = False
+            self._release_stream()
+            self._cancel_stream_session()
             self._update_preedit(f"❌ 录音失败: {e}")
             GLib.timeout_add(2000, self._clear_preedit)
 
-    def _stop_recording(self):
-        """停止录音（不转录）"""
-        if not self._is_recording:
-            return
-
-        self._stop_event.set()
+    def _open_stream(self, sd):
+        """打开输入流，回调按 _capturing 决定送入采集队列还是预录缓冲区"""
+        try:
+            stream, sample_rate = self._start_input_stream(sd)
+        except Exception as exc:
+            # 设备可能已拔出或被占用：丢弃缓存的协商结果重试一次
+            invalidate_input_settings(exc)
+            stream, sample_rate = self._start_input_stream(sd)
+        self._stream = stream
+        if HOT_MIC:
+            logger.info("热麦克风输入流已打开: 采样率=%d, 预录=%dms", sample_rate, PREROLL_MS)
+
+    def _start_input_stream(self, sd):
+        from app.pcm_buffer import PcmRingBuffer
+
+        device, sample_rate = resolve_input_settings(AUDIO_DEVICE, CONFIGURED_SAMPLE_RATE)
+        block_size = int(sample_rate * BLOCK_MS / 1000)
+
+        stream = sd.InputStream(
+            samplerate=sample_rate,
+            blocksize=block_size,
+            device=device,
+            channels=1,
+            dtype='int16',
+            callback=self._audio_callback,
+        )
+        preroll_samples = int(sample_rate * PREROLL_MS / 1000)
+        with self._capture_lock:
+            self._native_sample_rate = sample_rate
+            self._preroll = (
+                PcmRingBuffer(preroll_samples) if HOT_MIC and preroll_samples > 0 else None
+            )
+        try:
+            stream.start()
+        except Exception:
+            stream.close()
+            raise
+        return stream, sample_rate
+
+    def _audio_callback(self, indata, frame_count, time_info, status):
+        if status:
+            logger.warning("音频状态: %s", status)
+        with self._capture_lock:
+            if not self._capturing:
+                if self._preroll is not None:
+                    self._preroll.write(indata)
+                return
+            self._accept_frame(indata)
 
+    def _accept_frame(self, frame):
+        """写入录音缓冲区并送入流式会话（调用方持有 _capture_lock）"""
+        try:
+            if self._trace is not None:
+                self._trace.mark("first_sample")
+            self._audio_buffer.append(frame)
+            if self._stream_session is not None:
+                self._stream_session.accept(frame)
+        except Exception as e:
+            logger.error("处理音频帧失败: %s", e)
+
+    def _release_stream(self):
+        """录音结束：停止送入采集队列，非热麦克风模式下关闭输入流"""
+        with self._capture_lock:
+            self._capturing = False
+        if not HOT_MIC:
+            self._close_stream()
+
+    def _close_stream(self):
+        """关闭输入流"""
+        with self._capture_lock:
+            self._capturing = False
+            if self._preroll is not None:
+                self._preroll.clear()
         if self._stream:
             try:
                 self._stream.stop()
                 self._stream.close()
-            except:
+            except Exception:
                 pass
             self._stream = None
 
-        if self._capture_thread:
-            self._capture_thread.join(timeout=1.0)
-            self._capture_thread = None
+    def _stop_recording(self):
+        """停止录音（不转录）"""
+        if not self._is_recording:
+            return
+
+        self._release_stream()
 
         self._is_recording = False
+        self._trace = None
+        self._audio_buffer.clear()
+        self._cancel_stream_session()
         self._clear_preedit()
         logger.info("录音已停止")
 
+    def _cancel_stream_session(self):
+        """放弃当前流式识别会话"""
+        session = self._stream_session
+        self._stream_session = None
+        if session is not None:
+            session.cancel()
+
+    def _on_partial_text(self, text: str):
+        """流式识别部分结果（识别线程回调）"""
+        GLib.idle_add(self._update_preedit, f"🎤 {text}")
+
     def _stop_and_transcribe(self):
         """停止录音并转录"""
         if not self._is_recording:
             return
 
-        # 停止录音
-        self._stop_event.set()
-
-        if self._stream:
-            try:
-                self._stream.stop()
-                self._stream.close()
-            except:
-                pass
-            self._stream = None
+        trace = self._trace or UtteranceTrace("ibus")
+        self._trace = None
+        trace.mark("release")
 
-        if self._capture_thread:
-            self._capture_thread.join(timeout=1.0)
-            self._capture_thread = None
+        # 停止录音（_release_stream 返回后回调不再写入缓冲区）
+        self._release_stream()
 
         self._is_recording = False
+        stream_session = self._stream_session
+        self._stream_session = None
+
+        # 取出录音（缓冲区视图，无需合并拷贝）
+        with trace.span("concatenate"):
+            audio_data = self._audio_buffer.take()
 
         # 检查是否有音频数据
-        if not self._audio_frames:
+        if audio_data.size == 0:
+            if stream_session is not None:
+                stream_session.cancel()
             self._clear_preedit()
             return
 
-        # 合并音频
-        audio_data = np.concatenate(self._audio_frames).flatten()
-        self._audio_frames.clear()
-
         duration = len(audio_data) / self._native_sample_rate
         logger.info(f"录音完成，时长: {duration:.2f}秒")
+        trace.annotate(record_s=round(duration, 3), sample_rate=self._native_sample_rate)
 
         # 检查是否太短
         if duration < 0.3:
+            if stream_session is not None:
+                stream_session.cancel()
+            self._audio_buffer.release(audio_data)
             self._clear_preedit()
             return
 
@@ -718,45 +760,50 @@ class VoCoTypeEngine(IBus.Engine):
         self._update_preedit("⏳ 识别中...")
 
         # 在后台线程中转录
+        native_sample_rate = self._native_sample_rate
+
         def do_transcribe():
             try:
-                # 重采样
-                audio_16k = resample_audio(audio_data, self._native_sample_rate, SAMPLE_RATE)
-
-                # 写入临时文件
-                with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as f:
-                    temp_path = f.name
-                    from app.wave_writer import write_wav
-                    write_wav(Path(temp_path), audio_16k.tobytes(), SAMPLE_RATE)
-
-                try:
-                    # 等待ASR就绪
-                    if not self._asr_ready.wait(timeout=30):
-                        GLib.idle_add(self._show_error, "ASR未就绪")
+                # 等待ASR就绪
+                with trace.span("asr_wait"):
+                    ready = self._asr_ready.wait(timeout=30)
+                if not ready:
+                    GLib.idle_add(self._show_error, "ASR未就绪")
+                    trace.log()
+                    return
+
+                result = None
+                if stream_session is not None:
+                    # 流式会话已在录音期间完成大部分推理，这里只处理尾部
+                    result = stream_session.finish(trace=trace)
+                    if not result.get("success"):
+                        logger.warning("流式识别失败，回退整段识别: %s", result.get("error"))
+                        result = None
+
+                if result is None:
+                    # 直接转录内存中的音频（重采样在 FunASRServer 内完成，无需临时 WAV）
+                    result = self._asr_server.transcribe_samples(
+                        audio_data, native_sample_rate, trace=trace
+                    )
+
+                if result.get("success"):
+                    text = result.get("text", "").strip()
+                    if text:
+                        # 上屏时刻在主循环中记录，由 _commit_text 输出计时日志
+                        GLib.idle_add(self._commit_text, text, trace)
                         return
-
-                    # 转录
-                    result = self._asr_server.transcribe_audio(temp_path)
-
-                    if result.get("success"):
-                        text = result.get("text", "").strip()
-                        if text:
-                            GLib.idle_add(self._commit_text, text)
-                        else:
-                            GLib.idle_add(self._clear_preedit)
-                    else:
-                        error = result.get("error", "未知错误")
-                        GLib.idle_add(self._show_error, error)
-                finally:
-                    # 删除临时文件
-                    try:
-                        os.unlink(temp_path)
-                    except:
-                        pass
+                    GLib.idle_add(self._clear_preedit)
+                else:
+                    error = result.get("error", "未知错误")
+                    GLib.idle_add(self._show_error, error)
 
             except Exception as e:
                 logger.error(f"转录失败: {e}")
                 GLib.idle_add(self._show_error, str(e))
+            finally:
+                # 录音存储归还给缓冲区，供之后的录音复用
+                self._audio_buffer.release(audio_data)
+            trace.log()
 
         threading.Thread(target=do_transcribe, daemon=True).start()
 
@@ -770,11 +817,14 @@ class VoCoTypeEngine(IBus.Engine):
         self.update_preedit_text(IBus.Text.new_from_string(""), 0, False)
         return False  # 用于GLib.timeout_add
 
-    def _commit_text(self, text: str):
+    def _commit_text(self, text: str, trace: Optional[UtteranceTrace] = None):
         """提交文本到应用"""
         self._clear_preedit()
         self.commit_text(IBus.Text.new_from_string(text))
         logger.info(f"已提交文本: {text}")
+        if trace is not None:
+            trace.mark("commit_text")
+            trace.log()
         return False
 
     def _show_error(self, error: str):
@@ -90,6 +90,7 @@ import gi
 gi.require_version('IBus', '1.0')
 from gi.repository import IBus, GLib
 
+from app.logging_config import setup_logging
 from ibus.factory import VoCoTypeFactory
 from vocotype_version import __version__
 
@@ -201,22 +202,12 @@ def main():
         print_xml()
         return
 
-    # 配置日志
-    log_level = logging.DEBUG if args.debug else logging.INFO
-    logging.basicConfig(
-        level=log_level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(sys.stderr),
-        ]
+    # 配置日志（写入在后台线程完成，不阻塞 GLib 主循环中的按键处理）
+    setup_logging(
+        "DEBUG" if args.debug else "INFO",
+        log_file=os.environ.get("VOCOTYPE_LOG_FILE"),
+        fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     )
-    log_path = os.environ.get("VOCOTYPE_LOG_FILE")
-    if log_path:
-        file_handler = logging.FileHandler(log_path)
-        file_handler.setFormatter(logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        ))
-        logging.getLogger().addHandler(file_handler)
 
     # 创建并运行应用
     app = VoCoTypeIMApp(exec_by_ibus=args.ibus)
@@ -19,6 +19,7 @@ import sounddevice as sd
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
+from app.audio_utils import resample_audio
 from app.wave_writer import write_wav
 
 TARGET_SAMPLE_RATE = 16000
@@ -163,16 +164,6 @@ def record_test_audio(device_id: int, sample_rate: int) -> np.ndarray:
     return audio_data
 
 
-def resample_audio(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
-    """重采样音频"""
-    if orig_sr == target_sr:
-        return audio
-    duration = len(audio) / orig_sr
-    target_length = int(duration * target_sr)
-    indices = np.linspace(0, len(audio) - 1, target_length)
-    return np.interp(indices, np.arange(len(audio)), audio.astype(np.float32)).astype(np.int16)
-
-
 def playback_test(audio_data: np.ndarray, sample_rate: int) -> bool:
     """播放录音并让用户确认，返回是否能听到"""
     print_header("播放录音")
@@ -202,15 +193,15 @@ def test_asr_recognition(audio_data: np.ndarray, sample_rate: int) -> bool:
     print("（首次运行会下载模型，约 500MB，请稍候...）\n")
 
     try:
-        from app.funasr_server import FunASRServer
+        from app.asr_client import connect_asr
 
-        # 初始化 FunASR
-        asr_server = FunASRServer()
-        result = asr_server.initialize()
-
-        if not result["success"]:
-            print(f"❌ 识别引擎初始化失败: {result.get('error')}")
+        # 初始化 FunASR（常驻 ASR 守护进程运行时直接复用其模型）
+        try:
+            asr_server = connect_asr(streaming=False)
+        except RuntimeError as e:
+            print(f"❌ 识别引擎初始化失败: {e}")
             return False
+        asr_server.wait_for_models()
 
         print("✓ 识别引擎初始化成功\n")
 
@@ -267,7 +258,7 @@ def test_asr_recognition(audio_data: np.ndarray, sample_rate: int) -> bool:
 
             # 清理资源
             try:
-                asr_server.cleanup()
+                asr_server.release()
             except:
                 pass
 
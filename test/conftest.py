@@ -0,0 +1,9 @@
+"""测试公共设置：把项目根目录加入 sys.path"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+# Fcitx5 Backend 的模块以 backend.* 导入
+sys.path.insert(0, str(PROJECT_ROOT / "fcitx5"))
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""ASR 微批调度器测试"""
+
+import threading
+import time
+
+import numpy as np
+
+from app.trace import UtteranceTrace
+from backend.batch_scheduler import BatchScheduler
+
+
+class _StubASR:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.batches = []
+
+    def transcribe_batch(self, waveforms, options=None, traces=None):
+        self.batches.append((len(waveforms), traces))
+        time.sleep(self.delay)
+        return [{"success": True, "text": str(w.size)} for w in waveforms]
+
+
+def test_lone_request_skips_window():
+    """队列为空且没有批次在推理时，不等待收集窗口"""
+    asr = _StubASR()
+    scheduler = BatchScheduler(asr, window_ms=2000, max_batch=8)
+    try:
+        trace = UtteranceTrace("test")
+        start = time.monotonic()
+        result = scheduler.submit(np.zeros(160, dtype=np.float32), trace=trace)
+        assert time.monotonic() - start < 1.0
+        assert result["text"] == "160"
+        assert asr.batches[0][1] == [trace]
+    finally:
+        scheduler.stop()
+
+
+def test_burst_requests_are_batched():
+    """批次推理期间到达的请求在窗口内合并"""
+    asr = _StubASR(delay=0.2)
+    scheduler = BatchScheduler(asr, window_ms=100, max_batch=8)
+    try:
+        first = threading.Thread(target=scheduler.submit, args=(np.zeros(1, dtype=np.float32),))
+        first.start()
+        time.sleep(0.05)  # 第一个请求正在推理
+        threads = [
+            threading.Thread(target=scheduler.submit, args=(np.zeros(n, dtype=np.float32),))
+            for n in (2, 3, 4)
+        ]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.01)
+        first.join()
+        for thread in threads:
+            thread.join()
+        assert [size for size, _ in asr.batches] == [1, 3]
+    finally:
+        scheduler.stop()
+
+
+def test_submit_after_stop_and_timeout():
+    asr = _StubASR(delay=0.5)
+    scheduler = BatchScheduler(asr, window_ms=0, max_batch=8, timeout_s=0.1)
+    try:
+        result = scheduler.submit(np.zeros(1, dtype=np.float32))
+        assert result["type"] == "timeout_error"
+    finally:
+        scheduler.stop()
+    result = scheduler.submit(np.zeros(1, dtype=np.float32))
+    assert result == {"success": False, "error": "调度器已停止", "type": "transcription_error"}
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""持久连接分帧协议测试"""
+
+import socket
+
+from app.ipc import HEADER, FrameError, read_frame, write_frame
+
+
+def _expect_frame_error(sock, max_bytes):
+    try:
+        read_frame(sock, max_bytes)
+    except FrameError:
+        return
+    raise AssertionError("应抛出 FrameError")
+
+
+def test_round_trip():
+    left, right = socket.socketpair()
+    with left, right:
+        payloads = [(1, b'{"type": "ping"}'), (2, b""), (0xFFFFFFFF, bytes(range(256)) * 100)]
+        for request_id, payload in payloads:
+            write_frame(left, request_id, payload)
+        for expected in payloads:
+            assert read_frame(right, 1 << 20) == expected
+        left.close()
+        # 对端在帧边界正常关闭
+        assert read_frame(right, 1 << 20) is None
+
+
+def test_oversize_frame_rejected():
+    left, right = socket.socketpair()
+    with left, right:
+        write_frame(left, 7, b"x" * 101)
+        _expect_frame_error(right, 100)
+
+
+def test_truncated_frames():
+    # 帧头不完整
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(HEADER.pack(10, 1)[:5])
+        left.close()
+        _expect_frame_error(right, 100)
+
+    # payload 不完整
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(HEADER.pack(10, 1) + b"abc")
+        left.close()
+        _expect_frame_error(right, 100)
+
+    # 只有帧头
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(HEADER.pack(10, 1))
+        left.close()
+        _expect_frame_error(right, 100)
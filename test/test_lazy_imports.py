@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""app 包、音频配置工具与 IBus 引擎在导入时不应加载 numpy、onnxruntime 等重依赖"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# 注册到总线之前不应加载的重依赖
+HEAVY_MODULES = (
+    "numpy",
+    "sounddevice",
+    "onnxruntime",
+    "funasr_onnx",
+    "librosa",
+    "modelscope",
+    "torch",
+    "gi",
+)
+
+_SCRIPT = """
+import sys
+{statement}
+print("\\n".join(sorted({{name.split(".")[0] for name in sys.modules}})))
+"""
+
+
+def loaded_heavy_modules(statement: str, allowed=()) -> list:
+    """在子进程中执行导入语句，返回已加载的重依赖（顶层包名）"""
+    proc = subprocess.run(
+        [sys.executable, "-c", _SCRIPT.format(statement=statement)],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    loaded = set(proc.stdout.split())
+    return sorted(name for name in HEAVY_MODULES if name in loaded and name not in allowed)
+
+
+def test_app_package():
+    """import app 不加载录音与识别依赖"""
+    assert loaded_heavy_modules("import app") == []
+
+
+def test_audio_utils():
+    """IBus / Fcitx5 读取音频配置时不加载 numpy"""
+    assert loaded_heavy_modules("import app.audio_utils") == []
+
+
+def test_funasr_server_module():
+    """导入 FunASRServer 本身不加载模型依赖（模型在 initialize 时才导入）"""
+    assert loaded_heavy_modules("import app.funasr_server") == []
+
+
+def test_ibus_engine():
+    """IBus 引擎模块只依赖 gi"""
+    pytest.importorskip("gi")
+    assert loaded_heavy_modules("import ibus.engine", allowed=("gi",)) == []
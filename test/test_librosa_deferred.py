@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""initialize() 加载模型后 librosa 不应出现在 sys.modules 中"""
+
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# funasr_onnx 各模块与真实包一样在顶层 import librosa
+_LOADER = textwrap.dedent(
+    """
+    import librosa
+
+
+    class {name}:
+        def __init__(self, model_dir, **kwargs):
+            self.model_dir = model_dir
+            self.kwargs = kwargs
+    """
+)
+_STUB_MODULES = {
+    "librosa/__init__.py": "def load(path, sr=None):\n    return 'real'\n",
+    "funasr_onnx/__init__.py": "",
+    "funasr_onnx/utils/__init__.py": "",
+    "funasr_onnx/utils/utils.py": _LOADER.format(name="OrtInferSession"),
+    "funasr_onnx/utils/frontend.py": "import librosa\n",
+    "funasr_onnx/paraformer_bin.py": _LOADER.format(name="Paraformer"),
+    "funasr_onnx/paraformer_online_bin.py": _LOADER.format(name="Paraformer"),
+    "funasr_onnx/vad_bin.py": _LOADER.format(name="Fsmn_vad") + _LOADER.format(name="Fsmn_vad_online"),
+    "funasr_onnx/punc_bin.py": _LOADER.format(name="CT_Transformer"),
+}
+
+_SCRIPT = textwrap.dedent(
+    """
+    import sys
+    from app import funasr_server
+
+    funasr_server.get_model_cache_path = lambda name, revision: {model_dir!r}
+    result = funasr_server.FunASRServer().initialize(wait_optional=True)
+    assert result["success"], result
+    assert "librosa" not in sys.modules, "加载模型时导入了 librosa"
+
+    # funasr_onnx 真正调用 librosa 时才导入已安装的包
+    import funasr_onnx.paraformer_bin as paraformer_bin
+    assert paraformer_bin.librosa.load("x.wav") == "real"
+    import librosa
+    assert librosa.__file__ is not None
+    """
+)
+
+
+def test_models_load_without_librosa(tmp_path):
+    for relative, source in _STUB_MODULES.items():
+        path = tmp_path / "site" / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(source)
+    model_dir = tmp_path / "model"
+    model_dir.mkdir()
+    (model_dir / "model.onnx").write_bytes(b"")
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(tmp_path / "site"), str(PROJECT_ROOT)]))
+    env.pop("FUNASR_STREAMING_MODE", None)
+    proc = subprocess.run(
+        [sys.executable, "-c", _SCRIPT.format(model_dir=str(model_dir))],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""共享 ASR 句柄测试"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.model_registry import SharedASR
+
+
+class _StubServer:
+    def create_stream_session(self, sample_rate, on_partial=None, options=None, infer=None):
+        return infer
+
+    def transcribe_samples(self, samples, sample_rate=16000, options=None, trace=None):
+        return {"thread": threading.current_thread().name}
+
+
+def test_stream_session_infers_on_shared_executor():
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ASRInference")
+    try:
+        handle = SharedASR(_StubServer(), executor)
+        infer = handle.create_stream_session(16000)
+        thread_name = infer(lambda: threading.current_thread().name)
+        assert thread_name.startswith("ASRInference")
+        assert handle.transcribe_samples([]) == {"thread": thread_name}
+    finally:
+        executor.shutdown()
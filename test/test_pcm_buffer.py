@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""PCM 缓冲区测试"""
+
+import numpy as np
+
+from app.pcm_buffer import PcmBuffer, PcmRingBuffer
+
+
+def test_pcm_buffer_grows_and_keeps_order():
+    buffer = PcmBuffer(4)
+    expected = np.arange(1000, dtype=np.int16)
+    for start in range(0, expected.size, 7):
+        buffer.append(expected[start:start + 7])
+    assert len(buffer) == expected.size
+    assert buffer.nbytes == expected.size * 2
+    assert np.array_equal(buffer.take(), expected)
+
+
+def test_pcm_buffer_take_resets_without_touching_result():
+    buffer = PcmBuffer(8)
+    buffer.append(np.array([1, 2, 3], dtype=np.int16))
+    first = buffer.take()
+    assert len(buffer) == 0
+    buffer.append(np.array([9, 9, 9, 9], dtype=np.int16))
+    # 上一次取出的结果不受下一次录音写入影响
+    assert np.array_equal(first, [1, 2, 3])
+    assert np.array_equal(buffer.take(), [9, 9, 9, 9])
+    assert buffer.take().size == 0
+
+
+def test_pcm_buffer_reuses_released_storage():
+    buffer = PcmBuffer(4)
+    buffer.append(np.arange(10, dtype=np.int16))
+    first = buffer.take()
+    buffer.append(np.array([1, 2], dtype=np.int16))
+    second = buffer.take()
+    # 未归还的存储不会被复用
+    assert not np.shares_memory(first, second)
+    assert np.array_equal(first, np.arange(10))
+
+    buffer.release(first)
+    buffer.append(np.array([7, 8, 9], dtype=np.int16))
+    third = buffer.take()
+    # 归还的存储（含扩容后的容量）供下一次 take() 后的录音写入
+    buffer.append(np.array([5], dtype=np.int16))
+    assert np.shares_memory(buffer.take(), first)
+    assert np.array_equal(third, [7, 8, 9])
+    assert np.array_equal(second, [1, 2])
+
+
+def test_pcm_buffer_ignores_foreign_release():
+    buffer = PcmBuffer(4)
+    buffer.release(np.zeros(2, dtype=np.int16))
+    buffer.release(np.zeros(8, dtype=np.float32))
+    buffer.release(buffer.take())
+    buffer.append(np.array([1, 2, 3], dtype=np.int16))
+    assert np.array_equal(buffer.take(), [1, 2, 3])
+
+
+def test_pcm_buffer_flattens_and_clears():
+    buffer = PcmBuffer(2)
+    buffer.append(np.array([[1], [2]], dtype=np.int16))
+    buffer.append(np.zeros(0, dtype=np.int16))
+    assert np.array_equal(buffer.take(), [1, 2])
+    buffer.append(np.array([5], dtype=np.int16))
+    buffer.clear()
+    assert buffer.take().size == 0
+
+
+def test_ring_buffer_wraparound():
+    ring = PcmRingBuffer(5)
+    ring.write(np.array([1, 2, 3], dtype=np.int16))
+    assert np.array_equal(ring.read_latest(), [1, 2, 3])
+    ring.write(np.array([4, 5, 6, 7], dtype=np.int16))
+    assert len(ring) == 5
+    assert np.array_equal(ring.read_latest(), [3, 4, 5, 6, 7])
+    assert np.array_equal(ring.read_latest(2), [6, 7])
+    assert np.array_equal(ring.read_latest(100), [3, 4, 5, 6, 7])
+
+
+def test_ring_buffer_oversized_write_keeps_latest():
+    ring = PcmRingBuffer(4)
+    ring.write(np.array([1], dtype=np.int16))
+    ring.write(np.arange(10, dtype=np.int16))
+    assert np.array_equal(ring.read_latest(), [6, 7, 8, 9])
+    ring.clear()
+    assert len(ring) == 0
+    assert ring.read_latest().size == 0
+
+
+def test_invalid_capacity():
+    for cls in (PcmBuffer, PcmRingBuffer):
+        try:
+            cls(0)
+        except ValueError:
+            continue
+        raise AssertionError(f"{cls.__name__}(0) 应抛出 ValueError")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""标点恢复缓存测试"""
+
+import signal
+
+from app import funasr_server
+
+
+class _StubPunc:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls.append(text)
+        return (text + "。", [])
+
+
+def _server(monkeypatch, cache_size=512, bypass_chars=0):
+    monkeypatch.setattr(funasr_server, "PUNC_CACHE_SIZE", cache_size)
+    monkeypatch.setattr(funasr_server, "PUNC_BYPASS_CHARS", bypass_chars)
+    # 构造函数在主线程会注册 SIGTERM/SIGINT 处理，测试中不替换 pytest 的处理函数
+    monkeypatch.setattr(signal, "signal", lambda *args: None)
+    server = funasr_server.FunASRServer()
+    server.punc_model = _StubPunc()
+    return server
+
+
+def test_hits_and_misses(monkeypatch):
+    server = _server(monkeypatch)
+    assert server._punctuate("今天天气很好") == "今天天气很好。"
+    assert server._punctuate("今天天气很好") == "今天天气很好。"
+    assert server._punctuate("明天见") == "明天见。"
+    assert server.punc_model.calls == ["今天天气很好", "明天见"]
+    stats = server.punc_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 2)
+
+
+def test_disabled_or_blank_text_skips_model(monkeypatch):
+    server = _server(monkeypatch)
+    assert server._punctuate("今天天气很好", use_punc=False) == "今天天气很好"
+    assert server._punctuate("   ") == "   "
+    assert server.punc_model.calls == []
+
+
+def test_short_text_bypass(monkeypatch):
+    server = _server(monkeypatch, bypass_chars=2)
+    assert server._punctuate(" 好的 ") == " 好的 "
+    assert server._punctuate("好的呀") == "好的呀。"
+    stats = server.punc_cache_stats()
+    assert stats["bypassed"] == 1
+    assert stats["misses"] == 1
+    assert server.punc_model.calls == ["好的呀"]
+
+
+def test_cache_bounded_by_maxsize(monkeypatch):
+    server = _server(monkeypatch, cache_size=2)
+    for text in ("一一", "二二", "三三", "一一"):
+        server._punctuate(text)
+    stats = server.punc_cache_stats()
+    assert stats["maxsize"] == 2
+    assert stats["size"] == 2
+    # "一一" 已被淘汰，需要重新推理
+    assert server.punc_model.calls == ["一一", "二二", "三三", "一一"]
+
+
+def test_cache_disabled(monkeypatch):
+    server = _server(monkeypatch, cache_size=0)
+    server._punctuate("你好世界")
+    server._punctuate("你好世界")
+    assert server.punc_model.calls == ["你好世界", "你好世界"]
+    stats = server.punc_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (0, 0, 0)
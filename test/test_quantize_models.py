@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""量化工具的精度门槛测试"""
+
+from app.quantize_models import (
+    edit_distance,
+    evaluate,
+    normalize_text,
+    punctuation_agreement,
+    run_model,
+    segment_iou,
+)
+
+
+def test_edit_distance():
+    cases = [
+        ("", "", 0),
+        ("abc", "", 3),
+        ("", "abc", 3),
+        ("abc", "abc", 0),
+        ("abc", "axc", 1),  # 替换
+        ("abc", "ac", 1),  # 删除
+        ("ac", "abc", 1),  # 插入
+        ("今天天气好", "今天天汽很好", 2),
+        ("kitten", "sitting", 3),
+    ]
+    for ref, hyp, expected in cases:
+        assert edit_distance(ref, hyp) == expected, (ref, hyp)
+
+
+def test_normalize_text():
+    assert normalize_text("你好， 世界。") == "你好世界"
+    assert normalize_text("Hello, world!") == "Helloworld"
+
+
+def test_punctuation_agreement():
+    cases = [
+        ("你好世界", "你好世界", 1.0),  # 均无标点
+        ("你好，世界。", "你好，世界。", 1.0),
+        ("你好，世界。", "你好 ，世界。", 1.0),  # 空白不影响位置
+        ("你好，世界。", "你好。世界。", 0.5),  # 符号不同
+        ("你好，世界。", "你好世界。", 0.5),  # 漏标
+        ("你好世界", "你好，世界。", 0.0),
+    ]
+    for reference, candidate, expected in cases:
+        assert abs(punctuation_agreement(reference, candidate) - expected) < 1e-9, (reference, candidate)
+
+
+def test_segment_iou():
+    cases = [
+        ([], [], 1.0),
+        ([[0, 1000]], [], 0.0),
+        ([[0, 1000]], [[0, 1000]], 1.0),
+        ([[0, 1000]], [[0, 900]], 0.9),
+        ([[0, 1000]], [[500, 1500]], 500 / 1500),
+        ([[0, 500], [1000, 1500]], [[0, 1500]], 1000 / 1500),
+    ]
+    for reference, candidate, expected in cases:
+        assert abs(segment_iou(reference, candidate) - expected) < 1e-9, (reference, candidate)
+
+
+def test_evaluate_cer_against_fp32_or_reference():
+    # 无参考文本时以 fp32 结果为参考：fp32 的 CER 为 0
+    metrics = evaluate("asr", ["今天天气好"], ["今天天汽好"], [None])
+    assert metrics == {"cer_fp32": 0.0, "cer_quant": 0.2, "cer_delta": 0.2}
+    # 有参考文本时比较两者相对参考的错误率
+    metrics = evaluate("asr", ["今天天汽好"], ["今天天汽好"], ["今天天气好。"])
+    assert metrics["cer_delta"] == 0.0
+
+
+def test_run_model_warms_up_untimed():
+    calls = []
+
+    def model(item):
+        calls.append(item)
+        return ("文本", [])
+
+    outputs, _ = run_model("punc", model, ["a", "b"])
+    assert outputs == ["文本", "文本"]
+    assert calls == ["a", "a", "b"]
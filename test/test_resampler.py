@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""多相重采样器测试"""
+
+import numpy as np
+
+from app.audio_utils import StreamingResampler, _polyphase_filter, resample_audio
+
+
+def _tone(freq, sample_rate, seconds=1.0):
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    return (0.5 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def test_polyphase_filter_unit_dc_gain():
+    for up, down in ((160, 441), (1, 3)):
+        taps, half = _polyphase_filter(up, down)
+        assert taps.shape == (up, 2 * half)
+        assert np.allclose(taps.sum(axis=1), 1.0, atol=1e-5)
+
+
+def test_chunked_equals_one_shot():
+    rng = np.random.default_rng(0)
+    audio = rng.standard_normal(44100).astype(np.float32) * 0.1
+    expected = StreamingResampler(44100, 16000).process(audio, final=True)
+    for block in (1, 441, 882, 4096):
+        resampler = StreamingResampler(44100, 16000)
+        parts = [resampler.process(audio[i:i + block]) for i in range(0, audio.size, block)]
+        parts.append(resampler.process(np.zeros(0, dtype=np.float32), final=True))
+        chunked = np.concatenate(parts)
+        assert chunked.size == expected.size, block
+        assert np.allclose(chunked, expected, atol=1e-5), block
+
+
+def test_output_length():
+    for orig_sr, seconds in ((44100, 1.0), (48000, 1.0), (44100, 0.3), (48000, 2.5)):
+        audio = np.zeros(int(orig_sr * seconds), dtype=np.float32)
+        out = resample_audio(audio, orig_sr, 16000)
+        assert out.size == -(-audio.size * 16000 // orig_sr), (orig_sr, seconds)
+    same = np.zeros(100, dtype=np.float32)
+    assert resample_audio(same, 16000, 16000) is same
+
+
+def test_passband_preserved():
+    out = resample_audio(_tone(1000, 48000), 48000, 16000)
+    rms = np.sqrt(np.mean(out[1000:-1000] ** 2))
+    assert abs(rms - 0.5 / np.sqrt(2)) < 0.01
+
+
+def test_content_above_nyquist_suppressed():
+    """10kHz 高于 16kHz 的奈奎斯特频率，若不经低通会混叠到 6kHz"""
+    for orig_sr in (44100, 48000):
+        out = resample_audio(_tone(10000, orig_sr), orig_sr, 16000)
+        rms = np.sqrt(np.mean(out[1000:-1000] ** 2))
+        assert rms < 0.5 / np.sqrt(2) * 1e-3, orig_sr
+
+
+def test_int16_input_keeps_dtype():
+    audio = (_tone(440, 44100) * 32767).astype(np.int16)
+    out = resample_audio(audio, 44100, 16000)
+    assert out.dtype == np.int16
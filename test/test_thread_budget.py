@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""推理线程预算测试"""
+
+from app import thread_budget
+from app.thread_budget import plan_threads
+
+
+def _machine(monkeypatch, cores, quota=None):
+    cpus = list(range(cores))
+    monkeypatch.setattr(thread_budget, "_allowed_cpus", lambda: cpus)
+    monkeypatch.setattr(thread_budget, "_physical_cpus", lambda allowed: allowed)
+    monkeypatch.setattr(thread_budget, "_cgroup_cpu_limit", lambda: quota)
+
+
+def test_four_cores_reserve_one_for_main_loop(monkeypatch):
+    _machine(monkeypatch, 4)
+    plan = plan_threads({})
+    assert plan.budget == 3
+    assert plan.cpus == (1, 2, 3)
+    assert plan.threads_for("asr") == 3
+    assert plan.threads_for("punc") == 3
+    assert plan.threads_for("vad") == 1
+    assert plan.inter_threads_for("asr") == 1
+
+
+def test_cgroup_quota_limits_budget(monkeypatch):
+    _machine(monkeypatch, 32, quota=2.5)
+    plan = plan_threads({})
+    assert plan.budget == 2
+    assert plan.cpus == (0, 1)
+    assert plan.threads_for("asr") == 2
+    assert "cgroup" in plan.source
+
+
+def test_explicit_omp_num_threads_caps_budget(monkeypatch):
+    _machine(monkeypatch, 32)
+    plan = plan_threads({"OMP_NUM_THREADS": "6"})
+    assert plan.budget == 5
+    assert plan.threads_for("asr") == 5
+    # 非法值被忽略
+    assert plan_threads({"OMP_NUM_THREADS": "abc"}).budget == 31
+
+
+def test_asr_threads_capped_on_large_machines(monkeypatch):
+    _machine(monkeypatch, 32)
+    plan = plan_threads({})
+    assert plan.budget == 31
+    assert plan.threads_for("asr") == thread_budget.DEFAULT_ASR_MAX_THREADS
+    assert plan.threads_for("asr_online") == thread_budget.DEFAULT_ASR_MAX_THREADS
+    assert plan_threads({"FUNASR_ASR_MAX_THREADS": "16"}).threads_for("asr") == 16
+
+
+def test_pinned_cpu_sets_do_not_overlap_when_budget_allows(monkeypatch):
+    _machine(monkeypatch, 32)
+    plan = plan_threads({"FUNASR_PIN_THREADS": "true"})
+    assert plan.pin
+    used = [cpu for name in ("asr", "asr_online", "punc", "vad", "vad_online") for cpu in plan.cpus_for(name)]
+    assert len(used) == len(set(used))
+    assert len(plan.cpus_for("asr")) == plan.threads_for("asr")
+    # 预算不足时回绕共用，但每个模型的核心数仍等于其线程数
+    _machine(monkeypatch, 4)
+    small = plan_threads({"FUNASR_PIN_THREADS": "true"})
+    for name in ("asr", "punc", "vad"):
+        assert len(small.cpus_for(name)) == small.threads_for(name)
+        assert set(small.cpus_for(name)) <= set(small.cpus)